@@ -11,9 +11,18 @@ from airflow.sensors.filesystem import FileSensor
 from airflow.utils.dates import days_ago
 import pandas as pd
 import sqlite3
+import sys
 from pathlib import Path
 import logging
 
+# Raíz del proyecto para importar etl fuera del contenedor (en él, PYTHONPATH=/app)
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from etl.bulk_load import bulk_load
+from etl.incremental import upsert_load
+from etl.schema import csv_engine, read_transactions_csv
+from etl.transform import clean_transactions
+
 # Configuración del DAG
 default_args = {
     'owner': 'data-engineering-team',
@@ -40,6 +49,10 @@ RAW_DIR = DATA_DIR / 'raw'
 PROCESSED_DIR = DATA_DIR / 'processed'
 DB_PATH = PROCESSED_DIR / 'transactions.db'
 
+# El DAG corre cada hora: upsert por order_id de las filas nuevas en lugar de
+# reescribir la tabla completa
+LOAD_INCREMENTAL = True
+
 def check_file_size(**context):
     """
     Sensor personalizado: verificar que el archivo tenga tamaño mínimo
@@ -61,32 +74,23 @@ def check_file_size(**context):
 
 def extract_data(**context):
     """
-    Extrae datos del CSV con lectura por chunks
-    Requisitos: lectura por chunks para eficiencia de memoria
+    Extrae datos del CSV con el esquema declarado
+    Requisitos: lectura eficiente en memoria (tipos compactos, sin columnas de texto)
     """
     file_path = context['task_instance'].xcom_pull(task_ids='check_file_size')
     
     logging.info(f"📥 Extrayendo datos de: {file_path}")
     
-    # Lectura por chunks para archivos grandes
-    chunk_size = 10000
-    chunks = []
-    total_rows = 0
-    
     try:
-        for chunk in pd.read_csv(file_path, chunksize=chunk_size):
-            chunks.append(chunk)
-            total_rows += len(chunk)
-            
-            if total_rows % 100000 == 0:
-                logging.info(f"📊 Procesadas {total_rows} filas...")
-        
-        df = pd.concat(chunks, ignore_index=True)
+        # Lectura tipada y proyectada (motor pyarrow si está disponible)
+        df = read_transactions_csv(file_path)
         
         # Métricas de extracción
         metrics = {
             'rows_extracted': len(df),
             'columns': list(df.columns),
+            'csv_engine': csv_engine(),
+            'memory_mb': round(df.memory_usage(deep=True).sum() / (1024*1024), 2),
             'file_size_mb': file_path.stat().st_size / (1024*1024),
             'extraction_time': datetime.now().isoformat()
         }
@@ -117,37 +121,21 @@ def transform_data(**context):
     logging.info(f"🔄 Transformando datos de: {temp_file}")
     
     try:
-        df = pd.read_csv(temp_file)
-        
-        # Transformaciones
-        initial_count = len(df)
+        df = read_transactions_csv(temp_file)
         
-        # Limpiar datos nulos
-        df = df.dropna()
-        
-        # Validar tipos de datos
-        if 'amount' in df.columns:
-            df = df[df['amount'] > 0]
-        
-        if 'user_id' in df.columns:
-            df = df[df['user_id'].notna()]
-        
-        # Normalizar timestamp
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-            df = df[df['timestamp'].notna()]
+        # Transformaciones: todas las reglas en una pasada y un único filtrado
+        df, report = clean_transactions(df)
         
         # Agregar columnas calculadas
         df['processed_at'] = datetime.now()
-        df['data_quality_score'] = 1.0  # Simplificado
-        
-        final_count = len(df)
+        df['data_quality_score'] = report['data_quality_score']
         
         # Métricas de transformación
         metrics = {
-            'rows_input': initial_count,
-            'rows_output': final_count,
-            'data_quality_ratio': final_count / initial_count if initial_count > 0 else 0,
+            'rows_input': report['rows_input'],
+            'rows_output': report['rows_output'],
+            'data_quality_ratio': report['data_quality_score'],
+            'rejections': report['rejections'],
             'transformation_time': datetime.now().isoformat()
         }
         
@@ -182,10 +170,13 @@ def load_to_database(**context):
         # Crear directorio si no existe
         DB_PATH.parent.mkdir(parents=True, exist_ok=True)
         
-        # Cargar a SQLite
+        # Carga masiva a SQLite (incremental: solo filas posteriores a la marca de agua)
+        if LOAD_INCREMENTAL:
+            load_report = upsert_load(df, DB_PATH, 'transactions')
+        else:
+            load_report = bulk_load(df, DB_PATH, 'transactions')
+        
         with sqlite3.connect(DB_PATH) as conn:
-            df.to_sql('transactions', conn, if_exists='replace', index=False)
-            
             # Verificar carga
             cursor = conn.execute("SELECT COUNT(*) FROM transactions")
             row_count = cursor.fetchone()[0]
@@ -198,6 +189,9 @@ def load_to_database(**context):
                 'rows_loaded': row_count,
                 'table_name': 'transactions',
                 'database_size_mb': DB_PATH.stat().st_size / (1024*1024) if DB_PATH.exists() else 0,
+                'rows_staged': load_report['rows_loaded'],
+                'rows_per_second': load_report['rows_per_second'],
+                'load_mode': 'upsert' if LOAD_INCREMENTAL else 'replace',
                 'load_time': datetime.now().isoformat()
             }
             
@@ -6,10 +6,21 @@ Ejercicio 1: Modularizar el pipeline en scripts/paquetes reutilizables
 import pandas as pd
 import sqlite3
 import logging
+import sys
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any
 
+# Raíz del proyecto para importar etl
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from etl.bulk_load import bulk_load
+from etl.incremental import upsert_load
+from etl.parallel_csv import iter_transactions_csv_parallel, use_parallel_read
+from etl.resources import available_cpus, cpu_report, limit_native_threads
+from etl.schema import concat_transactions, csv_engine
+from etl.transform import clean_transactions
+
 logger = logging.getLogger(__name__)
 
 def extract_csv(file_path: Path, chunk_size: int = 10000) -> Dict[str, Any]:
@@ -37,21 +48,26 @@ def extract_csv(file_path: Path, chunk_size: int = 10000) -> Dict[str, Any]:
     
     chunks = []
     total_rows = 0
+    workers = available_cpus()
     
     try:
-        # Lectura por chunks para eficiencia de memoria
-        for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+        # Lectura por chunks tipados (esquema declarado) para eficiencia de memoria;
+        # los archivos grandes se parsean por rangos de bytes en varios procesos
+        for chunk in iter_transactions_csv_parallel(file_path, chunk_size, workers):
             chunks.append(chunk)
             total_rows += len(chunk)
             
-            if total_rows % 50000 == 0:
+            if total_rows // 50000 > (total_rows - len(chunk)) // 50000:
                 logger.info(f"📊 Procesadas {total_rows} filas...")
         
-        df = pd.concat(chunks, ignore_index=True)
+        df = concat_transactions(chunks)
         
         metrics = {
             'rows_extracted': len(df),
             'columns': list(df.columns),
+            'csv_engine': csv_engine(),
+            'parallel_read': use_parallel_read(file_path, workers),
+            'memory_mb': round(df.memory_usage(deep=True).sum() / (1024*1024), 2),
             'file_size_mb': file_size / (1024*1024),
             'extraction_time': datetime.now().isoformat(),
             'status': 'success'
@@ -80,36 +96,19 @@ def transform_transactions(df: pd.DataFrame) -> Dict[str, Any]:
     """
     logger.info(f"🔄 Transformando {len(df)} registros")
     
-    initial_count = len(df)
-    df_clean = df.copy()
-    
     try:
-        # Limpiar datos nulos
-        df_clean = df_clean.dropna()
-        
-        # Validar montos positivos
-        if 'amount' in df_clean.columns:
-            df_clean = df_clean[df_clean['amount'] > 0]
-        
-        # Validar user_id
-        if 'user_id' in df_clean.columns:
-            df_clean = df_clean[df_clean['user_id'].notna()]
+        # Reglas de validez en una sola pasada y un único filtrado
+        df_clean, report = clean_transactions(df)
         
-        # Normalizar timestamp
-        if 'timestamp' in df_clean.columns:
-            df_clean['timestamp'] = pd.to_datetime(df_clean['timestamp'], errors='coerce')
-            df_clean = df_clean[df_clean['timestamp'].notna()]
-        
-        # Agregar metadatos
+        # Agregar metadatos (calidad medida sobre el lote)
         df_clean['processed_at'] = datetime.now()
-        df_clean['data_quality_score'] = 1.0
-        
-        final_count = len(df_clean)
+        df_clean['data_quality_score'] = report['data_quality_score']
         
         metrics = {
-            'rows_input': initial_count,
-            'rows_output': final_count,
-            'data_quality_ratio': final_count / initial_count if initial_count > 0 else 0,
+            'rows_input': report['rows_input'],
+            'rows_output': report['rows_output'],
+            'data_quality_ratio': report['data_quality_score'] if report['rows_input'] > 0 else 0,
+            'rejections': report['rejections'],
             'transformation_time': datetime.now().isoformat(),
             'status': 'success'
         }
@@ -125,7 +124,8 @@ def transform_transactions(df: pd.DataFrame) -> Dict[str, Any]:
         logger.error(f"❌ Error en transformación: {e}")
         raise
 
-def load_to_sqlite(df: pd.DataFrame, db_path: Path, table_name: str = 'transactions') -> Dict[str, Any]:
+def load_to_sqlite(df: pd.DataFrame, db_path: Path, table_name: str = 'transactions',
+                   incremental: bool = False) -> Dict[str, Any]:
     """
     Carga datos a SQLite
     
@@ -133,6 +133,7 @@ def load_to_sqlite(df: pd.DataFrame, db_path: Path, table_name: str = 'transacti
         df: DataFrame a cargar
         db_path: Ruta a la base de datos
         table_name: Nombre de la tabla
+        incremental: Upsert por order_id con marca de agua en lugar de reemplazo
     
     Returns:
         Dict con métricas de carga
@@ -140,13 +141,13 @@ def load_to_sqlite(df: pd.DataFrame, db_path: Path, table_name: str = 'transacti
     logger.info(f"💾 Cargando {len(df)} registros a: {db_path}")
     
     try:
-        # Crear directorio si no existe
-        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Carga masiva (executemany en una transacción, PRAGMAs de carga)
+        if incremental:
+            load_report = upsert_load(df, db_path, table_name)
+        else:
+            load_report = bulk_load(df, db_path, table_name)
         
-        # Cargar a SQLite
         with sqlite3.connect(db_path) as conn:
-            df.to_sql(table_name, conn, if_exists='replace', index=False)
-            
             # Verificar carga
             cursor = conn.execute(f"SELECT COUNT(*) FROM {table_name}")
             row_count = cursor.fetchone()[0]
@@ -154,7 +155,7 @@ def load_to_sqlite(df: pd.DataFrame, db_path: Path, table_name: str = 'transacti
             if row_count == 0:
                 raise ValueError("❌ Tabla destino está vacía")
             
-            if row_count != len(df):
+            if not incremental and row_count != len(df):
                 logger.warning(f"⚠️  Discrepancia en conteo: esperado {len(df)}, cargado {row_count}")
             
             metrics = {
@@ -162,6 +163,8 @@ def load_to_sqlite(df: pd.DataFrame, db_path: Path, table_name: str = 'transacti
                 'table_name': table_name,
                 'database_path': str(db_path),
                 'database_size_mb': db_path.stat().st_size / (1024*1024) if db_path.exists() else 0,
+                'rows_per_second': load_report['rows_per_second'],
+                'load_mode': 'upsert' if incremental else 'replace',
                 'load_time': datetime.now().isoformat(),
                 'status': 'success'
             }
@@ -249,13 +252,14 @@ def validate_data_quality(db_path: Path, table_name: str = 'transactions') -> Di
         logger.error("🚨 ALERTA: Validación fallida - notificación enviada")
         raise
 
-def run_etl_pipeline(input_file: Path, output_db: Path) -> Dict[str, Any]:
+def run_etl_pipeline(input_file: Path, output_db: Path, incremental: bool = False) -> Dict[str, Any]:
     """
     Ejecuta pipeline ETL completo
     
     Args:
         input_file: Archivo CSV de entrada
         output_db: Base de datos de salida
+        incremental: Carga incremental (upsert por order_id con marca de agua)
     
     Returns:
         Dict con métricas completas del pipeline
@@ -265,6 +269,11 @@ def run_etl_pipeline(input_file: Path, output_db: Path) -> Dict[str, Any]:
     pipeline_start = datetime.now()
     pipeline_metrics = {}
     
+    # Hilos nativos (pyarrow, BLAS) según la cuota del contenedor, no el host
+    cpus = cpu_report()
+    limit_native_threads(cpus['available_cpus'])
+    logger.info(f"CPUs utilizables: {cpus['available_cpus']} (host: {cpus['host_cpus']})")
+    
     try:
         # Extracción
         extract_result = extract_csv(input_file)
@@ -275,7 +284,7 @@ def run_etl_pipeline(input_file: Path, output_db: Path) -> Dict[str, Any]:
         pipeline_metrics['transform'] = transform_result['metrics']
         
         # Carga
-        load_metrics = load_to_sqlite(transform_result['data'], output_db)
+        load_metrics = load_to_sqlite(transform_result['data'], output_db, incremental=incremental)
         pipeline_metrics['load'] = load_metrics
         
         # Validación
@@ -291,7 +300,8 @@ def run_etl_pipeline(input_file: Path, output_db: Path) -> Dict[str, Any]:
             'duration_seconds': pipeline_duration,
             'start_time': pipeline_start.isoformat(),
             'end_time': pipeline_end.isoformat(),
-            'total_rows_processed': load_metrics['rows_loaded']
+            'total_rows_processed': load_metrics['rows_loaded'],
+            'available_cpus': cpus['available_cpus']
         }
         
         logger.info(f"🎉 Pipeline ETL completado exitosamente en {pipeline_duration:.2f}s")
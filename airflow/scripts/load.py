@@ -2,9 +2,10 @@
 Script de carga de datos para el pipeline de transacciones
 """
 import pandas as pd
+import sqlite3
 import sys
 from pathlib import Path
-from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 
 # Añadir directorio padre para importar config
 # Añadir directorios padre para importar config y utils
@@ -15,6 +16,11 @@ sys.path.append(str(project_root / "shared"))    # Para utils
 
 from config import CLEANED_CSV_PATH, DB_CONNECTION_STRING, TABLE_NAME, LOAD_CHUNK_SIZE
 from utils import setup_logger, send_alert
+from etl.bulk_load import BulkLoader
+
+# Columnas indexadas tras la carga (user_id: queries de usuario, date:
+# queries temporales, status: filtros por estado)
+INDEX_COLUMNS = ('user_id', 'date', 'status')
 
 def load_to_sqlite():
     """
@@ -29,52 +35,35 @@ def load_to_sqlite():
         if not CLEANED_CSV_PATH.exists():
             raise FileNotFoundError(f"Archivo de datos limpios no encontrado: {CLEANED_CSV_PATH}")
         
-        # Crear conexión a SQLite
-        engine = create_engine(DB_CONNECTION_STRING)
+        # Carga masiva sobre el archivo SQLite de la cadena de conexión
+        db_path = Path(make_url(DB_CONNECTION_STRING).database)
         
-        # Leer y cargar en chunks
+        # Leer y cargar en chunks: una transacción, índices reconstruidos al final
         chunk_reader = pd.read_csv(CLEANED_CSV_PATH, chunksize=LOAD_CHUNK_SIZE)
         
         total_rows = 0
         chunks_loaded = 0
         
-        for chunk in chunk_reader:
-            chunks_loaded += 1
-            logger.info(f"Cargando chunk {chunks_loaded} con {len(chunk)} filas")
-            
-            # Cargar chunk a la base de datos
-            chunk.to_sql(
-                TABLE_NAME, 
-                engine, 
-                if_exists='append' if chunks_loaded > 1 else 'replace',
-                index=False,
-                method=None  # Usar método por defecto, más lento pero más compatible
-            )
-            
-            total_rows += len(chunk)
+        with BulkLoader(db_path, TABLE_NAME, indexes=INDEX_COLUMNS,
+                        batch_size=LOAD_CHUNK_SIZE) as loader:
+            for chunk in chunk_reader:
+                chunks_loaded += 1
+                logger.info(f"Cargando chunk {chunks_loaded} con {len(chunk)} filas")
+                loader.write(chunk)
+                total_rows += len(chunk)
+        
+        report = loader.report()
         
-        # Crear índices para mejorar performance
-        logger.info("Creando índices...")
-        with engine.connect() as conn:
-            # Índice en user_id para queries de usuario
-            conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_user_id ON {TABLE_NAME}(user_id)"))
-            
-            # Índice en date para queries temporales
-            conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_date ON {TABLE_NAME}(date)"))
-            
-            # Índice en status para filtros por estado
-            conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_status ON {TABLE_NAME}(status)"))
-            
-            # Verificar datos cargados
-            result = conn.execute(text(f"SELECT COUNT(*) FROM {TABLE_NAME}"))
-            db_count = result.scalar()
-            
-            conn.commit()
+        # Verificar datos cargados
+        with sqlite3.connect(db_path) as conn:
+            db_count = conn.execute(f'SELECT COUNT(*) FROM "{TABLE_NAME}"').fetchone()[0]
         
         logger.info(f"Carga completada:")
         logger.info(f"- Chunks cargados: {chunks_loaded}")
         logger.info(f"- Filas procesadas: {total_rows}")
         logger.info(f"- Filas en BD: {db_count}")
+        logger.info(f"- Velocidad: {report['rows_per_second']:,} filas/s "
+                    f"({report['indexes_rebuilt']} índices reconstruidos)")
         logger.info(f"- Base de datos: {DB_CONNECTION_STRING}")
         
         # Validar que se cargaron datos
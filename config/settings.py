@@ -52,3 +52,9 @@ ETL_CONFIG = {
     'COMPRESSION': 'snappy',
     'OUTPUT_FORMAT': 'parquet'
 }
+
+# Presupuesto de tiempo de importación (ms, medido con python -X importtime)
+IMPORT_TIME_BUDGET_MS = {
+    'main_help': 100,
+    'streaming_single_engine': 800
+}
@@ -0,0 +1,236 @@
+"""
+Gzip por bloques (estilo BGZF) para logs generados y archivados
+
+El archivo es una concatenación de miembros gzip independientes, cada uno con
+~block_size bytes sin comprimir cortados en fin de línea. Sigue siendo legible
+por gunzip estándar, pero cada miembro puede descomprimirse por separado, lo
+que permite repartir miembros entre workers sin índice externo.
+
+Cada miembro lleva en su campo FEXTRA el subcampo 'BL' con su tamaño
+comprimido. Al final se escriben dos miembros vacíos:
+- Índice: subcampo 'BI' con los offsets de inicio de cada miembro de datos
+- Cierre: tamaño fijo, subcampo 'BE' con el offset del índice (0 = sin índice)
+"""
+
+import logging
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from etl.engines import import_optional, module_available
+
+# Backend acelerado (solo descompresión: isal limita el nivel a 3), importado
+# al descomprimir el primer miembro
+HAS_ISAL = module_available('isal')
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+BLOCK_SUBFIELD = b'BL'
+INDEX_SUBFIELD = b'BI'
+EOF_SUBFIELD = b'BE'
+
+# Cabecera gzip con FEXTRA: magic, deflate, FLG=FEXTRA, MTIME=0, XFL=0, OS=255
+_HEADER_PREFIX = b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff'
+_EMPTY_DEFLATE = b'\x03\x00'
+_EMPTY_TRAILER = b'\x00' * 8
+
+# Tamaño máximo del campo FEXTRA (XLEN es uint16)
+_MAX_EXTRA = 0xFFFF
+_MAX_INDEX_ENTRIES = (_MAX_EXTRA - 4) // 8
+
+_BLOCK_HEADER_SIZE = len(_HEADER_PREFIX) + 2 + 4 + 4
+_EOF_MEMBER_SIZE = len(_HEADER_PREFIX) + 2 + 4 + 8 + len(_EMPTY_DEFLATE) + len(_EMPTY_TRAILER)
+
+
+def _decompress_member(member: bytes) -> bytes:
+    if HAS_ISAL:
+        return import_optional('isal.isal_zlib').decompress(member, wbits=31)
+    return zlib.decompress(member, 31)
+
+
+def _subfield(tag: bytes, payload: bytes) -> bytes:
+    return tag + struct.pack('<H', len(payload)) + payload
+
+
+def _empty_member(extra: bytes) -> bytes:
+    return _HEADER_PREFIX + struct.pack('<H', len(extra)) + extra + _EMPTY_DEFLATE + _EMPTY_TRAILER
+
+
+class BlockGzipWriter:
+    """
+    Escritor de gzip multi-miembro con bloques de tamaño fijo sin comprimir
+
+    Acepta str (se codifica en UTF-8) o bytes. Los bloques se cortan en el
+    último salto de línea, de modo que ninguna línea cruza dos miembros.
+    """
+
+    def __init__(self, path: Path, block_size: int = DEFAULT_BLOCK_SIZE,
+                 compresslevel: int = 6):
+        if block_size <= 0:
+            raise ValueError(f"Tamaño de bloque inválido: {block_size}")
+        self.path = Path(path)
+        self.block_size = block_size
+        self.compresslevel = compresslevel
+        self.member_offsets: List[int] = []
+        self.uncompressed_bytes = 0
+        self._buffer = bytearray()
+        self._file = open(self.path, 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._buffer += data
+        while len(self._buffer) >= self.block_size:
+            cut = self._buffer.rfind(b'\n', 0, self.block_size) + 1
+            if cut == 0:
+                # Línea más larga que el bloque: se corta en su propio fin
+                cut = self._buffer.find(b'\n', self.block_size) + 1
+                if cut == 0:
+                    break
+            self._write_member(bytes(self._buffer[:cut]))
+            del self._buffer[:cut]
+        return len(data)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def _write_member(self, data: bytes):
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15)
+        deflated = compressor.compress(data) + compressor.flush()
+        member_size = _BLOCK_HEADER_SIZE + len(deflated) + 8
+
+        self.member_offsets.append(self._file.tell())
+        self._file.write(_HEADER_PREFIX)
+        self._file.write(struct.pack('<H', 8))
+        self._file.write(_subfield(BLOCK_SUBFIELD, struct.pack('<I', member_size)))
+        self._file.write(deflated)
+        self._file.write(struct.pack('<II', zlib.crc32(data), len(data) & 0xFFFFFFFF))
+        self.uncompressed_bytes += len(data)
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self._buffer:
+            self._write_member(bytes(self._buffer))
+            self._buffer.clear()
+
+        # Índice de miembros (si cabe en un campo FEXTRA)
+        index_offset = 0
+        if len(self.member_offsets) <= _MAX_INDEX_ENTRIES:
+            index_offset = self._file.tell()
+            payload = struct.pack(f'<{len(self.member_offsets)}Q', *self.member_offsets)
+            self._file.write(_empty_member(_subfield(INDEX_SUBFIELD, payload)))
+
+        self._file.write(_empty_member(_subfield(EOF_SUBFIELD, struct.pack('<Q', index_offset))))
+        self._file.close()
+
+
+def _read_block_size(f) -> Optional[int]:
+    """Tamaño comprimido del miembro en la posición actual (None si no es un bloque)"""
+    header = f.read(_BLOCK_HEADER_SIZE)
+    if len(header) < _BLOCK_HEADER_SIZE or not header.startswith(_HEADER_PREFIX[:4]):
+        return None
+    if header[12:14] != BLOCK_SUBFIELD:
+        return None
+    return struct.unpack('<I', header[16:20])[0]
+
+
+def read_member_offsets(path: Path) -> Optional[List[int]]:
+    """
+    Offsets de los miembros de datos de un gzip por bloques
+
+    Returns:
+        Lista [inicio_1, ..., inicio_n, fin_datos], o None si el archivo no
+        tiene el formato por bloques
+    """
+    size = os.path.getsize(path)
+    if size < _EOF_MEMBER_SIZE:
+        return None
+
+    with open(path, 'rb') as f:
+        f.seek(size - _EOF_MEMBER_SIZE)
+        eof_member = f.read(_EOF_MEMBER_SIZE)
+        if not eof_member.startswith(_HEADER_PREFIX[:4]) or eof_member[12:14] != EOF_SUBFIELD:
+            return None
+        index_offset = struct.unpack('<Q', eof_member[16:24])[0]
+
+        if index_offset:
+            f.seek(index_offset + len(_HEADER_PREFIX))
+            xlen = struct.unpack('<H', f.read(2))[0]
+            extra = f.read(xlen)
+            if extra[:2] == INDEX_SUBFIELD:
+                count = struct.unpack('<H', extra[2:4])[0] // 8
+                offsets = list(struct.unpack(f'<{count}Q', extra[4:4 + count * 8]))
+                return offsets + [index_offset]
+
+        # Sin índice: recorrer las cabeceras saltando de bloque en bloque
+        offsets = []
+        position = 0
+        data_end = size - _EOF_MEMBER_SIZE
+        while position < data_end:
+            f.seek(position)
+            block_size = _read_block_size(f)
+            if block_size is None:
+                break
+            offsets.append(position)
+            position += block_size
+        return offsets + [position]
+
+
+def is_block_gzip(path: Path) -> bool:
+    """Indica si el archivo es un gzip por bloques con cierre válido"""
+    return read_member_offsets(path) is not None
+
+
+def split_member_ranges(path: Path, num_ranges: int) -> List[Tuple[int, int]]:
+    """
+    Agrupa miembros contiguos en rangos [inicio, fin) de tamaño comprimido similar
+
+    Returns:
+        Rangos de offsets comprimidos, o [] si no hay miembros de datos
+    """
+    offsets = read_member_offsets(path)
+    if not offsets or len(offsets) < 2:
+        return []
+
+    starts, data_end = offsets[:-1], offsets[-1]
+    num_ranges = max(1, min(num_ranges, len(starts)))
+
+    ranges = []
+    range_start = starts[0]
+    for i in range(1, num_ranges):
+        target = data_end * i // num_ranges
+        # Primer miembro que empieza en o después del objetivo
+        boundary = next((s for s in starts if s >= target and s > range_start), None)
+        if boundary is None:
+            break
+        ranges.append((range_start, boundary))
+        range_start = boundary
+    ranges.append((range_start, data_end))
+    return ranges
+
+
+def iter_member_lines(path: Path, start: int, end: int) -> Iterator[bytes]:
+    """Itera las líneas de los miembros comprendidos en [inicio, fin)"""
+    with open(path, 'rb') as f:
+        position = start
+        while position < end:
+            f.seek(position)
+            block_size = _read_block_size(f)
+            if block_size is None:
+                raise ValueError(f"Miembro gzip por bloques inválido en offset {position}")
+            f.seek(position)
+            data = _decompress_member(f.read(block_size))
+            yield from data.splitlines(keepends=True)
+            position += block_size
@@ -0,0 +1,255 @@
+"""
+Carga masiva en SQLite con PRAGMAs de carga y transacción explícita
+
+DataFrame.to_sql inserta con la configuración por defecto de la conexión
+(journal con rollback y fsync en cada commit). Aquí las filas se insertan
+con executemany en lotes de tuplas dentro de una única transacción y con
+PRAGMAs orientados a carga:
+
+- journal_mode=WAL (persistente: también es el modo recomendado para lectores)
+- synchronous=NORMAL (u OFF si se acepta perder la carga ante un corte de luz)
+- cache_size grande y temp_store=MEMORY
+
+Al terminar se restauran synchronous, cache_size y temp_store. Los índices de
+la tabla se eliminan antes de insertar y se reconstruyen al final (construir
+un índice sobre datos ya cargados es más rápido que mantenerlo fila a fila).
+"""
+
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Filas por llamada a executemany
+DEFAULT_BATCH_SIZE = 50000
+
+# KiB de caché de páginas durante la carga (negativo = KiB en SQLite)
+LOAD_CACHE_KIB = 256 * 1024
+
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL')
+
+# PRAGMAs por conexión que se guardan y restauran
+_RESTORED_PRAGMAS = ('synchronous', 'cache_size', 'temp_store')
+
+# Marcas de agua de la carga incremental (etl.incremental): reemplazar la
+# tabla invalida la suya
+WATERMARK_TABLE = 'etl_watermarks'
+
+
+def _column_values(values: pd.Series) -> list:
+    """Valores nativos de Python de una columna (fechas como texto, igual que to_sql)"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype(str).where(values.notna(), None).tolist()
+    if isinstance(values.dtype, pd.api.extensions.ExtensionDtype) and \
+            not isinstance(values.dtype, pd.CategoricalDtype) and values.hasnans:
+        # pd.NA no es un parámetro válido para sqlite3
+        return values.astype(object).where(values.notna(), None).tolist()
+    return values.tolist()
+
+
+def sqlite_batches(df: pd.DataFrame, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[tuple]]:
+    """
+    Lotes de tuplas listos para executemany
+
+    Cada columna se convierte de una vez con tolist (mucho más rápido que
+    itertuples) y el lote se forma con zip.
+    """
+    for start in range(0, len(df), batch_size):
+        part = df.iloc[start:start + batch_size]
+        yield list(zip(*(_column_values(part[c]) for c in part.columns)))
+
+
+class BulkLoader:
+    """
+    Cargador masivo de DataFrames en una tabla SQLite
+
+    Uso como context manager: la carga completa es una transacción (si algo
+    falla, la tabla queda como estaba) y los PRAGMAs se restauran al salir.
+
+    Args:
+        db_path: Base de datos SQLite
+        table: Tabla destino
+        replace: Reemplazar la tabla (True) o añadir a la existente
+        indexes: Columnas a indexar al final (además de los índices previos)
+        batch_size: Filas por executemany
+        synchronous: Modo synchronous durante la carga ('NORMAL' u 'OFF')
+        drop_indexes: Eliminar los índices existentes durante la carga
+    """
+
+    def __init__(self, db_path: Path, table: str, replace: bool = True,
+                 indexes: Sequence[str] = (), batch_size: int = DEFAULT_BATCH_SIZE,
+                 synchronous: str = 'NORMAL', drop_indexes: bool = True):
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Modo synchronous inválido: {synchronous} "
+                             f"(disponibles: {', '.join(SYNCHRONOUS_MODES)})")
+        self.db_path = Path(db_path)
+        self.table = table
+        self.replace = replace
+        self.indexes = list(indexes)
+        self.batch_size = batch_size
+        self.synchronous = synchronous
+        self.drop_indexes = drop_indexes
+        self.rows = 0
+        self.batches = 0
+        self.indexes_rebuilt = 0
+        self.seconds = 0.0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._columns: Optional[List[str]] = None
+        self._dropped_indexes: List[Tuple[str, str]] = []
+        self._saved_pragmas: Dict[str, Any] = {}
+        self._start = 0.0
+
+    def __enter__(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit desactivado a mano: BEGIN/COMMIT explícitos (DDL incluido)
+        self._conn = sqlite3.connect(self.db_path, isolation_level=None)
+        self._start = time.perf_counter()
+        self._set_load_pragmas()
+        self._conn.execute('BEGIN')
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._finish()
+                self._conn.execute('COMMIT')
+            else:
+                self._conn.execute('ROLLBACK')
+        finally:
+            try:
+                self._restore_pragmas()
+            finally:
+                self._conn.close()
+                self.seconds = time.perf_counter() - self._start
+
+    def _set_load_pragmas(self):
+        for name in _RESTORED_PRAGMAS:
+            self._saved_pragmas[name] = self._conn.execute(f'PRAGMA {name}').fetchone()[0]
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        self._conn.execute(f'PRAGMA cache_size=-{LOAD_CACHE_KIB}')
+        self._conn.execute('PRAGMA temp_store=MEMORY')
+
+    def _restore_pragmas(self):
+        for name, value in self._saved_pragmas.items():
+            self._conn.execute(f'PRAGMA {name}={value}')
+        # Vaciar el WAL en la base para no dejar un archivo del tamaño de la carga
+        self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def _existing_indexes(self) -> List[Tuple[str, str]]:
+        return self._conn.execute(
+            "SELECT name, sql FROM sqlite_master "
+            "WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (self.table,)
+        ).fetchall()
+
+    def _open(self, df: pd.DataFrame):
+        """Prepara la tabla con el esquema del primer DataFrame"""
+        self._columns = list(df.columns)
+
+        # Índices previos: se eliminan ahora y se recrean al final
+        existing = self._existing_indexes()
+        if self.drop_indexes or self.replace:
+            self._dropped_indexes = existing
+            for name, _ in existing:
+                self._conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+        table_exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.table,)
+        ).fetchone() is not None
+        if self.replace and table_exists:
+            self._conn.execute(f'DROP TABLE "{self.table}"')
+        if self.replace or not table_exists:
+            self._conn.execute(pd.io.sql.get_schema(df, self.table, con=self._conn))
+        if self.replace:
+            self._reset_watermark()
+
+        placeholders = ', '.join('?' * len(self._columns))
+        columns = ', '.join(f'"{c}"' for c in self._columns)
+        self._insert_sql = f'INSERT INTO "{self.table}" ({columns}) VALUES ({placeholders})'
+
+    def _reset_watermark(self):
+        """Borra la marca de agua incremental de la tabla reemplazada"""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (WATERMARK_TABLE,)
+        ).fetchone()
+        if exists:
+            self._conn.execute(f'DELETE FROM {WATERMARK_TABLE} WHERE table_name = ?', (self.table,))
+
+    def write(self, df: pd.DataFrame):
+        """Inserta un DataFrame en lotes de batch_size filas"""
+        if len(df.columns) == 0:
+            return
+        if self._columns is None:
+            self._open(df)
+        for batch in sqlite_batches(df[self._columns], self.batch_size):
+            self._conn.executemany(self._insert_sql, batch)
+            self.rows += len(batch)
+            self.batches += 1
+
+    def _finish(self):
+        """Último paso dentro de la transacción, antes del COMMIT"""
+        self._rebuild_indexes()
+
+    def _rebuild_indexes(self):
+        if self._columns is None:
+            return
+        statements = [sql for _, sql in self._dropped_indexes]
+        dropped = {name for name, _ in self._dropped_indexes}
+        for column in self.indexes:
+            if f'idx_{self.table}_{column}' in dropped:
+                continue
+            if column in self._columns:
+                statements.append(f'CREATE INDEX IF NOT EXISTS "idx_{self.table}_{column}" '
+                                  f'ON "{self.table}"("{column}")')
+            else:
+                logger.warning(f"Índice omitido: la columna {column} no existe en {self.table}")
+        for sql in statements:
+            try:
+                self._conn.execute(sql)
+                self.indexes_rebuilt += 1
+            except sqlite3.OperationalError as e:
+                # Índice previo sobre una columna que ya no existe tras reemplazar la tabla
+                logger.warning(f"Índice no reconstruido ({e}): {sql}")
+
+    def report(self) -> Dict[str, Any]:
+        """Métricas de la carga"""
+        return {
+            'table': self.table,
+            'rows_loaded': self.rows,
+            'batches': self.batches,
+            'indexes_rebuilt': self.indexes_rebuilt,
+            'load_seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows / self.seconds) if self.seconds > 0 else 0,
+            'synchronous': self.synchronous
+        }
+
+
+def bulk_load(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], db_path: Path, table: str,
+              **options) -> Dict[str, Any]:
+    """
+    Carga un DataFrame o una secuencia de chunks en una transacción
+
+    Args:
+        data: DataFrame o iterable de DataFrames
+        db_path: Base de datos SQLite
+        table: Tabla destino
+        **options: Argumentos de BulkLoader (replace, indexes, batch_size...)
+
+    Returns:
+        Métricas de la carga (filas, lotes, índices reconstruidos, filas/s)
+    """
+    chunks = [data] if isinstance(data, pd.DataFrame) else data
+    with BulkLoader(db_path, table, **options) as loader:
+        for chunk in chunks:
+            loader.write(chunk)
+    report = loader.report()
+    logger.info(f"Carga masiva en {table}: {report['rows_loaded']:,} filas "
+                f"({report['rows_per_second']:,} filas/s)")
+    return report
@@ -1,18 +1,24 @@
-import gzip
 import json
+import sys
 from pathlib import Path
 
+# Permitir ejecución directa (python etl/check_file.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from etl.compression import available_codecs, detect_codec, open_compressed
+
 # Usar ruta relativa al proyecto
-file_path = Path("data/raw/sample.log.gz")
+file_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("data/raw/sample.log.gz")
+codec = detect_codec(file_path)
 
 # Contar registros y verificar estructura
 count = 0
 error_count = 0
 status_500_count = 0
 
-print("Analizando archivo sample.log.gz...")
+print(f"Analizando archivo {file_path.name} (códec: {codec}, backend: {available_codecs()[codec]})...")
 
-with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+with open_compressed(file_path, 'rt', encoding='utf-8') as f:
     for i, line in enumerate(f):
         line = line.strip()
         if not line:
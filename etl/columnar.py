@@ -0,0 +1,176 @@
+"""
+Batches columnares preasignados para registros de log limpios
+
+Evitan crear un dict de Python por registro: cada campo numérico se escribe
+en un array NumPy y cada campo categórico se guarda como código entero de un
+diccionario compartido entre batches (y combinable entre workers).
+"""
+
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from etl.sketches import hash64
+
+CATEGORICAL_FIELDS = ('hour', 'endpoint', 'method', 'level')
+
+
+class FieldDictionary:
+    """Codificación valor -> código entero de un campo de baja cardinalidad"""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for value in values:
+            self.encode(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: str) -> int:
+        """Código del valor, asignando uno nuevo si no existe"""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def merge(self, other: 'FieldDictionary') -> np.ndarray:
+        """
+        Incorpora los valores de otro diccionario
+
+        Returns:
+            Array que traduce los códigos de other a códigos de este diccionario
+        """
+        return np.fromiter(
+            (self.encode(value) for value in other.values), dtype=np.int32, count=len(other)
+        )
+
+    def decode(self, codes: np.ndarray) -> pd.Categorical:
+        """Convierte códigos en un Categorical sin materializar strings por fila"""
+        return pd.Categorical.from_codes(codes, categories=self.values)
+
+
+def new_dictionaries() -> Dict[str, FieldDictionary]:
+    """Diccionarios vacíos para todos los campos categóricos"""
+    return {field: FieldDictionary() for field in CATEGORICAL_FIELDS}
+
+
+def merge_dictionaries(target: Dict[str, FieldDictionary],
+                       source: Dict[str, FieldDictionary]) -> Dict[str, np.ndarray]:
+    """Combina diccionarios de otro worker y devuelve los arrays de traducción por campo"""
+    return {field: target[field].merge(source[field]) for field in source}
+
+
+class LogRecordBatch:
+    """Batch columnar de capacidad fija que se reutiliza entre lotes"""
+
+    def __init__(self, capacity: int, dictionaries: Dict[str, FieldDictionary] = None):
+        if capacity <= 0:
+            raise ValueError(f"Capacidad de batch inválida: {capacity}")
+        self.size = 0
+        self._allocate(capacity)
+
+        # Diccionarios de las columnas categóricas (compartibles entre batches)
+        self.dictionaries = dictionaries if dictionaries is not None else new_dictionaries()
+
+    def _allocate(self, capacity: int):
+        self.capacity = capacity
+
+        # Columnas numéricas
+        self.status_code = np.empty(capacity, dtype=np.int16)
+        self.response_time_ms = np.empty(capacity, dtype=np.float64)
+
+        # Hashes de 64 bits para los contadores de distintos (0 = ausente)
+        self.user_hash = np.zeros(capacity, dtype=np.uint64)
+        self.ip_hash = np.zeros(capacity, dtype=np.uint64)
+
+        # Columnas categóricas: códigos enteros de los diccionarios
+        self.codes = {field: np.empty(capacity, dtype=np.int32) for field in CATEGORICAL_FIELDS}
+
+    @property
+    def is_full(self) -> bool:
+        return self.size >= self.capacity
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, hour: str, endpoint: str, status_code: int, response_time_ms: float,
+               method: str, level: str, user_id=None, ip_address=None):
+        """Escribe un registro en la siguiente fila libre"""
+        if self.size >= self.capacity:
+            raise IndexError("Batch lleno")
+        i = self.size
+
+        # Escribir numéricos primero: si fallan, la fila queda sin confirmar
+        self.status_code[i] = status_code
+        self.response_time_ms[i] = response_time_ms
+        self.user_hash[i] = hash64(user_id) if user_id is not None else 0
+        self.ip_hash[i] = hash64(ip_address) if ip_address is not None else 0
+
+        codes = self.codes
+        dictionaries = self.dictionaries
+        codes['hour'][i] = dictionaries['hour'].encode(hour)
+        codes['endpoint'][i] = dictionaries['endpoint'].encode(endpoint)
+        codes['method'][i] = dictionaries['method'].encode(method)
+        codes['level'][i] = dictionaries['level'].encode(level)
+
+        self.size = i + 1
+
+    def categories(self, field: str) -> List[str]:
+        """Valores del diccionario de un campo, ordenados por código"""
+        return self.dictionaries[field].values
+
+    def reset(self):
+        """Vacía el batch conservando buffers y diccionarios"""
+        self.size = 0
+
+    def resize(self, capacity: int):
+        """Cambia la capacidad de un batch vacío (realoja los buffers)"""
+        if capacity <= 0:
+            raise ValueError(f"Capacidad de batch inválida: {capacity}")
+        if self.size:
+            raise ValueError("Solo se puede redimensionar un batch vacío")
+        if capacity != self.capacity:
+            self._allocate(capacity)
+
+    def to_pandas(self, decode: bool = True) -> pd.DataFrame:
+        """
+        DataFrame sobre las filas ocupadas
+
+        Las columnas numéricas son vistas de los buffers (sin copia), por lo
+        que el DataFrame solo es válido hasta el siguiente reset(). Con
+        decode=False los campos categóricos se entregan como códigos int32.
+        """
+        n = self.size
+        data = {}
+        for field in CATEGORICAL_FIELDS:
+            if decode:
+                data[field] = self.dictionaries[field].decode(self.codes[field][:n])
+            else:
+                data[field] = self.codes[field][:n]
+        data['status_code'] = self.status_code[:n]
+        data['response_time_ms'] = self.response_time_ms[:n]
+        data['error_rate'] = (self.status_code[:n] >= 500).astype(np.float64)
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        """
+        Tabla Arrow sobre las filas ocupadas (requiere pyarrow)
+
+        Igual que to_pandas(), comparte memoria con los buffers del batch.
+        """
+        import pyarrow as pa
+
+        n = self.size
+        columns = {}
+        for field in CATEGORICAL_FIELDS:
+            columns[field] = pa.DictionaryArray.from_arrays(
+                pa.array(self.codes[field][:n]), pa.array(self.categories(field), type=pa.string())
+            )
+        columns['status_code'] = pa.array(self.status_code[:n])
+        columns['response_time_ms'] = pa.array(self.response_time_ms[:n])
+        columns['error_rate'] = pa.array((self.status_code[:n] >= 500).astype(np.float64))
+        return pa.table(columns)
@@ -1,19 +1,35 @@
 import gzip
 import shutil
+import sys
 from pathlib import Path
 
+# Permitir ejecución directa (python etl/compress_log.py)
+if __package__ in (None, ''):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from etl.block_gzip import BlockGzipWriter
+from etl.compression import open_compressed
+
+# Uso: python etl/compress_log.py [archivo.log.gz] [tamaño_bloque_kb]
+# Con tamaño de bloque se escribe gzip por bloques (descompresión paralela)
+
 # Rutas
 data_dir = Path("C:/Users/ulven/Programming/Work/TeamCore/PruebaTécnica/shared/data")
-original_file = data_dir / "sample.log.gz"
-temp_file = data_dir / "sample.log"
-compressed_file = data_dir / "sample.log.gz.compressed"
+original_file = Path(sys.argv[1]) if len(sys.argv) > 1 else data_dir / "sample.log.gz"
+block_size = int(sys.argv[2]) * 1024 if len(sys.argv) > 2 else None
+temp_file = original_file.with_suffix('')
+compressed_file = original_file.with_name(original_file.name + ".compressed")
 
 # Copiar el archivo original a uno temporal
 shutil.copy(original_file, temp_file)
 
-# Comprimir el archivo temporal
-with open(temp_file, 'rb') as f_in:
-    with gzip.open(compressed_file, 'wb') as f_out:
+# Comprimir el archivo temporal (si ya venía comprimido se descomprime primero)
+with open_compressed(temp_file, 'rb') as f_in:
+    if block_size:
+        f_out = BlockGzipWriter(compressed_file, block_size)
+    else:
+        f_out = gzip.open(compressed_file, 'wb')
+    with f_out:
         shutil.copyfileobj(f_in, f_out)
 
 # Reemplazar el archivo original
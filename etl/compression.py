@@ -0,0 +1,121 @@
+"""
+Capa de códecs de compresión para archivos de entrada/salida
+
+Detecta el formato por magic bytes (gzip, zstd, lz4, plano) y usa
+implementaciones aceleradas de gzip (python-isal, zlib-ng) si están instaladas.
+"""
+
+import gzip
+import logging
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from etl.engines import import_optional, module_available
+
+logger = logging.getLogger(__name__)
+
+# Backends opcionales: se importan al abrir el primer archivo, no al importar el módulo
+HAS_ISAL = module_available('isal')
+HAS_ZLIB_NG = module_available('zlib_ng')
+HAS_ZSTD = module_available('zstandard')
+HAS_LZ4 = module_available('lz4')
+
+CODEC_GZIP = 'gzip'
+CODEC_ZSTD = 'zstd'
+CODEC_LZ4 = 'lz4'
+CODEC_PLAIN = 'plain'
+
+MAGIC_BYTES = {
+    CODEC_GZIP: b'\x1f\x8b',
+    CODEC_ZSTD: b'\x28\xb5\x2f\xfd',
+    CODEC_LZ4: b'\x04\x22\x4d\x18',
+}
+
+CODEC_EXTENSIONS = {
+    CODEC_GZIP: '.gz',
+    CODEC_ZSTD: '.zst',
+    CODEC_LZ4: '.lz4',
+    CODEC_PLAIN: '',
+}
+
+
+def detect_codec(path: Path) -> str:
+    """Detecta el códec de un archivo por sus primeros bytes"""
+    with open(path, 'rb') as f:
+        header = f.read(4)
+    for codec, magic in MAGIC_BYTES.items():
+        if header.startswith(magic):
+            return codec
+    return CODEC_PLAIN
+
+
+def gzip_backend() -> str:
+    """Implementación de gzip que se usará (la más rápida disponible)"""
+    if HAS_ISAL:
+        return 'isal'
+    if HAS_ZLIB_NG:
+        return 'zlib-ng'
+    return 'zlib'
+
+
+def available_codecs() -> Dict[str, Optional[str]]:
+    """Códecs soportados y el backend que los implementa (None si falta la librería)"""
+    return {
+        CODEC_GZIP: gzip_backend(),
+        CODEC_ZSTD: 'zstandard' if HAS_ZSTD else None,
+        CODEC_LZ4: 'lz4' if HAS_LZ4 else None,
+        CODEC_PLAIN: 'builtin',
+    }
+
+
+def _opener(codec: str) -> Callable:
+    if codec == CODEC_GZIP:
+        if HAS_ISAL:
+            return import_optional('isal.igzip').open
+        if HAS_ZLIB_NG:
+            return import_optional('zlib_ng.gzip_ng').open
+        return gzip.open
+    if codec == CODEC_ZSTD:
+        if not HAS_ZSTD:
+            raise ImportError("Archivo zstd: instale 'zstandard' para leerlo")
+        return import_optional('zstandard').open
+    if codec == CODEC_LZ4:
+        if not HAS_LZ4:
+            raise ImportError("Archivo lz4: instale 'lz4' para leerlo")
+        return import_optional('lz4.frame').open
+    if codec == CODEC_PLAIN:
+        return open
+    raise ValueError(f"Códec no soportado: {codec}")
+
+
+def open_compressed(path: Path, mode: str = 'rb', encoding: str = 'utf-8',
+                    codec: Optional[str] = None):
+    """
+    Abre un archivo comprimido o plano de forma transparente
+
+    Args:
+        path: Ruta del archivo
+        mode: Modo de apertura ('rb', 'rt', 'wb', 'wt')
+        encoding: Codificación para modos de texto
+        codec: Códec a usar; en lectura se detecta si no se indica
+
+    Returns:
+        Objeto tipo archivo
+    """
+    if codec is None:
+        if 'r' not in mode:
+            raise ValueError("En escritura debe indicarse el códec explícitamente")
+        codec = detect_codec(path)
+
+    if 't' in mode:
+        return _opener(codec)(path, mode, encoding=encoding)
+    return _opener(codec)(path, mode)
+
+
+def recompress_file(source: Path, target: Path, codec: str) -> Path:
+    """Recomprime un archivo (cualquier códec soportado) al códec indicado"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open_compressed(source, 'rb') as f_in, open_compressed(target, 'wb', codec=codec) as f_out:
+        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+    return target
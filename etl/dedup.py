@@ -0,0 +1,198 @@
+"""
+Deduplicación de líneas reenviadas por request_id con un filtro de Bloom escalable
+
+Los shippers de logs a veces reenvían segmentos y los request_id repetidos
+inflan los conteos por hora. El filtro se consulta con el request_id crudo
+(sin decodificar el JSON), ocupa memoria constante por millón de IDs y se
+persiste entre ejecuciones para detectar reenvíos entre archivos.
+
+Los hilos de un mismo proceso comparten el filtro. Los workers de
+multiprocessing no reciben el filtro del padre: consultan el estado persistido
+(leído una vez por proceso) y los IDs de su propia tarea, y devuelven solo los
+hashes de los IDs nuevos. El padre los inserta en orden de archivo; los que ya
+insertó una tarea anterior son duplicados entre workers, y esa tarea se
+reprocesa descartándolos.
+"""
+
+import logging
+import os
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+import numpy as np
+
+from etl.sampling import field_token, raw_field
+from etl.sketches import (DEFAULT_BLOOM_CAPACITY, DEFAULT_BLOOM_ERROR_RATE, ScalableBloomFilter,
+                          hash128_pair)
+
+logger = logging.getLogger(__name__)
+
+DEDUP_STATE_NAME = 'seen_request_ids.bloom'
+
+# Filtro persistido por proceso worker: (ruta, firma del archivo, filtro)
+_persisted_filter: Optional[Tuple[str, Tuple, ScalableBloomFilter]] = None
+
+
+def load_persisted_filter(state_file: Path) -> Optional[ScalableBloomFilter]:
+    """
+    Filtro persistido en state_file, para consultas de solo lectura en un worker
+
+    Se lee una vez por proceso y se vuelve a leer solo si el archivo cambia.
+    """
+    global _persisted_filter
+    try:
+        stat = os.stat(state_file)
+    except FileNotFoundError:
+        return None
+    signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    if _persisted_filter is None or _persisted_filter[:2] != (str(state_file), signature):
+        bloom = ScalableBloomFilter.from_bytes(Path(state_file).read_bytes())
+        _persisted_filter = (str(state_file), signature, bloom)
+    return _persisted_filter[2]
+
+
+class LineDeduplicator:
+    """
+    Descarta líneas cuyo request_id ya se vio en esta u otras ejecuciones
+
+    Los hilos de parseo del pipeline comparten una instancia: todo acceso al
+    filtro y al contador pasa por un lock (añadir un ID modifica bytes del
+    filtro leyéndolos antes).
+
+    Args:
+        state_file: Archivo donde se persiste el filtro (None = solo en memoria)
+        capacity: Cardinalidad esperada de IDs (primer filtro)
+        error_rate: Tasa de falsos positivos objetivo del primer filtro
+        key: Campo que identifica la línea
+    """
+
+    def __init__(self, state_file: Optional[Path] = None, capacity: int = DEFAULT_BLOOM_CAPACITY,
+                 error_rate: float = DEFAULT_BLOOM_ERROR_RATE, key: str = 'request_id'):
+        self.state_file = Path(state_file) if state_file else None
+        self.key = key
+        self._key_token = field_token(key)
+        self.duplicates = 0
+        self.loaded_ids = 0
+        self._lock = threading.Lock()
+
+        if self.state_file is not None and self.state_file.exists():
+            self.filter = ScalableBloomFilter.from_bytes(self.state_file.read_bytes())
+            self.loaded_ids = len(self.filter)
+            logger.info(f"Filtro de deduplicación cargado: {self.loaded_ids:,} IDs "
+                        f"({self.filter.memory_bytes / 1024 ** 2:.1f} MB)")
+        else:
+            self.filter = ScalableBloomFilter(capacity, error_rate)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def is_duplicate(self, line: bytes) -> bool:
+        """Registra el ID de la línea e indica si ya se había visto (líneas sin ID pasan)"""
+        value = raw_field(line, self._key_token)
+        if value is None:
+            return False
+        with self._lock:
+            if self.filter.add(value):
+                return False
+            self.duplicates += 1
+            return True
+
+    def add_task_ids(self, report: Dict[str, Any]) -> np.ndarray:
+        """
+        Inserta los IDs nuevos de una tarea de otro proceso (ver TaskDeduplicator)
+
+        Returns:
+            h1 de los IDs que ya estaban en el filtro (duplicados entre tareas)
+        """
+        h1, h2 = report['new_ids']
+        with self._lock:
+            present = self.filter.add_many(h1, h2)
+        return h1[present]
+
+    def save(self):
+        """Persiste el filtro (escritura atómica)"""
+        if self.state_file is None:
+            return
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = self.filter.to_bytes()
+        tmp_file = self.state_file.with_name(self.state_file.name + '.tmp')
+        tmp_file.write_bytes(data)
+        os.replace(tmp_file, self.state_file)
+        logger.info(f"Filtro de deduplicación guardado en {self.state_file} ({len(self.filter):,} IDs)")
+
+    def report(self) -> Dict[str, Any]:
+        """Resumen de la deduplicación"""
+        with self._lock:
+            ids = len(self.filter)
+            memory = self.filter.memory_bytes
+            # Coste por millón de IDs a plena capacidad (no depende de cuántos haya)
+            capacity = sum(f.capacity for f in self.filter.filters)
+            return {
+                'key': self.key,
+                'duplicates_dropped': self.duplicates,
+                'loaded_ids': self.loaded_ids,
+                'tracked_ids': ids,
+                'filters': len(self.filter.filters),
+                'memory_mb': round(memory / 1024 ** 2, 2),
+                'capacity_ids': capacity,
+                'mb_per_million_ids': round(memory / 1024 ** 2 / capacity * 1e6, 2),
+                'max_false_positive_rate': round(self.filter.max_error_rate, 6),
+                'state_file': str(self.state_file) if self.state_file else None
+            }
+
+
+class TaskDeduplicator:
+    """
+    Deduplicación de una tarea de lectura en un worker de multiprocessing
+
+    Descarta los IDs del filtro persistido, los repetidos dentro de la tarea y
+    los indicados en drop_ids; los demás se anotan para que el padre los
+    inserte en su filtro (LineDeduplicator.add_task_ids).
+
+    Args:
+        persisted: Filtro persistido (solo lectura) o None
+        key: Campo que identifica la línea
+        drop_ids: h1 de IDs que ya insertó una tarea anterior
+    """
+
+    def __init__(self, persisted: Optional[ScalableBloomFilter], key: str = 'request_id',
+                 drop_ids: FrozenSet[int] = frozenset()):
+        self.persisted = persisted
+        self.drop_ids = drop_ids
+        self.duplicates = 0
+        self._key_token = field_token(key)
+        self._seen = set()
+        self._new_h1 = array('Q')
+        self._new_h2 = array('Q')
+
+    def is_duplicate(self, line: bytes) -> bool:
+        """Igual que LineDeduplicator.is_duplicate, sin modificar el filtro persistido"""
+        value = raw_field(line, self._key_token)
+        if value is None:
+            return False
+        h1, h2 = hash128_pair(value)
+        if (h1 in self._seen or h1 in self.drop_ids
+                or (self.persisted is not None and self.persisted.contains_hashes(h1, h2))):
+            self.duplicates += 1
+            return True
+        self._seen.add(h1)
+        self._new_h1.append(h1)
+        self._new_h2.append(h2)
+        return False
+
+    def report(self) -> Dict[str, Any]:
+        """Descartes e IDs nuevos (hashes uint64, 16 bytes por ID) para el padre"""
+        return {
+            'duplicates': self.duplicates,
+            'new_ids': (np.frombuffer(self._new_h1, dtype=np.uint64),
+                        np.frombuffer(self._new_h2, dtype=np.uint64))
+        }
@@ -0,0 +1,55 @@
+"""
+Registro de motores de procesamiento y dependencias opcionales diferidas
+
+La disponibilidad de una librería opcional se comprueba con find_spec (sin
+importarla); el import real ocurre solo cuando se ejecuta el motor que la
+necesita. Así, un job que usa un único motor no paga el arranque de polars,
+dask o pyarrow.
+"""
+
+import importlib
+import importlib.util
+from typing import Dict, List, NamedTuple, Tuple
+
+
+def module_available(name: str) -> bool:
+    """Indica si el paquete raíz del módulo está instalado, sin importarlo"""
+    return importlib.util.find_spec(name.split('.')[0]) is not None
+
+
+def import_optional(name: str):
+    """Importa un módulo opcional en el momento de usarlo"""
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        raise ImportError(f"Dependencia opcional no disponible: {name} ({e})") from e
+
+
+class EngineSpec(NamedTuple):
+    """Motor de procesamiento: método del procesador y módulos que requiere"""
+    name: str
+    method: str
+    requires: Tuple[str, ...]
+    description: str
+
+
+ENGINES: Dict[str, EngineSpec] = {spec.name: spec for spec in (
+    EngineSpec('pandas_streaming', 'process_with_pandas_streaming', (),
+               'Pipeline en hilos con pandas (baseline)'),
+    EngineSpec('multiprocessing', 'process_with_multiprocessing', (),
+               'Pool de procesos con agregados en memoria compartida'),
+    EngineSpec('polars', 'process_with_polars', ('polars',),
+               'Agregación con polars'),
+    EngineSpec('dask', 'process_with_dask', ('dask.dataframe',),
+               'Tareas dask delayed'),
+)}
+
+
+def engine_names() -> List[str]:
+    """Nombres de motores registrados, en el orden del reporte"""
+    return list(ENGINES)
+
+
+def engine_available(name: str) -> bool:
+    """Indica si las dependencias de un motor están instaladas"""
+    return all(module_available(module) for module in ENGINES[name].requires)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Índice de acceso aleatorio para logs gzip de un solo miembro (estilo zran)
+
+Un indexado único recorre el archivo y guarda puntos de acceso (ventana de
+32KB + offset de bit) cada N MB en un archivo sidecar ``.gzidx``. Con él, los
+motores paralelos pueden empezar a descomprimir en cualquier punto del archivo
+sin dividirlo antes en chunks temporales.
+
+El módulo zlib de la librería estándar no expone inflatePrime/Z_BLOCK, por lo
+que el índice se apoya en la librería opcional ``indexed_gzip``.
+"""
+
+import logging
+import sys
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from etl.engines import import_optional, module_available
+
+# indexed_gzip se importa al construir o abrir el primer índice
+HAS_INDEXED_GZIP = module_available('indexed_gzip')
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = '.gzidx'
+DEFAULT_SPACING_MB = 4
+
+
+def index_path_for(gz_path: Path) -> Path:
+    """Ruta del índice sidecar de un archivo gzip"""
+    return gz_path.with_name(gz_path.name + INDEX_SUFFIX)
+
+
+def build_gzip_index(gz_path: Path, spacing_mb: float = DEFAULT_SPACING_MB,
+                     index_file: Optional[Path] = None) -> Path:
+    """
+    Construye el índice de puntos de acceso de un archivo gzip
+
+    Args:
+        gz_path: Archivo gzip
+        spacing_mb: Distancia (MB sin comprimir) entre puntos de acceso
+        index_file: Ruta del índice (por defecto, <archivo>.gzidx)
+
+    Returns:
+        Ruta del índice generado
+    """
+    if not HAS_INDEXED_GZIP:
+        raise ImportError("El índice gzip requiere 'indexed_gzip' (pip install indexed_gzip)")
+
+    index_file = index_file or index_path_for(gz_path)
+    spacing = int(spacing_mb * 1024 * 1024)
+
+    logger.info(f"Indexando {gz_path} (punto de acceso cada {spacing_mb} MB)")
+    indexed_gzip = import_optional('indexed_gzip')
+    with indexed_gzip.IndexedGzipFile(str(gz_path), spacing=spacing) as f:
+        f.build_full_index()
+        f.export_index(str(index_file))
+        num_points = sum(1 for _ in f.seek_points())
+
+    logger.info(f"Índice generado: {index_file} ({num_points} puntos de acceso)")
+    return index_file
+
+
+def find_gzip_index(gz_path: Path) -> Optional[Path]:
+    """Índice sidecar vigente del archivo, o None si no existe o está desactualizado"""
+    if not HAS_INDEXED_GZIP:
+        return None
+    index_file = index_path_for(gz_path)
+    if not index_file.exists():
+        return None
+    if index_file.stat().st_mtime < gz_path.stat().st_mtime:
+        logger.warning(f"Índice gzip desactualizado, se ignora: {index_file}")
+        return None
+    return index_file
+
+
+def _open_indexed(gz_path: Path, index_file: Path):
+    return import_optional('indexed_gzip').IndexedGzipFile(
+        str(gz_path), index_file=str(index_file), auto_build=False, skip_crc_check=True
+    )
+
+
+def split_indexed_ranges(gz_path: Path, index_file: Path,
+                         num_ranges: int) -> List[Tuple[int, int]]:
+    """Divide el contenido descomprimido en rangos [inicio, fin) de tamaño similar"""
+    with _open_indexed(gz_path, index_file) as f:
+        size = f.seek(0, 2)
+
+    if size == 0:
+        return []
+    num_ranges = max(1, min(num_ranges, size))
+    bounds = [size * i // num_ranges for i in range(num_ranges + 1)]
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def iter_indexed_range_lines(gz_path: Path, index_file: Path,
+                             start: int, end: int) -> Iterator[bytes]:
+    """
+    Itera las líneas que empiezan dentro de [inicio, fin) del contenido descomprimido
+
+    Una línea pertenece al rango en el que empieza: si start > 0 se descarta la
+    línea parcial inicial, que procesa el rango anterior.
+    """
+    with _open_indexed(gz_path, index_file) as f:
+        if start > 0:
+            f.seek(start - 1)
+            position = start - 1 + len(f.readline())
+        else:
+            position = 0
+
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line
+
+
+def main():
+    """Indexa uno o varios archivos gzip desde línea de comandos"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Genera índices .gzidx de acceso aleatorio")
+    parser.add_argument('files', nargs='+', type=Path, help='Archivos .gz a indexar')
+    parser.add_argument(
+        '--spacing-mb',
+        type=float,
+        default=DEFAULT_SPACING_MB,
+        help=f'MB sin comprimir entre puntos de acceso (default: {DEFAULT_SPACING_MB})'
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    for gz_path in args.files:
+        build_gzip_index(gz_path, args.spacing_mb)
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,179 @@
+"""
+Tamaño de batch y número de workers derivados de un presupuesto de memoria
+
+A partir de --max-memory (acotado por el límite del cgroup) se estima cuántos
+workers caben y con qué batch inicial. Durante los primeros batches se mide
+el crecimiento de RSS por registro y el tamaño se ajusta en tiempo de
+ejecución para mantenerse dentro del presupuesto.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from etl.resources import cgroup_memory_limit, current_rss, memory_limit
+
+logger = logging.getLogger(__name__)
+
+MIN_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 1000000
+
+# Estimación inicial conservadora (registro JSON parseado + columnas del batch)
+INITIAL_BYTES_PER_RECORD = 2048
+
+# Memoria residente de un worker ocioso con pandas importado
+WORKER_BASE_MEMORY = 120 * 1024 * 1024
+
+# Fracción del margen que pueden ocupar los batches (resto: parseo, colas, agregados)
+BATCH_MEMORY_FRACTION = 0.5
+
+# Sin --max-memory, fracción del límite del cgroup que se usa como presupuesto
+CGROUP_BUDGET_FRACTION = 0.8
+
+
+def _clamp(value: int, low: int, high: int) -> int:
+    return max(low, min(high, value))
+
+
+def resolve_memory_budget(max_memory: Optional[int]) -> Optional[int]:
+    """
+    Presupuesto efectivo en bytes
+
+    - Con max_memory: se respeta, pero nunca por encima de la memoria utilizable
+    - Sin max_memory dentro de un contenedor con límite: una fracción del límite
+    - En otro caso: None (tamaños fijos)
+    """
+    if max_memory:
+        return min(max_memory, memory_limit())
+    limit = cgroup_memory_limit()
+    if limit:
+        return int(limit * CGROUP_BUDGET_FRACTION)
+    return None
+
+
+def plan_workers(budget: int, max_workers: int, baseline_rss: int = None) -> Dict[str, int]:
+    """
+    Número de procesos worker y presupuesto por worker
+
+    Args:
+        budget: Presupuesto total en bytes (proceso padre incluido)
+        max_workers: Máximo de workers (CPUs disponibles)
+        baseline_rss: RSS actual del proceso padre
+
+    Returns:
+        Dict con workers y worker_budget (RSS máximo por worker)
+    """
+    baseline_rss = current_rss() if baseline_rss is None else baseline_rss
+    usable = max(budget - baseline_rss, 0)
+    per_worker_min = WORKER_BASE_MEMORY + MIN_BATCH_SIZE * INITIAL_BYTES_PER_RECORD
+
+    workers = _clamp(usable // per_worker_min, 1, max_workers)
+    if usable < per_worker_min:
+        logger.warning(f"Presupuesto de memoria muy ajustado ({budget / 1024 ** 2:.0f} MB): "
+                       f"1 worker con batch mínimo")
+    return {'workers': workers, 'worker_budget': max(usable // workers, per_worker_min)}
+
+
+class AdaptiveBatchSizer:
+    """
+    Ajusta el tamaño de batch según la memoria medida por registro
+
+    Tras cada batch compara el RSS con el de partida: durante el calentamiento
+    toma la estimación más alta de bytes por registro y después una media
+    móvil. Si el proceso supera el presupuesto, el batch se reduce a la mitad
+    de inmediato; si sobra margen, crece como mucho al doble por paso.
+    Es seguro compartirlo entre hilos.
+
+    Args:
+        budget: RSS máximo del proceso en bytes
+        initial_size: Tamaño de batch inicial (por defecto, derivado del margen
+            con la estimación inicial de bytes por registro)
+        concurrent_batches: Batches vivos a la vez en el proceso (hilos de parseo)
+        warmup_batches: Batches de calibración
+    """
+
+    def __init__(self, budget: int, initial_size: Optional[int] = None,
+                 concurrent_batches: int = 1, warmup_batches: int = 3,
+                 min_size: int = MIN_BATCH_SIZE, max_size: int = MAX_BATCH_SIZE):
+        self.budget = budget
+        self.baseline_rss = current_rss()
+        self.headroom = max(budget - self.baseline_rss, 0)
+        self.concurrent_batches = max(1, concurrent_batches)
+        self.warmup_batches = warmup_batches
+        self.min_size = min_size
+        self.max_size = max_size
+        if initial_size is None:
+            initial_size = int(self.headroom * BATCH_MEMORY_FRACTION
+                               / (INITIAL_BYTES_PER_RECORD * self.concurrent_batches))
+        self.size = _clamp(initial_size, min_size, max_size)
+        self.initial_size = self.size
+        self.bytes_per_record: Optional[float] = None
+        self.peak_rss = self.baseline_rss
+        self.batches = 0
+        self.shrinks = 0
+        self.min_seen = self.max_seen = self.size
+        self._lock = threading.Lock()
+
+    def observe(self, records: int) -> int:
+        """
+        Registra un batch procesado y devuelve el tamaño para el siguiente
+
+        Args:
+            records: Registros que contenía el batch
+        """
+        rss = current_rss()
+        with self._lock:
+            self.batches += 1
+            self.peak_rss = max(self.peak_rss, rss)
+            used = max(rss - self.baseline_rss, 0)
+            sample = used / (max(records, 1) * self.concurrent_batches)
+
+            if self.bytes_per_record is None or self.batches <= self.warmup_batches:
+                self.bytes_per_record = max(self.bytes_per_record or 0.0, sample)
+            else:
+                self.bytes_per_record = 0.8 * self.bytes_per_record + 0.2 * sample
+
+            if used > self.headroom:
+                target = self.size // 2
+                self.shrinks += 1
+            else:
+                per_record = max(self.bytes_per_record, 1.0) * self.concurrent_batches
+                target = min(int(self.headroom * BATCH_MEMORY_FRACTION / per_record), self.size * 2)
+
+            self.size = _clamp(target, self.min_size, self.max_size)
+            self.min_seen = min(self.min_seen, self.size)
+            self.max_seen = max(self.max_seen, self.size)
+            return self.size
+
+    def report(self) -> Dict[str, Any]:
+        """Resumen del ajuste de batches"""
+        with self._lock:
+            return {
+                'memory_budget_mb': round(self.budget / 1024 ** 2, 1),
+                'peak_rss_mb': round(self.peak_rss / 1024 ** 2, 1),
+                'bytes_per_record': round(self.bytes_per_record or 0.0, 1),
+                'batch_size_initial': self.initial_size,
+                'batch_size_final': self.size,
+                'batch_size_min': self.min_seen,
+                'batch_size_max': self.max_seen,
+                'batches': self.batches,
+                'shrinks': self.shrinks
+            }
+
+
+def merge_batching_reports(reports) -> Optional[Dict[str, Any]]:
+    """Combina los resúmenes de varios workers (peor caso por campo)"""
+    reports = [r for r in reports if r]
+    if not reports:
+        return None
+    return {
+        'memory_budget_mb': reports[0]['memory_budget_mb'],
+        'peak_rss_mb': max(r['peak_rss_mb'] for r in reports),
+        'bytes_per_record': max(r['bytes_per_record'] for r in reports),
+        'batch_size_initial': reports[0]['batch_size_initial'],
+        'batch_size_final': min(r['batch_size_final'] for r in reports),
+        'batch_size_min': min(r['batch_size_min'] for r in reports),
+        'batch_size_max': max(r['batch_size_max'] for r in reports),
+        'batches': sum(r['batches'] for r in reports),
+        'shrinks': sum(r['shrinks'] for r in reports)
+    }
@@ -0,0 +1,67 @@
+"""
+Lectura paralela de archivos JSONL sin comprimir mediante mmap
+
+El archivo se divide en rangos de bytes alineados a fin de línea; cada worker
+mapea el archivo y recorre solo su rango, sin copiar líneas al proceso padre.
+"""
+
+import mmap
+import os
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+# Bytes por bloque al contar líneas de un rango
+_COUNT_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+def split_byte_ranges(path: Path, num_ranges: int) -> List[Tuple[int, int]]:
+    """
+    Divide un archivo en rangos [inicio, fin) que terminan en salto de línea
+
+    Args:
+        path: Archivo sin comprimir
+        num_ranges: Número de rangos deseado
+
+    Returns:
+        Lista de rangos no vacíos que cubren el archivo completo
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    num_ranges = max(1, min(num_ranges, size))
+
+    boundaries = [0]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in range(1, num_ranges):
+            target = max(size * i // num_ranges, boundaries[-1])
+            newline = mm.find(b'\n', target)
+            if newline == -1:
+                break
+            boundary = newline + 1
+            if boundary > boundaries[-1] and boundary < size:
+                boundaries.append(boundary)
+    boundaries.append(size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def count_range_lines(path: Path, start: int, end: int) -> int:
+    """Cuenta los saltos de línea de un rango (por bloques, sin recorrer línea a línea)"""
+    if end <= start:
+        return 0
+    count = 0
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for pos in range(start, end, _COUNT_BLOCK_BYTES):
+            count += mm[pos:min(pos + _COUNT_BLOCK_BYTES, end)].count(b'\n')
+    return count
+
+
+def iter_range_lines(path: Path, start: int, end: int) -> Iterator[bytes]:
+    """Itera las líneas de un rango leyendo directamente del archivo mapeado"""
+    if end <= start:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        mm.seek(start)
+        readline = mm.readline
+        while mm.tell() < end:
+            yield readline()
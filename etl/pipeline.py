@@ -0,0 +1,82 @@
+"""
+Pipeline por etapas en hilos conectadas con colas acotadas
+
+Las colas limitan la memoria en vuelo (backpressure) y registran su ocupación
+para poder ajustar tamaños de cola y número de workers.
+"""
+
+import logging
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marca de fin de flujo entre etapas
+END_OF_STREAM = object()
+
+
+class MonitoredQueue(queue.Queue):
+    """Cola acotada que mide su ocupación en cada put()"""
+
+    def __init__(self, name: str, maxsize: int):
+        if maxsize <= 0:
+            raise ValueError(f"La cola {name} debe ser acotada: maxsize={maxsize}")
+        super().__init__(maxsize)
+        self.name = name
+        self._puts = 0
+        self._occupancy_sum = 0
+        self._max_occupancy = 0
+        self._full_waits = 0
+
+    def put(self, item: Any, block: bool = True, timeout: float = None):
+        with self.mutex:
+            occupancy = self._qsize()
+            self._puts += 1
+            self._occupancy_sum += occupancy
+            self._max_occupancy = max(self._max_occupancy, occupancy)
+            if occupancy >= self.maxsize:
+                # El productor va a bloquearse: el consumidor es el cuello de botella
+                self._full_waits += 1
+        super().put(item, block, timeout)
+
+    def occupancy_report(self) -> Dict[str, Any]:
+        """Resumen de ocupación de la cola"""
+        with self.mutex:
+            return {
+                'queue': self.name,
+                'maxsize': self.maxsize,
+                'items': self._puts,
+                'avg_occupancy': round(self._occupancy_sum / self._puts, 2) if self._puts else 0.0,
+                'max_occupancy': self._max_occupancy,
+                'full_waits': self._full_waits
+            }
+
+
+class StagePipeline:
+    """Ejecuta cada etapa en su propio hilo y propaga el primer error"""
+
+    def __init__(self):
+        self._stages: List[threading.Thread] = []
+        self.errors: List[Tuple[str, BaseException]] = []
+
+    def add_stage(self, name: str, target: Callable, *args):
+        thread = threading.Thread(target=self._run_stage, args=(name, target, args),
+                                  name=name, daemon=True)
+        self._stages.append(thread)
+
+    def _run_stage(self, name: str, target: Callable, args: tuple):
+        try:
+            target(*args)
+        except BaseException as e:
+            logger.error(f"Error en etapa {name}: {e}")
+            self.errors.append((name, e))
+
+    def run(self):
+        """Lanza todas las etapas y espera a que terminen"""
+        for thread in self._stages:
+            thread.start()
+        for thread in self._stages:
+            thread.join()
+        if self.errors:
+            raise self.errors[0][1]
@@ -3,16 +3,210 @@ ETL Processor para manejo de transacciones
 """
 
 import logging
+import os
+import pickle
+import tempfile
+import time
 import pandas as pd
-import sqlite3
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-import gzip
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 import json
 from datetime import datetime
 
+from etl.bulk_load import BulkLoader, bulk_load
+from etl.compression import open_compressed
+from etl.engines import import_optional, module_available
+from etl.incremental import UpsertLoader, upsert_load
+from etl.parallel_csv import DEFAULT_PARALLEL_MIN_BYTES, iter_transactions_csv_parallel, use_parallel_read
+from etl.polars_engine import HAS_POLARS, polars_supported, process_transactions_polars
+from etl.resources import available_cpus
+from etl.result_cache import ResultCache
+from etl.schema import TIMESTAMP_COLUMNS, concat_transactions, read_transactions_csv
+from etl.transform import TRANSFORM_VERSION, clean_transactions, merge_quality_reports
+from etl.worker_pool import WorkerPool
+
+HAS_PYARROW = module_available('pyarrow')
+
 logger = logging.getLogger(__name__)
 
+# Filas por chunk cuando no se indica chunk_size (extract_chunks, process_directory)
+DEFAULT_CHUNK_SIZE = 100000
+
+TABLE_NAME = 'transactions'
+
+# Motores de process_file: pandas (por chunks o en memoria) o polars (lazy + sink)
+TRANSACTION_ENGINES = ('pandas', 'polars')
+
+# Archivos que recoge process_directory (CSV o log, planos o comprimidos)
+DIRECTORY_SUFFIXES = ('.csv', '.log')
+
+# El servidor de forkserver importa el procesador antes de bifurcar workers
+DIRECTORY_PRELOAD = ['etl.processor']
+
+
+def is_input_file(path: Path) -> bool:
+    """Archivo de datos de entrada (data.csv, data.csv.gz, app.log.zst...)"""
+    return path.is_file() and any(s in DIRECTORY_SUFFIXES for s in path.suffixes)
+
+
+def _process_file_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Worker de process_directory: extract + transform de un archivo
+    
+    Los chunks transformados se serializan uno a uno en un archivo de spool
+    (memoria acotada por chunk, no por archivo) y el proceso padre los carga
+    en cuanto el archivo termina. Todos deben tener las mismas columnas, que
+    se devuelven en las métricas para que el padre valide el archivo antes
+    de escribir ningún chunk.
+    """
+    start = time.perf_counter()
+    file_path = Path(task['file'])
+    spool = Path(task['spool'])
+    processor = ETLProcessor(Path(task['data_dir']))
+    records_input = records_output = chunks = 0
+    columns = None
+    metrics = {'input_file': str(file_path), 'worker_pid': os.getpid()}
+    
+    try:
+        with open(spool, 'wb') as f:
+            for chunk in processor.extract_chunks(file_path, task['chunk_size']):
+                records_input += len(chunk)
+                clean = processor.transform(chunk)
+                if len(clean):
+                    if columns is None:
+                        columns = list(clean.columns)
+                    elif set(clean.columns) != set(columns):
+                        raise ValueError(f"Columnas distintas entre chunks del archivo: "
+                                         f"{columns} y {list(clean.columns)}")
+                    pickle.dump(clean, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    records_output += len(clean)
+                    chunks += 1
+    except Exception as e:
+        logger.error(f"Error procesando {file_path}: {e}")
+        spool.unlink(missing_ok=True)
+        metrics.update({'status': 'error', 'error': str(e),
+                        'seconds': round(time.perf_counter() - start, 3)})
+        return metrics
+    
+    metrics.update({
+        'status': 'success',
+        'records_input': records_input,
+        'records_output': records_output,
+        'chunks': chunks,
+        'columns': columns,
+        'quality': processor.quality,
+        'rejections': processor.quality['rejections'] if processor.quality else {},
+        'seconds': round(time.perf_counter() - start, 3),
+        'spool': str(spool)
+    })
+    return metrics
+
+
+def _read_spool(spool: Path) -> Iterator[pd.DataFrame]:
+    """Chunks serializados por _process_file_task, en orden"""
+    with open(spool, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+class ChunkSink:
+    """
+    Destino de la carga por chunks
+    
+    Cada chunk se añade al archivo de salida (CSV, o Parquet si la extensión es
+    .parquet) y a la tabla SQLite mediante la carga masiva. Toda la escritura en
+    SQLite ocurre en una única transacción: si algo falla, la tabla anterior
+    queda intacta.
+    
+    Args:
+        output_path: Archivo de salida (.csv o .parquet)
+        db_path: Base de datos SQLite
+        table: Tabla destino (se reemplaza, o upsert por order_id si incremental)
+        incremental: Carga incremental con marca de agua en lugar de reemplazo
+    """
+    
+    def __init__(self, output_path: Path, db_path: Path, table: str = TABLE_NAME,
+                 incremental: bool = False):
+        self.output_path = output_path
+        self.db_path = db_path
+        self.table = table
+        self.records = 0
+        self.chunks = 0
+        self.loader = UpsertLoader(db_path, table) if incremental else BulkLoader(db_path, table)
+        self._columns = None
+        self._csv = None
+        self._parquet = None
+        self._schema = None
+    
+    def __enter__(self):
+        self.loader.__enter__()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.loader.__exit__(exc_type, exc, tb)
+        finally:
+            if self._csv is not None:
+                self._csv.close()
+            if self._parquet is not None:
+                self._parquet.close()
+        if exc_type is None and self._columns is None:
+            # Ningún chunk (ni siquiera con esquema): salida vacía en lugar de la anterior
+            self._write_empty_output()
+    
+    def write(self, df: pd.DataFrame):
+        """
+        Añade un chunk transformado a todos los destinos
+        
+        Las columnas deben coincidir con las del primer chunk (en cualquier
+        orden); si no, se lanza ValueError antes de escribir nada del chunk.
+        """
+        if self._columns is None:
+            self._open(df)
+        elif not self.accepts(df.columns):
+            missing = [c for c in self._columns if c not in df.columns]
+            extra = [c for c in df.columns if c not in self._columns]
+            raise ValueError(f"Columnas del chunk {self.chunks + 1} distintas de las del primero "
+                             f"(faltan: {missing}; sobran: {extra})")
+        df = df[self._columns]
+        
+        if self._parquet is not None:
+            pa = import_optional('pyarrow')
+            self._parquet.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+        else:
+            df.to_csv(self._csv, index=False, header=self.chunks == 0)
+        
+        self.loader.write(df)
+        self.records += len(df)
+        self.chunks += 1
+    
+    def accepts(self, columns: Iterable[str]) -> bool:
+        """Indica si las columnas (de un chunk) coinciden con las ya escritas"""
+        return self._columns is None or set(columns) == set(self._columns)
+    
+    def _write_empty_output(self):
+        if self.output_path.suffix == '.parquet':
+            pa = import_optional('pyarrow')
+            import_optional('pyarrow.parquet').write_table(pa.table({}), self.output_path)
+        else:
+            self.output_path.write_text('', encoding='utf-8')
+    
+    def _open(self, df: pd.DataFrame):
+        """Crea los archivos de salida con el esquema del primer chunk"""
+        self._columns = list(df.columns)
+        
+        if self.output_path.suffix == '.parquet':
+            pa = import_optional('pyarrow')
+            pq = import_optional('pyarrow.parquet')
+            self._schema = pa.Schema.from_pandas(df, preserve_index=False)
+            self._parquet = pq.ParquetWriter(self.output_path, self._schema, compression='snappy')
+        else:
+            self._csv = open(self.output_path, 'w', newline='', encoding='utf-8')
+
 
 class ETLProcessor:
     """Procesador ETL para archivos de transacciones"""
@@ -22,6 +216,30 @@ class ETLProcessor:
         self.raw_dir = self.data_dir / "raw"
         self.processed_dir = self.data_dir / "processed"
         
+        # Filas por chunk de process_file (None = archivo completo en memoria;
+        # con un valor, memoria independiente del tamaño del archivo)
+        self.chunk_size: Optional[int] = None
+        
+        # Carga en SQLite: reemplazo completo o upsert incremental por order_id
+        self.incremental = False
+        
+        # Rechazos por regla acumulados por transform (se reinicia en process_file)
+        self.quality: Optional[Dict] = None
+        
+        # Caché de resultados de process_file (None = siempre se recalcula)
+        self.cache: Optional[ResultCache] = None
+        
+        # Motor usado y resultado de la caché en el último process_file
+        self.last_run: Optional[Dict] = None
+        
+        # Motor de process_file (ver TRANSACTION_ENGINES)
+        self.engine = 'pandas'
+        
+        # Lectura de CSV planos grandes por rangos de bytes en paralelo
+        # (read_workers None = CPUs utilizables; 1 = siempre en secuencia)
+        self.read_workers: Optional[int] = None
+        self.parallel_read_min_bytes = DEFAULT_PARALLEL_MIN_BYTES
+        
         # Crear directorios si no existen
         self.raw_dir.mkdir(parents=True, exist_ok=True)
         self.processed_dir.mkdir(parents=True, exist_ok=True)
@@ -42,15 +260,18 @@ class ETLProcessor:
             raise FileNotFoundError(f"Archivo no encontrado: {file_path}")
         
         try:
-            if file_path.suffix == '.gz':
-                # Manejar archivos comprimidos
-                if file_path.name.endswith('.log.gz'):
-                    return self._extract_log_gz(file_path)
-                else:
-                    with gzip.open(file_path, 'rt') as f:
-                        df = pd.read_csv(f)
+            # Logs (planos o comprimidos; el códec se detecta por magic bytes)
+            if '.log' in file_path.suffixes:
+                batches = list(self._extract_log_gz(file_path))
+                df = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
+                logger.info(f"Extraídas {len(df)} filas")
+                return df
+            
+            # CSV plano o comprimido con el esquema de transacciones
+            if use_parallel_read(file_path, self._read_workers(), self.parallel_read_min_bytes):
+                df = concat_transactions(list(self._iter_csv(file_path, self._chunk_rows())))
             else:
-                df = pd.read_csv(file_path)
+                df = read_transactions_csv(file_path)
             
             logger.info(f"Extraídas {len(df)} filas")
             return df
@@ -59,28 +280,103 @@ class ETLProcessor:
             logger.error(f"Error extrayendo datos: {e}")
             raise
     
-    def _extract_log_gz(self, file_path: Path) -> pd.DataFrame:
-        """Extrae datos de archivo log comprimido"""
-        records = []
+    def extract_chunks(self, file_path: Path, chunk_size: int = None) -> Iterator[pd.DataFrame]:
+        """
+        Extrae el archivo como una secuencia de DataFrames de chunk_size filas
+        
+        Args:
+            file_path: Ruta al archivo (CSV o log, planos o comprimidos)
+            chunk_size: Filas (o líneas de log) por chunk (por defecto self.chunk_size,
+                o DEFAULT_CHUNK_SIZE si no está fijado)
+        """
+        logger.info(f"Extrayendo datos por chunks de: {file_path}")
         
-        with gzip.open(file_path, 'rt') as f:
-            for line_num, line in enumerate(f, 1):
-                try:
-                    # Parsear línea de log (formato JSON esperado)
-                    if line.strip():
-                        record = json.loads(line.strip())
-                        records.append(record)
-                        
-                        # Procesar en lotes para archivos grandes
-                        if line_num % 100000 == 0:
-                            logger.info(f"Procesadas {line_num} líneas")
-                            
-                except json.JSONDecodeError:
-                    # Si no es JSON, parsear como log estructurado
-                    record = self._parse_log_line(line)
-                    if record:
-                        records.append(record)
+        if not file_path.exists():
+            raise FileNotFoundError(f"Archivo no encontrado: {file_path}")
         
+        chunk_size = self._chunk_rows(chunk_size)
+        if '.log' in file_path.suffixes:
+            yield from self._extract_log_gz(file_path, chunk_size)
+        else:
+            yield from self._iter_csv(file_path, chunk_size)
+    
+    def _read_workers(self) -> int:
+        return self.read_workers or available_cpus()
+    
+    def _chunk_rows(self, chunk_size: int = None) -> int:
+        return chunk_size or self.chunk_size or DEFAULT_CHUNK_SIZE
+    
+    def _iter_csv(self, file_path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """Chunks de un CSV: en paralelo por rangos si es grande, si no en secuencia"""
+        return iter_transactions_csv_parallel(file_path, chunk_size, self._read_workers(),
+                                              self.parallel_read_min_bytes)
+    
+    def _extract_log_gz(self, file_path: Path, batch_size: int = None) -> Iterator[pd.DataFrame]:
+        """
+        Extrae un log plano o comprimido (cualquier códec soportado) en lotes de registros
+        
+        Cada lote de batch_size líneas se convierte en columnas de una vez: con
+        pyarrow el bloque de líneas JSON se parsea con pyarrow.json; sin él, o si
+        el lote contiene líneas que no son JSON, línea a línea (las que no son
+        JSON pasan por _parse_log_line) y un DataFrame por lote. La memoria
+        depende del tamaño de lote, no del archivo.
+        
+        Args:
+            file_path: Ruta al log
+            batch_size: Líneas por lote (por defecto, como extract_chunks)
+        """
+        batch_size = self._chunk_rows(batch_size)
+        lines: List[bytes] = []
+        line_num = 0
+        
+        with open_compressed(file_path, 'rb') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                lines.append(line)
+                line_num += 1
+                if len(lines) >= batch_size:
+                    yield self._log_batch(lines)
+                    lines = []
+                    logger.info(f"Procesadas {line_num} líneas")
+        
+        if lines:
+            yield self._log_batch(lines)
+    
+    def _log_batch(self, lines: List[bytes]) -> pd.DataFrame:
+        """Convierte un lote de líneas de log en DataFrame"""
+        if HAS_PYARROW and all(line.startswith(b'{') for line in lines):
+            pa_json = import_optional('pyarrow.json')
+            pa = import_optional('pyarrow')
+            block = b'\n'.join(lines) + b'\n'
+            # Los timestamps se mantienen como texto, igual que con json.loads
+            # (pyarrow los convertiría o no según el formato de cada lote)
+            text_fields = pa.schema([(name, pa.string()) for name in TIMESTAMP_COLUMNS])
+            try:
+                # Un único bloque: los tipos se infieren sobre el lote completo
+                table = pa_json.read_json(
+                    pa.py_buffer(block),
+                    read_options=pa_json.ReadOptions(block_size=len(block) + 1),
+                    parse_options=pa_json.ParseOptions(explicit_schema=text_fields,
+                                                       unexpected_field_behavior='infer'))
+                absent = [name for name in TIMESTAMP_COLUMNS
+                          if table.column(name).null_count == table.num_rows]
+                return table.drop_columns(absent).to_pandas()
+            except pa.ArrowInvalid:
+                # JSON inválido o tipos incompatibles: se resuelve línea a línea
+                pass
+        
+        records = []
+        for line in lines:
+            try:
+                # Parsear línea de log (formato JSON esperado)
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Si no es JSON, parsear como log estructurado
+                record = self._parse_log_line(line.decode('utf-8', errors='replace'))
+                if record:
+                    records.append(record)
         return pd.DataFrame(records)
     
     def _parse_log_line(self, line: str) -> Optional[Dict]:
@@ -114,28 +410,12 @@ class ETLProcessor:
             logging.warning("DataFrame vacío recibido para transformación")
             return df
         
-        df_clean = df.copy()
-        
-        # Limpiar y normalizar columnas
-        if 'timestamp' in df_clean.columns:
-            df_clean['timestamp'] = pd.to_datetime(df_clean['timestamp'], errors='coerce')
-        elif 'ts' in df_clean.columns:
-            df_clean['timestamp'] = pd.to_datetime(df_clean['ts'], errors='coerce')
-            df_clean = df_clean.drop('ts', axis=1)
-        
-        # Limpiar valores nulos
-        df_clean = df_clean.dropna()
-        
-        # Normalizar nombres de columnas solo si hay columnas
-        if len(df_clean.columns) > 0:
-            df_clean.columns = df_clean.columns.str.lower().str.strip()
-        
-        # Validaciones específicas para transacciones
-        if 'amount' in df_clean.columns:
-            df_clean = df_clean[df_clean['amount'] > 0]
+        # Normalizar nombres de columnas (rename no copia los datos)
+        df = df.rename(columns=lambda c: str(c).lower().strip())
         
-        if 'user_id' in df_clean.columns:
-            df_clean = df_clean[df_clean['user_id'].notna()]
+        # Una sola máscara de validez (nulos, timestamp, amount > 0, user_id)
+        df_clean, report = clean_transactions(df)
+        self.quality = merge_quality_reports(self.quality, report)
         
         logger.info(f"Transformación completa: {len(df_clean)} registros válidos")
         return df_clean
@@ -146,30 +426,39 @@ class ETLProcessor:
         
         Args:
             df: DataFrame a cargar
-            output_path: Ruta de salida (opcional)
+            output_path: Ruta de salida (.csv o .parquet; opcional)
             
         Returns:
             Dict con resultado de la carga
         """
         if output_path is None:
             output_path = self.processed_dir / "cleaned_transactions.csv"
+        if output_path.suffix == '.parquet' and not HAS_PYARROW:
+            raise ImportError("La salida Parquet requiere pyarrow")
         
         logger.info(f"Cargando {len(df)} registros a: {output_path}")
         
         try:
-            # Guardar como CSV
-            df.to_csv(output_path, index=False)
+            # Guardar como CSV (o Parquet según la extensión)
+            if output_path.suffix == '.parquet':
+                df.to_parquet(output_path, index=False, compression='snappy')
+            else:
+                df.to_csv(output_path, index=False)
             
-            # También guardar en SQLite para queries
+            # También guardar en SQLite para queries (carga masiva o incremental)
             db_path = self.processed_dir / "transactions.db"
-            with sqlite3.connect(db_path) as conn:
-                df.to_sql('transactions', conn, if_exists='replace', index=False)
+            if self.incremental:
+                load_report = upsert_load(df, db_path, TABLE_NAME)
+            else:
+                load_report = bulk_load(df, db_path, TABLE_NAME)
             
             result = {
                 'status': 'success',
                 'records': len(df),
                 'output_file': str(output_path),
-                'database': str(db_path)
+                'database': str(db_path),
+                'load_mode': 'upsert' if self.incremental else 'replace',
+                'rows_per_second': load_report['rows_per_second']
             }
             
             logger.info(f"Carga exitosa: {result}")
@@ -179,13 +468,71 @@ class ETLProcessor:
             logger.error(f"Error en carga: {e}")
             raise
     
-    def process_file(self, input_path: Path, output_path: Path = None) -> Dict:
+    def load_chunks(self, chunks: Iterable[pd.DataFrame], output_path: Path = None) -> Dict:
+        """
+        Carga chunks transformados a medida que llegan
+        
+        Args:
+            chunks: DataFrames transformados
+            output_path: Ruta de salida (.csv o .parquet; opcional)
+            
+        Returns:
+            Dict con resultado de la carga (mismas claves que load)
+        """
+        if output_path is None:
+            output_path = self.processed_dir / "cleaned_transactions.csv"
+        if output_path.suffix == '.parquet' and not HAS_PYARROW:
+            raise ImportError("La salida Parquet requiere pyarrow")
+        db_path = self.processed_dir / "transactions.db"
+        
+        logger.info(f"Cargando por chunks a: {output_path}")
+        
+        try:
+            with ChunkSink(output_path, db_path, incremental=self.incremental) as sink:
+                for chunk in chunks:
+                    sink.write(chunk)
+            
+            result = {
+                'status': 'success',
+                'records': sink.records,
+                'output_file': str(output_path),
+                'database': str(db_path),
+                'load_mode': 'upsert' if self.incremental else 'replace',
+                'rows_per_second': sink.loader.report()['rows_per_second']
+            }
+            
+            logger.info(f"Carga exitosa ({sink.chunks} chunks): {result}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error en carga: {e}")
+            raise
+    
+    def process_file(self, input_path: Path, output_path: Path = None,
+                     chunk_size: int = None) -> Dict:
         """
         Procesa archivo completo ETL
         
+        Con chunk_size (o self.chunk_size) trabaja por chunks: extract produce
+        chunks, transform se aplica a cada uno y load los añade a la salida y
+        a SQLite, de modo que la memoria pico no depende del tamaño del
+        archivo. Sin él, el archivo completo se procesa en memoria.
+        
+        Con self.engine = 'polars' los CSV de transacciones se procesan con
+        scan_csv, filtros lazy y un sink en streaming (los logs siguen por el
+        camino pandas).
+        
+        Con self.cache, si el contenido de la entrada y la versión de las
+        reglas coinciden con una ejecución anterior, se restauran sus salidas
+        sin procesar (la carga incremental no usa la caché: depende de la base).
+        
+        El motor usado y el resultado de la caché quedan en self.last_run, y
+        los rechazos por regla en self.quality.
+        
         Args:
             input_path: Archivo de entrada
-            output_path: Archivo de salida (opcional)
+            output_path: Archivo de salida (opcional, .csv o .parquet)
+            chunk_size: Filas por chunk (por defecto self.chunk_size; None o 0 = sin chunks)
             
         Returns:
             Dict con métricas del procesamiento
@@ -193,15 +540,39 @@ class ETLProcessor:
         start_time = datetime.now()
         logger.info(f"Iniciando procesamiento ETL: {input_path}")
         
+        chunk_size = self.chunk_size if chunk_size is None else chunk_size
+        self.quality = None
+        self.last_run = None
+        if output_path is None:
+            output_path = self.processed_dir / "cleaned_transactions.csv"
+        
         try:
-            # Extract
-            df_raw = self.extract(input_path)
-            
-            # Transform
-            df_clean = self.transform(df_raw)
+            cache_key = self._cache_key(input_path, output_path)
+            if cache_key is not None:
+                cached = self.cache.restore(cache_key, self._cache_outputs(output_path))
+                if cached is not None:
+                    processing_time = (datetime.now() - start_time).total_seconds()
+                    logger.info(f"ETL omitido, salidas restauradas de la caché: {cache_key}")
+                    self.last_run = {'engine': None, 'cache': 'hit'}
+                    return {**cached, 'processing_time_seconds': processing_time}
             
-            # Load
-            result = self.load(df_clean, output_path)
+            engine = self._engine_for(input_path)
+            if engine == 'polars':
+                records_input, records_output, result = self._process_polars(input_path, output_path)
+            elif chunk_size:
+                records_input, records_output, result = self._process_chunked(
+                    input_path, output_path, chunk_size
+                )
+            else:
+                # Extract
+                df_raw = self.extract(input_path)
+                
+                # Transform
+                df_clean = self.transform(df_raw)
+                
+                # Load
+                result = self.load(df_clean, output_path)
+                records_input, records_output = len(df_raw), len(df_clean)
             
             # Métricas
             end_time = datetime.now()
@@ -210,13 +581,18 @@ class ETLProcessor:
             metrics = {
                 'input_file': str(input_path),
                 'output_file': result['output_file'],
-                'records_input': len(df_raw),
-                'records_output': len(df_clean),
+                'records_input': records_input,
+                'records_output': records_output,
                 'processing_time_seconds': processing_time,
-                'compression_ratio': len(df_clean) / len(df_raw) if len(df_raw) > 0 else 0,
+                'compression_ratio': records_output / records_input if records_input > 0 else 0,
                 'status': 'success'
             }
             
+            self.last_run = {'engine': engine, 'cache': None}
+            if cache_key is not None:
+                self.cache.store(cache_key, self._cache_outputs(output_path), metrics)
+                self.last_run['cache'] = 'miss'
+            
             logger.info(f"ETL completado: {metrics}")
             return metrics
             
@@ -227,6 +603,180 @@ class ETLProcessor:
                 'error': str(e),
                 'input_file': str(input_path)
             }
+    
+    def _cache_key(self, input_path: Path, output_path: Path) -> Optional[str]:
+        """Clave de caché de process_file, o None si no se usa la caché"""
+        if self.cache is None or self.incremental:
+            return None
+        config = {'transform_version': TRANSFORM_VERSION, 'table': TABLE_NAME,
+                  'output_format': output_path.suffix, 'engine': self.engine}
+        return self.cache.key('etl', [input_path], config)
+    
+    def _cache_outputs(self, output_path: Path) -> Dict[str, Path]:
+        return {'output': output_path, 'database': self.processed_dir / "transactions.db"}
+    
+    def _engine_for(self, input_path: Path) -> str:
+        """Motor con el que se procesa el archivo"""
+        if self.engine not in TRANSACTION_ENGINES:
+            raise ValueError(f"Motor desconocido: {self.engine} (disponibles: {', '.join(TRANSACTION_ENGINES)})")
+        if self.engine == 'polars':
+            if not HAS_POLARS:
+                raise ImportError("El motor polars requiere la librería polars")
+            if not polars_supported(input_path):
+                logger.warning(f"{input_path} no es un CSV de transacciones; se procesa con pandas")
+                return 'pandas'
+        return self.engine
+    
+    def _process_polars(self, input_path: Path, output_path: Path) -> Tuple[int, int, Dict]:
+        """ETL con el motor polars; devuelve filas de entrada, salida y carga"""
+        if output_path.suffix == '.parquet' and not HAS_PYARROW:
+            raise ImportError("La salida Parquet requiere pyarrow")
+        db_path = self.processed_dir / "transactions.db"
+        result = process_transactions_polars(input_path, output_path, db_path, TABLE_NAME,
+                                             incremental=self.incremental)
+        self.quality = result['quality']
+        load = {
+            'status': 'success',
+            'records': result['records_output'],
+            'output_file': str(output_path),
+            'database': str(db_path),
+            'load_mode': 'upsert' if self.incremental else 'replace',
+            'rows_per_second': result['load']['rows_per_second']
+        }
+        return result['records_input'], result['records_output'], load
+    
+    def _process_chunked(self, input_path: Path, output_path: Optional[Path],
+                         chunk_size: int) -> Tuple[int, int, Dict]:
+        """Extract -> transform -> load chunk a chunk; devuelve filas de entrada, salida y carga"""
+        counts = {'input': 0}
+        
+        def transformed_chunks():
+            for chunk in self.extract_chunks(input_path, chunk_size):
+                counts['input'] += len(chunk)
+                yield self.transform(chunk)
+        
+        result = self.load_chunks(transformed_chunks(), output_path)
+        return counts['input'], result['records'], result
+    
+    def process_directory(self, raw_dir: Path = None, pattern: str = '*',
+                          workers: int = None, output_path: Path = None,
+                          chunk_size: int = None) -> Dict:
+        """
+        Procesa todos los archivos de un directorio en paralelo
+        
+        Cada archivo (CSV o log, planos o comprimidos) se extrae y
+        transforma por chunks en un worker del pool. Un único escritor en el
+        padre añade los resultados a la salida y a SQLite en el orden de los
+        archivos, cada uno en cuanto está listo, mientras los workers siguen
+        con los siguientes: las escrituras en la base quedan serializadas en
+        una sola transacción. El primer archivo fija el esquema; un archivo
+        que falla o cuyas columnas no coinciden se omite y se informa. Con un
+        solo worker no se arranca el pool.
+        
+        Args:
+            raw_dir: Directorio de entrada (por defecto self.raw_dir)
+            pattern: Patrón glob de los archivos
+            workers: Procesos del pool (por defecto las CPUs disponibles)
+            output_path: Archivo de salida (opcional, .csv o .parquet)
+            chunk_size: Filas por chunk (por defecto como extract_chunks)
+            
+        Returns:
+            Dict con métricas totales y por archivo
+        """
+        start_time = datetime.now()
+        raw_dir = Path(raw_dir) if raw_dir else self.raw_dir
+        files = sorted(p for p in raw_dir.glob(pattern) if is_input_file(p))
+        if not files:
+            logger.warning(f"Sin archivos '{pattern}' en {raw_dir}")
+            return {'status': 'error', 'error': f"Sin archivos '{pattern}' en {raw_dir}",
+                    'input_dir': str(raw_dir)}
+        
+        workers = min(workers or available_cpus(), len(files))
+        chunk_size = self._chunk_rows(chunk_size)
+        if output_path is None:
+            output_path = self.processed_dir / "cleaned_transactions.csv"
+        if output_path.suffix == '.parquet' and not HAS_PYARROW:
+            raise ImportError("La salida Parquet requiere pyarrow")
+        db_path = self.processed_dir / "transactions.db"
+        self.quality = None
+        file_metrics = []
+        pool = None
+        
+        logger.info(f"Procesando {len(files)} archivos de {raw_dir} con {workers} workers")
+        
+        try:
+            with tempfile.TemporaryDirectory(prefix='.spool_', dir=self.processed_dir) as spool_dir:
+                tasks = [{'file': str(path), 'spool': str(Path(spool_dir) / f'{i}.pkl'),
+                          'data_dir': str(self.data_dir), 'chunk_size': chunk_size}
+                         for i, path in enumerate(files)]
+                if workers > 1:
+                    pool = WorkerPool(workers, preload=DIRECTORY_PRELOAD)
+                with pool or nullcontext(), \
+                        ChunkSink(output_path, db_path, incremental=self.incremental) as sink:
+                    results = pool.imap(_process_file_task, tasks) if pool else map(_process_file_task, tasks)
+                    for result in results:
+                        spool = result.pop('spool', None)
+                        quality = result.pop('quality', None)
+                        columns = result.pop('columns', None)
+                        if result['status'] == 'success':
+                            self._load_spool(Path(spool), sink, result, columns)
+                        if result['status'] == 'success' and quality:
+                            self.quality = merge_quality_reports(self.quality, quality)
+                        file_metrics.append(result)
+                        logger.info(f"Archivo terminado: {result}")
+        except Exception as e:
+            logger.error(f"Error en procesamiento del directorio: {e}")
+            return {'status': 'error', 'error': str(e), 'input_dir': str(raw_dir)}
+        
+        loaded = [m for m in file_metrics if m['status'] == 'success']
+        records_input = sum(m['records_input'] for m in loaded)
+        processing_time = (datetime.now() - start_time).total_seconds()
+        if len(loaded) == len(files):
+            status = 'success'
+        else:
+            status = 'partial' if loaded else 'error'
+        
+        metrics = {
+            'input_dir': str(raw_dir),
+            'output_file': str(output_path),
+            'database': str(db_path),
+            'files': file_metrics,
+            'files_processed': len(loaded),
+            'files_failed': len(files) - len(loaded),
+            'workers': workers,
+            'pool_startup_seconds': round(pool.startup_seconds, 3) if pool else 0.0,
+            'records_input': records_input,
+            'records_output': sink.records,
+            'processing_time_seconds': processing_time,
+            'rows_per_second': round(records_input / processing_time) if processing_time > 0 else 0,
+            'load_mode': 'upsert' if self.incremental else 'replace',
+            'rejections': self.quality['rejections'] if self.quality else {},
+            'status': status
+        }
+        
+        logger.info(f"ETL del directorio completado: {len(loaded)}/{len(files)} archivos, "
+                    f"{sink.records:,} registros")
+        return metrics
+    
+    @staticmethod
+    def _load_spool(spool: Path, sink: ChunkSink, result: Dict, columns: Optional[List[str]]):
+        """
+        Pasa los chunks de un archivo al escritor único
+        
+        El worker garantiza que todos los chunks del spool tienen las columnas
+        indicadas, así que el archivo se valida entero antes de escribir: si no
+        encaja con lo ya cargado se marca como fallido sin dejar filas suyas.
+        """
+        try:
+            if columns is not None and not sink.accepts(columns):
+                result.update({'status': 'error',
+                               'error': f"Columnas distintas de las ya cargadas: {columns}"})
+                logger.warning(f"{result['input_file']} omitido: {result['error']}")
+                return
+            for chunk in _read_spool(spool):
+                sink.write(chunk)
+        finally:
+            spool.unlink(missing_ok=True)
 
 
 def main():
@@ -0,0 +1,148 @@
+"""
+Detección de recursos disponibles para el proceso (host o contenedor)
+
+Dentro de Docker/Kubernetes los límites reales vienen de cgroups, no del
+total del host que reportan psutil, /proc/meminfo u os.cpu_count().
+"""
+
+import math
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import psutil
+
+CGROUP_ROOT = Path('/sys/fs/cgroup')
+
+# cgroup v1 usa un valor enorme (cercano a 2^63) para "sin límite"
+_CGROUP_V1_UNLIMITED = 1 << 60
+
+# Variables que fijan el tamaño de los pools de hilos nativos (BLAS, polars...)
+NATIVE_THREAD_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                      'NUMEXPR_MAX_THREADS', 'POLARS_MAX_THREADS')
+
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_memory_size(value: str) -> int:
+    """
+    Convierte un tamaño legible en bytes
+
+    Acepta enteros en bytes o sufijos K/M/G/T (con o sin 'B'/'iB'), p. ej.
+    '512M', '2G', '1.5GiB'.
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*', str(value).upper())
+    if not match:
+        raise ValueError(f"Tamaño de memoria inválido: {value}")
+    number, unit = match.groups()
+    size = int(float(number) * _SIZE_UNITS[unit])
+    if size <= 0:
+        raise ValueError(f"Tamaño de memoria inválido: {value}")
+    return size
+
+
+def _read_cgroup_value(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def cgroup_memory_limit(root: Path = CGROUP_ROOT) -> Optional[int]:
+    """Límite de memoria del cgroup (v2 o v1) en bytes, o None si no hay límite"""
+    # cgroup v2: memory.max ("max" = sin límite)
+    value = _read_cgroup_value(root / 'memory.max')
+    if value is not None:
+        return None if value == 'max' else int(value)
+
+    # cgroup v1: memory/memory.limit_in_bytes
+    value = _read_cgroup_value(root / 'memory' / 'memory.limit_in_bytes')
+    if value is not None:
+        limit = int(value)
+        return None if limit >= _CGROUP_V1_UNLIMITED else limit
+
+    return None
+
+
+def memory_limit(root: Path = CGROUP_ROOT) -> int:
+    """Memoria utilizable: el menor entre la RAM física y el límite del cgroup"""
+    total = psutil.virtual_memory().total
+    limit = cgroup_memory_limit(root)
+    return min(total, limit) if limit else total
+
+
+def current_rss() -> int:
+    """Memoria residente del proceso actual en bytes"""
+    return psutil.Process().memory_info().rss
+
+
+def cgroup_cpu_quota(root: Path = CGROUP_ROOT) -> Optional[float]:
+    """Cuota de CPU del cgroup (v2 o v1) en CPUs, o None si no hay cuota"""
+    # cgroup v2: cpu.max = "<quota> <periodo>" ("max" = sin cuota)
+    value = _read_cgroup_value(root / 'cpu.max')
+    if value is not None:
+        quota, _, period = value.partition(' ')
+        if quota == 'max':
+            return None
+        return int(quota) / int(period or 100000)
+
+    # cgroup v1: cpu/cpu.cfs_quota_us (-1 = sin cuota) y cpu/cpu.cfs_period_us
+    quota = _read_cgroup_value(root / 'cpu' / 'cpu.cfs_quota_us')
+    period = _read_cgroup_value(root / 'cpu' / 'cpu.cfs_period_us')
+    if quota is not None and period is not None and int(quota) > 0:
+        return int(quota) / int(period)
+
+    return None
+
+
+def affinity_cpus() -> int:
+    """CPUs en las que el proceso puede ejecutarse (afinidad, cpuset)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def available_cpus(root: Path = CGROUP_ROOT) -> int:
+    """
+    CPUs utilizables: afinidad del proceso acotada por la cuota del cgroup
+
+    Una cuota fraccionaria se redondea hacia arriba (1.5 CPUs -> 2 workers).
+    """
+    cpus = affinity_cpus()
+    quota = cgroup_cpu_quota(root)
+    if quota:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def cpu_report(root: Path = CGROUP_ROOT) -> Dict[str, Any]:
+    """Resumen de CPUs del host, afinidad, cuota del cgroup y CPUs utilizables"""
+    quota = cgroup_cpu_quota(root)
+    return {
+        'host_cpus': os.cpu_count() or 1,
+        'affinity_cpus': affinity_cpus(),
+        'cgroup_cpu_quota': round(quota, 2) if quota else None,
+        'available_cpus': available_cpus(root)
+    }
+
+
+def limit_native_threads(threads: Optional[int] = None) -> int:
+    """
+    Ajusta los pools de hilos nativos a las CPUs utilizables
+
+    Solo fija las variables de entorno que el usuario no haya definido; las
+    librerías las leen al importarse (polars se importa de forma diferida) y
+    los procesos worker las heredan. Si pyarrow ya está cargado, se ajusta su
+    pool directamente.
+
+    Returns:
+        Número de hilos aplicado
+    """
+    threads = threads or available_cpus()
+    for var in NATIVE_THREAD_VARS:
+        os.environ.setdefault(var, str(threads))
+    if 'pyarrow' in sys.modules:
+        sys.modules['pyarrow'].set_cpu_count(threads)
+    return threads
@@ -0,0 +1,260 @@
+"""
+Caché de resultados direccionada por contenido
+
+La clave de una etapa (ETL, carga del warehouse) combina el hash del
+contenido de sus entradas con la versión de su configuración. Si la clave ya
+está en la caché, las salidas guardadas (CSV/Parquet, bases SQLite) se
+restauran en su sitio en lugar de recalcularlas.
+
+Hashear un archivo grande cuesta una lectura completa, así que el hash se
+recuerda junto al tamaño y el mtime del archivo: mientras ambos coincidan no
+se vuelve a leer.
+
+Cada entrada es un directorio <clave>/ con copias de las salidas y un
+manifest.json. Las entradas caducan tras ttl_seconds y, si el total supera
+max_bytes, se eliminan las usadas hace más tiempo (LRU).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Versión del formato de la caché (cambia todas las claves)
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path("data") / "cache"
+DEFAULT_CACHE_MAX_BYTES = 1024 ** 3
+DEFAULT_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+MANIFEST_NAME = 'manifest.json'
+FINGERPRINTS_NAME = 'fingerprints.json'
+
+_HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def _write_json(path: Path, data: Dict):
+    """Escritura atómica de un JSON"""
+    tmp_file = path.with_name(path.name + '.tmp')
+    tmp_file.write_text(json.dumps(data, indent=2, default=str), encoding='utf-8')
+    os.replace(tmp_file, path)
+
+
+def _read_json(path: Path) -> Optional[Dict]:
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+class ResultCache:
+    """
+    Caché de salidas de etapas del pipeline
+
+    Args:
+        cache_dir: Directorio de la caché
+        max_bytes: Tamaño máximo de todas las entradas
+        ttl_seconds: Antigüedad máxima de una entrada (desde que se guardó)
+        force: Ignorar las entradas existentes (se recalcula y se vuelve a guardar)
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+                 ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS, force: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.force = force
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_hashed = 0
+        self._fingerprints: Optional[Dict[str, List]] = None
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    # --- Hash de contenido -------------------------------------------------
+
+    def _fingerprint_index(self) -> Dict[str, List]:
+        if self._fingerprints is None:
+            self._fingerprints = _read_json(self.cache_dir / FINGERPRINTS_NAME) or {}
+        return self._fingerprints
+
+    def file_digest(self, path: Path) -> str:
+        """
+        Hash del contenido de un archivo
+
+        Atajo: si tamaño y mtime coinciden con los de la última vez que se
+        hasheó, se reutiliza el hash sin leer el archivo.
+        """
+        path = Path(path).resolve()
+        stat = path.stat()
+        index = self._fingerprint_index()
+        known = index.get(str(path))
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            while block := f.read(_HASH_BLOCK_BYTES):
+                digest.update(block)
+        self.bytes_hashed += stat.st_size
+        index[str(path)] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        _write_json(self.cache_dir / FINGERPRINTS_NAME, index)
+        return digest.hexdigest()
+
+    def key(self, stage: str, inputs: Sequence[Path], config: Mapping[str, Any]) -> str:
+        """Clave de una etapa: hash de sus entradas y de su configuración"""
+        description = {
+            'format': CACHE_FORMAT_VERSION,
+            'stage': stage,
+            'inputs': [self.file_digest(path) for path in inputs],
+            'config': dict(config)
+        }
+        payload = json.dumps(description, sort_keys=True, default=str).encode('utf-8')
+        return f"{stage}-{hashlib.blake2b(payload, digest_size=16).hexdigest()}"
+
+    # --- Entradas ------------------------------------------------------------
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def _expired(self, manifest: Dict, now: float) -> bool:
+        return now - manifest['created_at'] > self.ttl_seconds
+
+    def _entries(self) -> List[Dict]:
+        entries = []
+        for manifest_file in self.cache_dir.glob(f'*/{MANIFEST_NAME}'):
+            manifest = _read_json(manifest_file)
+            if manifest is not None:
+                entries.append(manifest)
+        return entries
+
+    def _remove(self, key: str):
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """Manifest de una entrada vigente, o None (ausente, caducada o force)"""
+        if self.force:
+            return None
+        manifest = _read_json(self._entry_dir(key) / MANIFEST_NAME)
+        if manifest is None:
+            return None
+        if self._expired(manifest, time.time()):
+            logger.info(f"Entrada de caché caducada: {key}")
+            self._remove(key)
+            self.evictions += 1
+            return None
+        return manifest
+
+    def restore(self, key: str, outputs: Mapping[str, Path]) -> Optional[Dict]:
+        """
+        Restaura las salidas de una entrada en sus rutas
+
+        Una salida que ya está en su sitio con el mismo contenido no se copia.
+
+        Returns:
+            Métricas guardadas con la entrada, o None si no hay acierto
+        """
+        manifest = self.lookup(key)
+        if manifest is None or set(manifest['outputs']) != set(outputs):
+            self.misses += 1
+            return None
+
+        entry_dir = self._entry_dir(key)
+        for name, target in outputs.items():
+            stored = manifest['outputs'][name]
+            target = Path(target)
+            if target.exists() and self.file_digest(target) == stored['digest']:
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # copy2 conserva el mtime: el atajo de file_digest sigue valiendo
+            shutil.copy2(entry_dir / stored['file'], target)
+
+        manifest['last_used'] = time.time()
+        _write_json(entry_dir / MANIFEST_NAME, manifest)
+        self.hits += 1
+        logger.info(f"Acierto de caché: {key}")
+        return manifest['metrics']
+
+    def store(self, key: str, outputs: Mapping[str, Path], metrics: Dict) -> bool:
+        """
+        Guarda copias de las salidas de una etapa y aplica la política de expulsión
+
+        Returns:
+            True si se guardó (no se guardan entradas mayores que max_bytes)
+        """
+        outputs = {name: Path(path) for name, path in outputs.items()}
+        size = sum(path.stat().st_size for path in outputs.values())
+        if size > self.max_bytes:
+            logger.warning(f"Salidas de {key} ({size / 1024 ** 2:.1f} MB) mayores que la caché; no se guardan")
+            return False
+
+        entry_dir = self._entry_dir(key)
+        tmp_dir = self.cache_dir / f'.{key}.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir()
+        stored = {}
+        for name, path in outputs.items():
+            file_name = f'{name}{path.suffix}'
+            shutil.copy2(path, tmp_dir / file_name)
+            stored[name] = {'file': file_name, 'source': str(path), 'digest': self.file_digest(path),
+                            'size_bytes': path.stat().st_size}
+
+        now = time.time()
+        manifest = {'key': key, 'created_at': now, 'last_used': now, 'size_bytes': size,
+                    'outputs': stored, 'metrics': metrics}
+        _write_json(tmp_dir / MANIFEST_NAME, manifest)
+        self._remove(key)
+        os.replace(tmp_dir, entry_dir)
+        self.stores += 1
+        logger.info(f"Resultado guardado en caché: {key} ({size / 1024 ** 2:.1f} MB)")
+        self.evict()
+        return True
+
+    def evict(self) -> Dict[str, int]:
+        """Elimina las entradas caducadas y, por LRU, las que exceden max_bytes"""
+        now = time.time()
+        expired = evicted = 0
+        live = []
+        for manifest in self._entries():
+            if self._expired(manifest, now):
+                self._remove(manifest['key'])
+                expired += 1
+            else:
+                live.append(manifest)
+
+        total = sum(m['size_bytes'] for m in live)
+        for manifest in sorted(live, key=lambda m: m['last_used']):
+            if total <= self.max_bytes:
+                break
+            self._remove(manifest['key'])
+            total -= manifest['size_bytes']
+            evicted += 1
+
+        self.evictions += expired + evicted
+        if expired or evicted:
+            logger.info(f"Caché: {expired} entradas caducadas y {evicted} expulsadas por tamaño")
+        return {'expired': expired, 'evicted': evicted, 'size_bytes': total}
+
+    def report(self) -> Dict[str, Any]:
+        """Resumen de uso de la caché"""
+        entries = self._entries()
+        return {
+            'cache_dir': str(self.cache_dir),
+            'entries': len(entries),
+            'size_mb': round(sum(m['size_bytes'] for m in entries) / 1024 ** 2, 2),
+            'max_mb': round(self.max_bytes / 1024 ** 2, 2),
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'mb_hashed': round(self.bytes_hashed / 1024 ** 2, 2),
+            'force': self.force
+        }
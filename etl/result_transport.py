@@ -0,0 +1,126 @@
+"""
+Transporte de resultados de workers mediante memoria compartida
+
+El worker serializa su DataFrame como stream Arrow IPC dentro de un segmento
+multiprocessing.shared_memory y devuelve por el pipe del Pool solo un
+descriptor pequeño (nombre y tamaño del segmento). El proceso padre mapea el
+segmento y lee las columnas Arrow sin copiarlas hasta la consolidación final.
+
+Sin pyarrow el DataFrame viaja dentro del descriptor (pickle por el pipe).
+"""
+
+import logging
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+from etl.engines import import_optional, module_available
+
+# pyarrow se importa al publicar/leer el primer resultado, no al importar el módulo
+HAS_PYARROW = module_available('pyarrow')
+
+logger = logging.getLogger(__name__)
+
+TRANSPORT_SHARED_MEMORY = 'shared_memory'
+TRANSPORT_PICKLE = 'pickle'
+
+
+def transport_method() -> str:
+    """Transporte que se usará para los resultados de workers"""
+    return TRANSPORT_SHARED_MEMORY if HAS_PYARROW else TRANSPORT_PICKLE
+
+
+def _write_stream(table, buffer: memoryview):
+    """Escribe la tabla como stream IPC directamente en el buffer compartido"""
+    pa = import_optional('pyarrow')
+    stream = pa.FixedSizeBufferWriter(pa.py_buffer(buffer))
+    with pa.ipc.new_stream(stream, table.schema) as writer:
+        writer.write_table(table)
+    stream.close()
+
+
+def publish_frame(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Publica un DataFrame para el proceso padre
+
+    Returns:
+        Descriptor serializable: nombre y tamaño del segmento compartido, o el
+        propio DataFrame si no hay pyarrow o está vacío
+    """
+    if not HAS_PYARROW or len(df) == 0:
+        return {'transport': TRANSPORT_PICKLE, 'frame': df, 'size': 0}
+
+    pa = import_optional('pyarrow')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Medir el stream antes de reservar el segmento
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    size = sink.size()
+
+    segment = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        _write_stream(table, segment.buf)
+    finally:
+        segment.close()
+
+    # El segmento sobrevive al worker y sigue registrado en el resource
+    # tracker (compartido con el padre) hasta que el padre lo elimina tras
+    # leerlo o descartarlo: si el padre muere antes, el tracker lo limpia
+    return {'transport': TRANSPORT_SHARED_MEMORY, 'name': segment.name, 'size': size}
+
+
+def discard_frame(descriptor: Dict[str, Any]):
+    """Elimina un resultado publicado que el padre no va a leer"""
+    if descriptor['transport'] != TRANSPORT_SHARED_MEMORY:
+        return
+    segment = shared_memory.SharedMemory(name=descriptor['name'])
+    segment.close()
+    segment.unlink()
+
+
+class SharedResultReader:
+    """
+    Abre los segmentos publicados por los workers y los libera al salir
+
+    Los DataFrames devueltos por attach() pueden compartir memoria con los
+    segmentos, por lo que solo son válidos dentro del bloque with.
+    """
+
+    def __init__(self):
+        self._segments: List[Tuple[shared_memory.SharedMemory, Any]] = []
+        self.shared_bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def attach(self, descriptor: Dict[str, Any]) -> pd.DataFrame:
+        if descriptor['transport'] == TRANSPORT_PICKLE:
+            return descriptor['frame']
+
+        pa = import_optional('pyarrow')
+        segment = shared_memory.SharedMemory(name=descriptor['name'])
+        # macOS redondea el segmento a páginas: leer solo el tamaño publicado
+        buffer = pa.py_buffer(segment.buf)[:descriptor['size']]
+        table = pa.ipc.open_stream(buffer).read_all()
+        self._segments.append((segment, table))
+        self.shared_bytes += descriptor['size']
+        return table.to_pandas(split_blocks=True)
+
+    def release(self):
+        """Cierra y elimina todos los segmentos abiertos"""
+        while self._segments:
+            segment, table = self._segments.pop()
+            del table
+            try:
+                segment.close()
+            except BufferError:
+                # Aún hay vistas vivas: el mapeo se libera cuando desaparezcan
+                logger.debug(f"Segmento {segment.name} con vistas activas al liberar")
+            segment.unlink()
+
@@ -0,0 +1,193 @@
+"""
+Muestreo determinista de líneas de log con estimación de error
+
+Para dashboards rápidos basta con procesar una fracción de las líneas. La
+decisión de muestrear se toma sobre los bytes crudos, antes de decodificar el
+JSON, de modo que el coste es proporcional a la muestra:
+
+- hash: se localiza request_id con una búsqueda de bytes y se compara su hash
+  con un umbral. La muestra es la misma sea cual sea el particionado (motores
+  paralelos, rangos, índices) y entre ejecuciones.
+- stride: una de cada 1/fracción líneas según el número de línea. Cada tarea
+  de los motores paralelos lleva el número global de su primera línea, así
+  que la muestra es la misma que en una lectura secuencial.
+
+Los conteos se reescalan por 1/fracción (estimador de Horvitz-Thompson) y se
+acompañan de intervalos de confianza normales con corrección por población
+finita.
+"""
+
+import hashlib
+import math
+from statistics import NormalDist
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_HASH = 'hash'
+SAMPLE_STRIDE = 'stride'
+SAMPLE_METHODS = (SAMPLE_HASH, SAMPLE_STRIDE)
+
+DEFAULT_CONFIDENCE = 0.95
+
+_HASH_SPACE = 1 << 64
+
+
+def field_token(key: str) -> bytes:
+    """Token de búsqueda de un campo JSON ('"campo"')"""
+    return b'"' + key.encode('utf-8') + b'"'
+
+
+def raw_field(line: bytes, token: bytes) -> Optional[bytes]:
+    """
+    Valor crudo de un campo de primer nivel de una línea JSON, sin decodificarla
+
+    Devuelve los bytes entre comillas para strings o el literal para números;
+    None si el campo no aparece.
+    """
+    start = line.find(token)
+    if start < 0:
+        return None
+    colon = line.find(b':', start + len(token))
+    if colon < 0:
+        return None
+    value_start = colon + 1
+    while value_start < len(line) and line[value_start] in b' \t':
+        value_start += 1
+    if line[value_start:value_start + 1] == b'"':
+        end = line.find(b'"', value_start + 1)
+        return line[value_start + 1:end] if end > 0 else None
+    end = value_start
+    while end < len(line) and line[end] not in b',} \t':
+        end += 1
+    return line[value_start:end]
+
+
+def z_score(confidence: float) -> float:
+    """Cuantil normal para un nivel de confianza bilateral"""
+    if not 0 < confidence < 1:
+        raise ValueError(f"Nivel de confianza inválido: {confidence}")
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+class LineSampler:
+    """
+    Decide qué líneas se procesan sin decodificar el JSON
+
+    Args:
+        fraction: Fracción de líneas a procesar (0, 1]
+        method: 'hash' (por request_id) o 'stride' (por número de línea)
+        key: Campo cuyo valor se hashea en el método hash
+    """
+
+    def __init__(self, fraction: float, method: str = SAMPLE_HASH, key: str = 'request_id'):
+        if not 0 < fraction <= 1:
+            raise ValueError(f"Fracción de muestreo fuera de (0, 1]: {fraction}")
+        if method not in SAMPLE_METHODS:
+            raise ValueError(f"Método de muestreo desconocido: {method} "
+                             f"(disponibles: {', '.join(SAMPLE_METHODS)})")
+        self.method = method
+        self.key = key
+        self._key_token = field_token(key)
+        if method == SAMPLE_STRIDE:
+            self.stride = max(1, round(1 / fraction))
+            self.fraction = 1 / self.stride
+        else:
+            self.stride = None
+            self.fraction = fraction
+        self._threshold = int(self.fraction * _HASH_SPACE)
+
+    def key_bytes(self, line: bytes) -> bytes:
+        """
+        Valor crudo del campo clave dentro de la línea JSON
+
+        Si el campo no aparece se usa la línea completa, que también es estable.
+        """
+        value = raw_field(line, self._key_token)
+        return line if value is None else value
+
+    def keep(self, line: bytes, line_number: int) -> bool:
+        """Indica si la línea entra en la muestra"""
+        if self.stride is not None:
+            return line_number % self.stride == 0
+        digest = hashlib.blake2b(self.key_bytes(line), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') < self._threshold
+
+    def describe(self) -> Dict[str, Any]:
+        return {'method': self.method, 'fraction': round(self.fraction, 6), 'key': self.key}
+
+
+def count_estimate(sampled: int, fraction: float, z: float) -> Tuple[int, float]:
+    """
+    Conteo poblacional estimado y semiamplitud de su intervalo
+
+    Cada línea entra con probabilidad f: Var(n/f) ~ n(1-f)/f^2.
+    """
+    estimate = round(sampled / fraction)
+    half_width = z * math.sqrt(sampled * (1 - fraction)) / fraction
+    return estimate, round(half_width, 2)
+
+
+def add_square_column(df: pd.DataFrame) -> pd.DataFrame:
+    """Columna auxiliar con el cuadrado del tiempo de respuesta (varianza por grupo)"""
+    df['response_time_sq'] = df['response_time_ms'].to_numpy() ** 2
+    return df
+
+
+def scale_sampled_aggregates(df: pd.DataFrame, fraction: float,
+                             confidence: float = DEFAULT_CONFIDENCE) -> pd.DataFrame:
+    """
+    Reescala un agregado por hora/endpoint calculado sobre la muestra
+
+    Espera las columnas count, avg_response_time, error_rate y
+    response_time_sq (media de cuadrados). Devuelve count estimado, el
+    conteo muestral y la semiamplitud del intervalo (*_ci) de conteos y medias.
+    """
+    if len(df) == 0:
+        return df
+
+    z = z_score(confidence)
+    fpc = 1 - fraction
+    n = df['count'].to_numpy(dtype=np.float64)
+    mean = df['avg_response_time'].to_numpy(dtype=np.float64)
+    rate = df['error_rate'].to_numpy(dtype=np.float64)
+
+    # Varianza muestral (insesgada) a partir de la media de cuadrados
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = np.maximum(df['response_time_sq'].to_numpy() - mean ** 2, 0) * n / (n - 1)
+        mean_ci = z * np.sqrt(variance / n * fpc)
+        rate_ci = z * np.sqrt(rate * (1 - rate) / n * fpc)
+    mean_ci[n < 2] = np.nan
+
+    df = df.drop(columns=['response_time_sq'])
+    df['sample_count'] = df['count'].astype(np.int64)
+    df['count'] = np.rint(n / fraction).astype(np.int64)
+    df['count_ci'] = np.round(z * np.sqrt(n * fpc) / fraction, 2)
+    df['avg_response_time_ci'] = np.round(mean_ci, 3)
+    df['error_rate_ci'] = np.round(rate_ci, 4)
+    return df
+
+
+def sampling_report(sampler: LineSampler, counters: Dict[str, int],
+                    confidence: float = DEFAULT_CONFIDENCE) -> Optional[Dict[str, Any]]:
+    """
+    Resumen del muestreo con totales estimados
+
+    Args:
+        counters: total_records, filtered_records y skipped_lines de la ejecución
+    """
+    if sampler is None:
+        return None
+    z = z_score(confidence)
+    total, total_ci = count_estimate(counters['total_records'], sampler.fraction, z)
+    filtered, filtered_ci = count_estimate(counters['filtered_records'], sampler.fraction, z)
+    return {
+        **sampler.describe(),
+        'confidence': confidence,
+        'skipped_lines': counters['skipped_lines'],
+        'estimated_total_records': total,
+        'estimated_total_records_ci': total_ci,
+        'estimated_filtered_records': filtered,
+        'estimated_filtered_records_ci': filtered_ci
+    }
@@ -0,0 +1,269 @@
+"""
+Esquema declarado de los archivos CSV de transacciones
+
+Sin esquema, pandas infiere los tipos chunk a chunk y deja status y timestamp
+como columnas de strings. Aquí se fijan: ids Int32 (entero con nulos; int32
+tras la limpieza), amount float64, status categórico y timestamp parseado con un formato explícito. Solo se leen las
+columnas del esquema que existan en el archivo (proyección).
+
+Con pyarrow disponible la lectura usa su lector CSV (multihilo, columnar y
+sin objetos Python intermedios); sin él, el motor C de pandas con los mismos
+tipos.
+"""
+
+import io
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from etl.compression import CODEC_PLAIN, detect_codec, open_compressed
+from etl.engines import import_optional, module_available
+
+HAS_PYARROW = module_available('pyarrow')
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Columnas con timestamp ('ts' es el alias que normaliza transform)
+TIMESTAMP_COLUMNS = ('timestamp', 'ts')
+
+# Tipos de lectura; los ids se leen como float64 (admite huecos y '10.0', que
+# escribe pandas tras un NaN) y pasan a Int32 si son enteros representables,
+# haya nulos o no: el tipo no cambia de un chunk a otro
+ID_COLUMNS = ('order_id', 'user_id')
+
+TRANSACTION_DTYPES = {
+    'order_id': 'float64',
+    'user_id': 'float64',
+    'amount': 'float64',
+    'status': 'category',
+}
+
+TRANSACTION_COLUMNS = tuple(TRANSACTION_DTYPES) + TIMESTAMP_COLUMNS
+
+# Filas por lectura en el motor C cuando no se indica chunk_size
+DEFAULT_READ_CHUNK_SIZE = 100000
+
+# Bytes de muestra para estimar el tamaño medio de una fila
+_SAMPLE_BYTES = 64 * 1024
+
+
+def csv_engine() -> str:
+    """Motor de lectura CSV que se usará"""
+    return 'pyarrow' if HAS_PYARROW else 'c'
+
+
+def _header(file_path: Path) -> List[str]:
+    with open_compressed(file_path, 'rt') as f:
+        return [c.strip() for c in f.readline().rstrip('\r\n').split(',')]
+
+
+def schema_columns(file_path: Path) -> Optional[List[str]]:
+    """
+    Columnas del esquema presentes en el archivo, en su orden
+
+    None si el archivo no tiene ninguna (no es de transacciones: se lee entero).
+    """
+    columns = [c for c in _header(file_path) if c in TRANSACTION_COLUMNS]
+    return columns or None
+
+
+def _arrow_types(columns: List[str]) -> Dict:
+    pa = import_optional('pyarrow')
+    types = {
+        'order_id': pa.float64(),
+        'user_id': pa.float64(),
+        'amount': pa.float64(),
+        'status': pa.dictionary(pa.int32(), pa.string()),
+    }
+    # Los timestamps se leen como texto y se parsean después (inválidos -> nulo)
+    types.update({c: pa.string() for c in TIMESTAMP_COLUMNS})
+    return {c: t for c, t in types.items() if c in columns}
+
+
+def _arrow_options(columns: Optional[List[str]], block_size: Optional[int] = None):
+    csv = import_optional('pyarrow.csv')
+    read_options = csv.ReadOptions(block_size=block_size) if block_size else csv.ReadOptions()
+    # Campo vacío -> nulo también en columnas de texto, como en pandas
+    if columns is None:
+        return read_options, csv.ConvertOptions(strings_can_be_null=True)
+    return read_options, csv.ConvertOptions(include_columns=columns,
+                                            column_types=_arrow_types(columns),
+                                            strings_can_be_null=True)
+
+
+def _arrow_source(file_path: Path):
+    """Ruta (lectura directa) o archivo descomprimido para el lector de pyarrow"""
+    if detect_codec(file_path) == CODEC_PLAIN:
+        return str(file_path)
+    return open_compressed(file_path, 'rb')
+
+
+def _parse_timestamps_arrow(table):
+    pc = import_optional('pyarrow.compute')
+    for name in TIMESTAMP_COLUMNS:
+        if name not in table.column_names:
+            continue
+        raw = table.column(name)
+        parsed = pc.strptime(raw, format=TIMESTAMP_FORMAT, unit='s', error_is_null=True)
+        if parsed.null_count == len(parsed) and raw.null_count < len(raw):
+            # Otro formato: se deja en texto y lo infiere pandas
+            logger.warning(f"'{name}' no sigue el formato {TIMESTAMP_FORMAT}; se infiere el formato")
+            continue
+        table = table.set_column(table.column_names.index(name), name, parsed)
+    return table
+
+
+def downcast_ids(values: pd.Series) -> pd.Series:
+    """Ids float64 a Int32 (nulos como pd.NA) si los valores presentes son enteros representables"""
+    if values.dtype != 'float64':
+        return values
+    array = values.to_numpy()
+    array = array[~np.isnan(array)]
+    if len(array) and (np.abs(array).max() > np.iinfo(np.int32).max or not (array == np.floor(array)).all()):
+        return values
+    return values.astype('Int32')
+
+
+def compact_ids(values: pd.Series) -> pd.Series:
+    """Ids sin nulos (ya filtrados por la limpieza) a int32 si son enteros representables"""
+    values = downcast_ids(values)
+    if isinstance(values.dtype, pd.Int32Dtype) and not values.hasnans:
+        return values.astype('int32')
+    return values
+
+
+def _finalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Completa la conversión al esquema tras la lectura"""
+    for name in ID_COLUMNS:
+        if name in df.columns:
+            df[name] = downcast_ids(df[name])
+    if 'status' in df.columns and isinstance(df['status'].dtype, pd.CategoricalDtype):
+        # Categorías ordenadas: el orden de aparición depende del motor y del chunk
+        df['status'] = df['status'].cat.reorder_categories(sorted(df['status'].cat.categories))
+    for name in TIMESTAMP_COLUMNS:
+        if name in df.columns and not pd.api.types.is_datetime64_any_dtype(df[name]):
+            parsed = pd.to_datetime(df[name], format=TIMESTAMP_FORMAT, errors='coerce')
+            if parsed.isna().all() and df[name].notna().any():
+                parsed = pd.to_datetime(df[name], format='mixed', errors='coerce')
+            else:
+                parsed = parsed.astype('datetime64[s]')
+            df[name] = parsed
+    return df
+
+
+def _arrow_to_pandas(table) -> pd.DataFrame:
+    return _finalize(_parse_timestamps_arrow(table).to_pandas())
+
+
+def _pandas_kwargs(columns: Optional[List[str]]) -> Dict:
+    if columns is None:
+        return {}
+    dtype = {c: t for c, t in TRANSACTION_DTYPES.items() if c in columns}
+    return {'usecols': columns, 'dtype': dtype}
+
+
+def concat_transactions(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatena chunks tipados sin perder las columnas categóricas"""
+    if not frames:
+        return pd.DataFrame()
+    categorical = [c for c in frames[0].columns if isinstance(frames[0][c].dtype, pd.CategoricalDtype)]
+    for name in categorical:
+        # pd.concat degrada a texto si las categorías difieren entre chunks
+        categories = sorted(set().union(*(f[name].cat.categories for f in frames)))
+        frames = [f.assign(**{name: f[name].cat.set_categories(categories)}) for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def estimate_row_bytes(file_path: Path) -> float:
+    """Tamaño medio de fila (bytes sin comprimir) según el inicio del archivo"""
+    with open_compressed(file_path, 'rb') as f:
+        sample = f.read(_SAMPLE_BYTES)
+    return len(sample) / max(sample.count(b'\n'), 1)
+
+
+def iter_transactions_csv(file_path: Path, chunk_size: int = DEFAULT_READ_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Lee un CSV de transacciones (plano o comprimido) en chunks tipados
+
+    Con pyarrow los chunks son bloques de bytes dimensionados para unas
+    chunk_size filas según el tamaño medio de fila del inicio del archivo.
+    Un archivo sin filas produce un único chunk vacío con el esquema de la
+    cabecera, para que los destinos se creen (y reemplacen) igualmente.
+    """
+    file_path = Path(file_path)
+    columns = schema_columns(file_path)
+
+    if HAS_PYARROW:
+        csv = import_optional('pyarrow.csv')
+        block_size = max(int(estimate_row_bytes(file_path) * chunk_size), 1 << 16)
+        read_options, convert_options = _arrow_options(columns, block_size)
+        source = _arrow_source(file_path)
+        try:
+            with csv.open_csv(source, read_options=read_options, convert_options=convert_options) as reader:
+                empty = True
+                for batch in reader:
+                    if batch.num_rows:
+                        empty = False
+                        yield _arrow_to_pandas(import_optional('pyarrow').Table.from_batches([batch]))
+                if empty:
+                    yield _arrow_to_pandas(reader.schema.empty_table())
+        finally:
+            if not isinstance(source, str):
+                source.close()
+        return
+
+    with open_compressed(file_path, 'rt') as f, \
+            pd.read_csv(f, chunksize=chunk_size, **_pandas_kwargs(columns)) as reader:
+        for chunk in reader:
+            yield _finalize(chunk)
+
+
+def read_transactions_csv(file_path: Path, chunk_size: int = DEFAULT_READ_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Lee un CSV de transacciones completo con el esquema declarado
+
+    Args:
+        file_path: Archivo CSV (plano o comprimido)
+        chunk_size: Filas por lectura del motor C (sin pyarrow)
+    """
+    file_path = Path(file_path)
+    if not HAS_PYARROW:
+        return concat_transactions(list(iter_transactions_csv(file_path, chunk_size)))
+
+    csv = import_optional('pyarrow.csv')
+    read_options, convert_options = _arrow_options(schema_columns(file_path))
+    source = _arrow_source(file_path)
+    try:
+        table = csv.read_csv(source, read_options=read_options, convert_options=convert_options)
+    finally:
+        if not isinstance(source, str):
+            source.close()
+    return _arrow_to_pandas(table)
+
+
+def read_transactions_bytes(data: bytes, header: List[str]) -> pd.DataFrame:
+    """
+    Parsea filas CSV sin cabecera (un rango del archivo) con el esquema declarado
+
+    Args:
+        data: Filas completas en bytes
+        header: Nombres de todas las columnas del archivo, en su orden
+    """
+    columns = [c for c in header if c in TRANSACTION_COLUMNS] or None
+    if not HAS_PYARROW:
+        df = pd.read_csv(io.BytesIO(data), header=None, names=header, **_pandas_kwargs(columns))
+        return _finalize(df)
+
+    pa = import_optional('pyarrow')
+    csv = import_optional('pyarrow.csv')
+    read_options, convert_options = _arrow_options(columns)
+    read_options.column_names = header
+    # Un hilo: quien llama a esta función ya reparte los rangos entre procesos
+    read_options.use_threads = False
+    table = csv.read_csv(pa.py_buffer(data), read_options=read_options, convert_options=convert_options)
+    return _arrow_to_pandas(table)
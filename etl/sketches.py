@@ -0,0 +1,356 @@
+"""
+Estructuras probabilísticas (sketches) para el procesamiento streaming de logs
+"""
+
+import hashlib
+import math
+import struct
+from typing import Any, Iterable, List, Tuple
+
+import numpy as np
+
+# Rango de precisión soportado: 2^4 = 16 registros hasta 2^18 = 262144 registros
+MIN_HLL_PRECISION = 4
+MAX_HLL_PRECISION = 18
+DEFAULT_HLL_PRECISION = 12
+
+# Filtro de Bloom escalable: cardinalidad y tasa de falsos positivos por defecto
+DEFAULT_BLOOM_CAPACITY = 1000000
+DEFAULT_BLOOM_ERROR_RATE = 0.001
+
+_BLOOM_MAGIC = b'SBF1'
+_BLOOM_HEADER = struct.Struct('<4sQdddI')
+_BLOOM_SLICE_HEADER = struct.Struct('<QdQQ')
+
+# Claves por lote en las operaciones vectorizadas (acota la matriz de posiciones)
+_BLOOM_VECTOR_BATCH = 1 << 16
+
+# Bits activos de cada byte (int.bit_count requiere Python 3.10)
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def hash64(value: Any) -> int:
+    """
+    Hash estable de 64 bits
+
+    A diferencia de hash(), no depende de PYTHONHASHSEED, por lo que los
+    sketches construidos en procesos distintos son combinables.
+    """
+    digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HyperLogLog:
+    """Contador aproximado de valores distintos, combinable entre workers"""
+
+    __slots__ = ('precision', 'num_registers', 'registers')
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION):
+        if not MIN_HLL_PRECISION <= precision <= MAX_HLL_PRECISION:
+            raise ValueError(
+                f"Precisión HLL fuera de rango [{MIN_HLL_PRECISION}, "
+                f"{MAX_HLL_PRECISION}]: {precision}"
+            )
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(self.num_registers)
+
+    def add(self, value: Any):
+        """Registra un valor (None se ignora)"""
+        if value is None:
+            return
+        self.add_hash(hash64(value))
+
+    def add_hash(self, x: int):
+        """Registra un valor ya hasheado con hash64()"""
+        index = x >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        rest = x & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[Any]):
+        """Registra todos los valores de un iterable"""
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """Combina otro sketch en este (máximo por registro)"""
+        if other.precision != self.precision:
+            raise ValueError(
+                f"No se pueden combinar sketches con precisión distinta: "
+                f"{self.precision} vs {other.precision}"
+            )
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    @property
+    def relative_error(self) -> float:
+        """Error estándar relativo del estimador (1.04 / sqrt(m))"""
+        return 1.04 / math.sqrt(self.num_registers)
+
+    def count(self) -> int:
+        """Estimación del número de valores distintos"""
+        m = self.num_registers
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+
+        # Corrección de rango pequeño: linear counting
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * math.log(m / zeros)
+
+        return int(round(estimate))
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getstate__(self):
+        return (self.precision, bytes(self.registers))
+
+    def __setstate__(self, state):
+        precision, registers = state
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(registers)
+
+
+def hash128_pair(key: bytes) -> Tuple[int, int]:
+    """Dos hashes de 64 bits independientes de una clave (doble hashing)"""
+    digest = hashlib.blake2b(key, digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom de capacidad fija
+
+    Con n elementos y tasa de falsos positivos p usa m = -n ln p / ln(2)^2
+    bits y k = (m/n) ln 2 funciones hash (doble hashing sobre hash128_pair).
+    """
+
+    __slots__ = ('capacity', 'error_rate', 'num_bits', 'num_hashes', 'count', 'bits')
+
+    def __init__(self, capacity: int, error_rate: float):
+        if capacity <= 0:
+            raise ValueError(f"Capacidad de filtro de Bloom inválida: {capacity}")
+        if not 0 < error_rate < 1:
+            raise ValueError(f"Tasa de falsos positivos fuera de (0, 1): {error_rate}")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def contains_hashes(self, h1: int, h2: int) -> bool:
+        # Posiciones (h1 + i*h2) mod m calculadas de forma incremental; la
+        # mayoría de claves nuevas se descartan en las primeras sondas
+        m = self.num_bits
+        bits = self.bits
+        pos = h1 % m
+        step = h2 % m
+        for _ in range(self.num_hashes):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+            pos += step
+            if pos >= m:
+                pos -= m
+        return True
+
+    def add_hashes(self, h1: int, h2: int):
+        m = self.num_bits
+        bits = self.bits
+        pos = h1 % m
+        step = h2 % m
+        for _ in range(self.num_hashes):
+            bits[pos >> 3] |= 1 << (pos & 7)
+            pos += step
+            if pos >= m:
+                pos -= m
+        self.count += 1
+
+    def _positions(self, h1: np.ndarray, h2: np.ndarray) -> np.ndarray:
+        # Las mismas posiciones que contains_hashes, una fila por clave (k*m < 2^64)
+        m = np.uint64(self.num_bits)
+        probes = np.arange(self.num_hashes, dtype=np.uint64)
+        return (h1[:, None] % m + probes * (h2[:, None] % m)) % m
+
+    def contains_many(self, h1: np.ndarray, h2: np.ndarray) -> np.ndarray:
+        """contains_hashes vectorizado sobre arrays uint64 de hashes"""
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        found = np.empty(len(h1), dtype=bool)
+        for start in range(0, len(h1), _BLOOM_VECTOR_BATCH):
+            end = start + _BLOOM_VECTOR_BATCH
+            pos = self._positions(h1[start:end], h2[start:end])
+            found[start:end] = ((bits[pos >> 3] >> (pos & 7)) & 1).all(axis=1)
+        return found
+
+    def add_many(self, h1: np.ndarray, h2: np.ndarray):
+        """add_hashes vectorizado sobre arrays uint64 de hashes"""
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        for start in range(0, len(h1), _BLOOM_VECTOR_BATCH):
+            end = start + _BLOOM_VECTOR_BATCH
+            pos = self._positions(h1[start:end], h2[start:end]).ravel()
+            np.bitwise_or.at(bits, pos >> 3, (1 << (pos & 7)).astype(np.uint8))
+        self.count += len(h1)
+
+    @property
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+    def estimate_count(self) -> int:
+        """Elementos estimados a partir de los bits activos (tras combinar filtros)"""
+        ones = int(_POPCOUNT[np.frombuffer(self.bits, dtype=np.uint8)].sum(dtype=np.int64))
+        if ones >= self.num_bits:
+            return self.capacity
+        return round(-self.num_bits / self.num_hashes * math.log(1 - ones / self.num_bits))
+
+    def merge(self, other: 'BloomFilter') -> 'BloomFilter':
+        """Unión con un filtro de la misma forma (OR de bits)"""
+        if (other.num_bits, other.num_hashes) != (self.num_bits, self.num_hashes):
+            raise ValueError("No se pueden combinar filtros de Bloom de distinta forma")
+        merged = int.from_bytes(self.bits, 'little') | int.from_bytes(other.bits, 'little')
+        self.bits = bytearray(merged.to_bytes(len(self.bits), 'little'))
+        self.count = self.estimate_count()
+        return self
+
+
+class ScalableBloomFilter:
+    """
+    Filtro de Bloom escalable (Almeida et al.)
+
+    Cuando el filtro activo alcanza su capacidad se añade otro growth veces
+    mayor con una tasa de falsos positivos tightening veces menor, de modo que
+    la tasa total queda acotada por error_rate / (1 - tightening) y la memoria
+    crece linealmente con los elementos (~1.8 MB por millón con p=0.001).
+
+    Args:
+        capacity: Cardinalidad esperada del primer filtro
+        error_rate: Tasa de falsos positivos del primer filtro
+        growth: Factor de crecimiento de capacidad entre filtros
+        tightening: Factor de reducción de la tasa de error entre filtros
+    """
+
+    def __init__(self, capacity: int = DEFAULT_BLOOM_CAPACITY,
+                 error_rate: float = DEFAULT_BLOOM_ERROR_RATE,
+                 growth: float = 2.0, tightening: float = 0.5):
+        if not 0 < tightening < 1:
+            raise ValueError(f"Factor de reducción fuera de (0, 1): {tightening}")
+        if growth < 1:
+            raise ValueError(f"Factor de crecimiento inválido: {growth}")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.filters: List[BloomFilter] = [BloomFilter(capacity, error_rate)]
+
+    def __contains__(self, key: bytes) -> bool:
+        return self.contains_hashes(*hash128_pair(key))
+
+    def contains_hashes(self, h1: int, h2: int) -> bool:
+        return any(f.contains_hashes(h1, h2) for f in self.filters)
+
+    def add(self, key: bytes) -> bool:
+        """
+        Registra una clave
+
+        Returns:
+            False si la clave (probablemente) ya estaba; True si es nueva
+        """
+        h1, h2 = hash128_pair(key)
+        if any(f.contains_hashes(h1, h2) for f in self.filters):
+            return False
+        active = self.filters[-1]
+        if active.is_full:
+            active = BloomFilter(int(active.capacity * self.growth),
+                                 active.error_rate * self.tightening)
+            self.filters.append(active)
+        active.add_hashes(h1, h2)
+        return True
+
+    def add_many(self, h1: np.ndarray, h2: np.ndarray) -> np.ndarray:
+        """
+        Registra claves distintas dadas por sus hashes (arrays uint64 de hash128_pair)
+
+        Returns:
+            Máscara de las claves que (probablemente) ya estaban
+        """
+        present = np.zeros(len(h1), dtype=bool)
+        for f in self.filters:
+            present |= f.contains_many(h1, h2)
+        pending = np.flatnonzero(~present)
+        while len(pending):
+            active = self.filters[-1]
+            if active.is_full:
+                active = BloomFilter(int(active.capacity * self.growth),
+                                     active.error_rate * self.tightening)
+                self.filters.append(active)
+            take = pending[:active.capacity - active.count]
+            active.add_many(h1[take], h2[take])
+            pending = pending[len(take):]
+        return present
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self.filters)
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(len(f.bits) for f in self.filters)
+
+    @property
+    def max_error_rate(self) -> float:
+        """Cota de la tasa de falsos positivos con los filtros actuales"""
+        return 1 - math.prod(1 - f.error_rate for f in self.filters)
+
+    def merge(self, other: 'ScalableBloomFilter') -> 'ScalableBloomFilter':
+        """
+        Unión con una copia que partió de este mismo filtro
+
+        Los filtros comunes se combinan con OR y los que la copia añadió se
+        agregan al final (la consulta mira todos).
+        """
+        shared = min(len(self.filters), len(other.filters))
+        for mine, theirs in zip(self.filters[:shared], other.filters[:shared]):
+            mine.merge(theirs)
+        self.filters.extend(other.filters[shared:])
+        return self
+
+    def to_bytes(self) -> bytes:
+        """Serialización binaria (cabecera + bits de cada filtro)"""
+        parts = [_BLOOM_HEADER.pack(_BLOOM_MAGIC, self.capacity, self.error_rate,
+                                    self.growth, self.tightening, len(self.filters))]
+        for f in self.filters:
+            parts.append(_BLOOM_SLICE_HEADER.pack(f.capacity, f.error_rate, f.count, len(f.bits)))
+            parts.append(bytes(f.bits))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'ScalableBloomFilter':
+        magic, capacity, error_rate, growth, tightening, num_filters = \
+            _BLOOM_HEADER.unpack_from(data, 0)
+        if magic != _BLOOM_MAGIC:
+            raise ValueError("Formato de filtro de Bloom desconocido")
+        sbf = cls(capacity, error_rate, growth, tightening)
+        sbf.filters = []
+        offset = _BLOOM_HEADER.size
+        for _ in range(num_filters):
+            f_capacity, f_error_rate, count, size = _BLOOM_SLICE_HEADER.unpack_from(data, offset)
+            offset += _BLOOM_SLICE_HEADER.size
+            bloom = BloomFilter(f_capacity, f_error_rate)
+            if size != len(bloom.bits):
+                raise ValueError("Filtro de Bloom truncado o corrupto")
+            bloom.bits = bytearray(data[offset:offset + size])
+            bloom.count = count
+            offset += size
+            sbf.filters.append(bloom)
+        return sbf
@@ -12,44 +12,68 @@ import os
 import sys
 import time
 import json
-import gzip
 import psutil
 import logging
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from datetime import datetime, timedelta
 import pandas as pd
 
-# Intentar importar librerías opcionales
-try:
-    import polars as pl
-    HAS_POLARS = True
-except ImportError:
-    HAS_POLARS = False
+# Permitir ejecución directa (python etl/streaming_processor.py)
+if __package__ in (None, ''):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-try:
-    import dask.dataframe as dd
-    from dask import delayed
-    HAS_DASK = True
-except ImportError:
-    HAS_DASK = False
+from etl.block_gzip import iter_member_lines, split_member_ranges
+from etl.columnar import LogRecordBatch, new_dictionaries, merge_dictionaries
+from etl.compression import (
+    CODEC_EXTENSIONS, CODEC_GZIP, CODEC_PLAIN, available_codecs, detect_codec,
+    open_compressed, recompress_file
+)
+from etl.dedup import DEDUP_STATE_NAME, LineDeduplicator, TaskDeduplicator, load_persisted_filter
+from etl.engines import ENGINES, engine_names, import_optional, module_available
+from etl.gzip_index import find_gzip_index, iter_indexed_range_lines, split_indexed_ranges
+from etl.memory_budget import (
+    AdaptiveBatchSizer, merge_batching_reports, plan_workers, resolve_memory_budget
+)
+from etl.mmap_reader import count_range_lines, iter_range_lines, split_byte_ranges
+from etl.pipeline import END_OF_STREAM, MonitoredQueue, StagePipeline
+from etl.resources import available_cpus, cpu_report, limit_native_threads, parse_memory_size
+from etl.result_transport import SharedResultReader, discard_frame, publish_frame, transport_method
+from etl.sampling import (
+    DEFAULT_CONFIDENCE, SAMPLE_HASH, SAMPLE_METHODS, LineSampler, add_square_column,
+    sampling_report, scale_sampled_aggregates
+)
+from etl.sketches import (
+    DEFAULT_BLOOM_CAPACITY, DEFAULT_BLOOM_ERROR_RATE, DEFAULT_HLL_PRECISION, HyperLogLog
+)
+from etl.worker_pool import WorkerPool
 
-try:
-    import pyarrow as pa
-    import pyarrow.parquet as pq
-    HAS_PYARROW = True
-except ImportError:
-    HAS_PYARROW = False
-
-from multiprocessing import Pool, cpu_count
+# Librerías opcionales: se detectan sin importarlas; cada motor las importa al ejecutarse
+HAS_POLARS = module_available('polars')
+HAS_DASK = module_available('dask')
+HAS_PYARROW = module_available('pyarrow')
 
 logger = logging.getLogger(__name__)
 
+# Líneas por chunk temporal cuando la entrada comprimida no admite rangos
+SPLIT_CHUNK_LINES = 1000000
+
 
 class StreamingLogProcessor:
-    """Procesador de logs streaming con múltiples implementaciones"""
+    """
+    Procesador de logs streaming con múltiples implementaciones
     
-    def __init__(self, input_file: Path = None, output_dir: Path = None):
+    Usado como context manager mantiene un pool de procesos precalentado que
+    se reutiliza entre motores y repeticiones; fuera de él, cada ejecución de
+    multiprocessing arranca y cierra su propio pool.
+    """
+    
+    def __init__(self, input_file: Path = None, output_dir: Path = None,
+                 hll_precision: int = DEFAULT_HLL_PRECISION, max_memory: int = None,
+                 sample_fraction: float = None, sample_method: str = SAMPLE_HASH,
+                 dedup: bool = False, dedup_state: Path = None,
+                 dedup_capacity: int = DEFAULT_BLOOM_CAPACITY,
+                 dedup_error_rate: float = DEFAULT_BLOOM_ERROR_RATE):
         self.input_file = input_file or Path("data/raw/sample.log.gz")
         self.output_dir = output_dir or Path("data/processed")
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -58,93 +82,130 @@ class StreamingLogProcessor:
         self.chunk_size = 100000
         self.min_status_code = 500
         
+        # Pipeline en hilos de pandas streaming
+        self.parse_workers = 1
+        self.queue_size = 8
+        self.read_block_size = 1024 * 1024
+        
+        # Precisión de los contadores HyperLogLog (2^p registros por sketch)
+        HyperLogLog(hll_precision)  # Valida el rango
+        self.hll_precision = hll_precision
+        
+        # Muestreo determinista: solo se decodifica una fracción de las líneas y
+        # los conteos se reescalan con intervalos de confianza
+        self.sampler = None
+        if sample_fraction is not None and sample_fraction < 1:
+            self.sampler = LineSampler(sample_fraction, sample_method)
+        self.sample_confidence = DEFAULT_CONFIDENCE
+        
+        # Deduplicación por request_id con filtro de Bloom persistente: cada
+        # motor parte del estado guardado y run_engine() lo actualiza
+        self.dedup = dedup
+        self.dedup_state = dedup_state or self.output_dir / DEDUP_STATE_NAME
+        self.dedup_capacity = dedup_capacity
+        self.dedup_error_rate = dedup_error_rate
+        self.deduplicator = None
+        
+        # Presupuesto de memoria (bytes): si existe, batch y workers se derivan de él
+        # y chunk_size deja de ser fijo. Sin max_memory se usa el límite del cgroup.
+        self.max_memory = max_memory
+        self.memory_budget = resolve_memory_budget(max_memory)
+        self._task_memory = None
+        
+        # CPUs utilizables (afinidad y cuota del cgroup, no los núcleos del host):
+        # dimensionan workers, particiones y pools de hilos nativos
+        self.cpus = available_cpus()
+        limit_native_threads(self.cpus)
+        
+        # Pool de procesos persistente (ver __enter__)
+        self.worker_pool = None
+        self._keep_worker_pool = False
+    
+    def __enter__(self):
+        self._keep_worker_pool = True
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def __getstate__(self):
+        # Los workers reciben el procesador sin el pool que los contiene ni el
+        # filtro de deduplicación (leen el persistido, ver TaskDeduplicator)
+        state = self.__dict__.copy()
+        state['worker_pool'] = None
+        state['deduplicator'] = None
+        return state
+    
+    def close(self):
+        """Cierra el pool de procesos persistente"""
+        self._keep_worker_pool = False
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+            self.worker_pool = None
+    
+    def _acquire_worker_pool(self, num_workers: int) -> Tuple[WorkerPool, float]:
+        """Pool de procesos listo y segundos de arranque pagados en esta llamada"""
+        if self.worker_pool is None:
+            self.worker_pool = WorkerPool(num_workers)
+        return self.worker_pool, self.worker_pool.start()
+        
     def process_with_pandas_streaming(self) -> Dict[str, Any]:
-        """Implementación base con pandas streaming"""
+        """
+        Implementación base con pandas streaming
+        
+        Ejecuta un pipeline en hilos: descompresión -> parseo -> agregación ->
+        escritura, conectados por colas acotadas. zlib libera el GIL, por lo que
+        la descompresión se solapa con el parseo.
+        """
         logger.info("Iniciando procesamiento con pandas streaming")
         
         start_time = time.time()
         start_memory = psutil.Process().memory_info().rss / 1024 / 1024
+        self._start_dedup()
         
-        records = []
-        total_records = 0
-        filtered_records = 0
-        error_records = 0
+        output_file = self.output_dir / "log_analysis_pandas_streaming.parquet"
+        summary = {}
+        
+        sizer = self._new_batch_sizer(self.memory_budget, self.parse_workers)
+        
+        raw_queue = MonitoredQueue('raw_blocks', self.queue_size)
+        aggregate_queue = MonitoredQueue('partial_aggregates', self.queue_size)
+        write_queue = MonitoredQueue('final_result', 1)
         
         try:
-            with gzip.open(self.input_file, 'rt', encoding='utf-8') as f:
-                batch = []
-                
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    try:
-                        record = json.loads(line)
-                        total_records += 1
-                        
-                        # Filtrar por status_code >= 500
-                        if record.get('status_code', 0) >= self.min_status_code:
-                            filtered_records += 1
-                            
-                            # Limpiar y parsear campos
-                            cleaned_record = self._clean_log_record(record)
-                            if cleaned_record:
-                                batch.append(cleaned_record)
-                        
-                        # Procesar batch cuando alcance el tamaño objetivo
-                        if len(batch) >= self.chunk_size:
-                            batch_df = pd.DataFrame(batch)
-                            aggregated = self._aggregate_by_hour_endpoint(batch_df)
-                            records.append(aggregated)
-                            batch = []
-                            
-                            if line_num % 500000 == 0:
-                                logger.info(f"Procesadas {line_num:,} líneas, {filtered_records:,} filtradas")
-                    
-                    except json.JSONDecodeError:
-                        error_records += 1
-                        if error_records % 10000 == 0:
-                            logger.warning(f"Errores JSON acumulados: {error_records}")
-                
-                # Procesar último batch
-                if batch:
-                    batch_df = pd.DataFrame(batch)
-                    aggregated = self._aggregate_by_hour_endpoint(batch_df)
-                    records.append(aggregated)
-            
-            # Consolidar resultados
-            if records:
-                final_df = pd.concat(records, ignore_index=True)
-                final_df = final_df.groupby(['hour', 'endpoint']).agg({
-                    'count': 'sum',
-                    'avg_response_time': 'mean',
-                    'error_rate': 'mean'
-                }).reset_index()
-            else:
-                final_df = pd.DataFrame()
-            
-            # Exportar a Parquet
-            output_file = self.output_dir / "log_analysis_pandas_streaming.parquet"
-            if HAS_PYARROW and len(final_df) > 0:
-                final_df.to_parquet(output_file, compression='snappy', engine='pyarrow')
-            elif len(final_df) > 0:
-                final_df.to_csv(output_file.with_suffix('.csv'), index=False)
+            pipeline = StagePipeline()
+            pipeline.add_stage('decompress', self._pipeline_decompress, raw_queue, self.parse_workers)
+            for worker_id in range(self.parse_workers):
+                pipeline.add_stage(f'parse-{worker_id}', self._pipeline_parse,
+                                   raw_queue, aggregate_queue, worker_id, sizer)
+            pipeline.add_stage('aggregate', self._pipeline_aggregate,
+                               aggregate_queue, write_queue, self.parse_workers, summary)
+            pipeline.add_stage('write', self._pipeline_write, write_queue, output_file, summary)
+            pipeline.run()
             
             end_time = time.time()
             end_memory = psutil.Process().memory_info().rss / 1024 / 1024
+            total_records = summary['total_records']
             
             stats = {
                 'method': 'pandas_streaming',
                 'total_records': total_records,
-                'filtered_records': filtered_records,
-                'processed_records': len(final_df),
-                'error_records': error_records,
+                'filtered_records': summary['filtered_records'],
+                'processed_records': summary['processed_records'],
+                'error_records': summary['error_records'],
                 'processing_time_seconds': round(end_time - start_time, 2),
                 'memory_used_mb': round(end_memory - start_memory, 2),
                 'records_per_second': round(total_records / (end_time - start_time)),
                 'output_file': str(output_file),
-                'compression': 'snappy' if HAS_PYARROW else 'none'
+                'compression': 'snappy' if HAS_PYARROW else 'none',
+                'hll_precision': self.hll_precision,
+                'parse_workers': self.parse_workers,
+                'queue_occupancy': [
+                    q.occupancy_report() for q in (raw_queue, aggregate_queue, write_queue)
+                ],
+                'batching': sizer.report() if sizer else None,
+                'sampling': sampling_report(self.sampler, summary, self.sample_confidence),
+                'dedup': self.deduplicator.report() if self.deduplicator else None
             }
             
             logger.info(f"Procesamiento pandas completado: {stats}")
@@ -154,48 +215,246 @@ class StreamingLogProcessor:
             logger.error(f"Error en procesamiento pandas: {e}")
             raise
     
+    def _pipeline_decompress(self, raw_queue: MonitoredQueue, num_consumers: int):
+        """
+        Etapa 1: descomprime el archivo en bloques de bytes alineados a fin de línea
+        
+        Cada bloque viaja con el número de su primera línea (muestreo por stride).
+        """
+        try:
+            with open_compressed(self.input_file, 'rb') as f:
+                pending = b''
+                line_number = 0
+                while True:
+                    chunk = f.read(self.read_block_size)
+                    if not chunk:
+                        break
+                    chunk = pending + chunk
+                    cut = chunk.rfind(b'\n') + 1
+                    if cut == 0:
+                        pending = chunk
+                        continue
+                    block = chunk[:cut]
+                    raw_queue.put((line_number, block))
+                    line_number += block.count(b'\n')
+                    pending = chunk[cut:]
+                if pending:
+                    raw_queue.put((line_number, pending))
+        finally:
+            for _ in range(num_consumers):
+                raw_queue.put(END_OF_STREAM)
+    
+    def _pipeline_parse(self, raw_queue: MonitoredQueue, aggregate_queue: MonitoredQueue,
+                        worker_id: int, sizer: AdaptiveBatchSizer = None):
+        """
+        Etapa 2: parsea y filtra bloques, enviando agregados parciales por batch
+        
+        Los hilos de parseo comparten el deduplicador (un request_id repetido
+        se descarta aunque lo parseen hilos distintos) y el ajustador de batch
+        (la memoria medida es la del proceso); ambos actualizan su estado bajo
+        un lock propio. El batch, los sketches y los contadores son del hilo.
+        """
+        batch = LogRecordBatch(sizer.size if sizer else self.chunk_size)
+        sketches = {}
+        counters = {'total_records': 0, 'filtered_records': 0, 'error_records': 0,
+                    'skipped_lines': 0}
+        failure = None
+        
+        try:
+            while True:
+                item = raw_queue.get()
+                if item is END_OF_STREAM:
+                    break
+                if failure is not None:
+                    # Seguir drenando para no bloquear a la etapa de descompresión
+                    continue
+                first_line, block = item
+                try:
+                    self._parse_block(block, first_line, batch, sketches, counters,
+                                      aggregate_queue, worker_id, sizer)
+                except Exception as e:
+                    failure = e
+            
+            if failure is None and len(batch) > 0:
+                aggregate_queue.put(('data', worker_id, self._flush_batch(batch, sketches)))
+        finally:
+            aggregate_queue.put(('done', worker_id, {
+                'dictionaries': batch.dictionaries,
+                'sketches': sketches,
+                'stats': counters
+            }))
+        
+        if failure is not None:
+            raise failure
+    
+    def _parse_block(self, block: bytes, first_line: int, batch: LogRecordBatch, sketches: Dict,
+                     counters: Dict[str, int], aggregate_queue: MonitoredQueue, worker_id: int,
+                     sizer: AdaptiveBatchSizer = None):
+        """Parsea las líneas JSON de un bloque de bytes"""
+        previous_total = counters['total_records']
+        sampler = self.sampler
+        dedup = self.deduplicator
+        
+        for line_number, line in enumerate(block.split(b'\n'), first_line):
+            line = line.strip()
+            if not line:
+                continue
+            
+            # Las líneas fuera de la muestra se descartan sin decodificar el JSON
+            if sampler is not None and not sampler.keep(line, line_number):
+                counters['skipped_lines'] += 1
+                continue
+            
+            # request_id ya visto (reenvío): se descarta también sin decodificar
+            if dedup is not None and dedup.is_duplicate(line):
+                continue
+            
+            try:
+                record = json.loads(line)
+                counters['total_records'] += 1
+                
+                # Filtrar por status_code >= 500
+                if record.get('status_code', 0) >= self.min_status_code:
+                    counters['filtered_records'] += 1
+                    
+                    # Limpiar y parsear campos directamente en el batch
+                    self._clean_log_record(record, batch)
+                    
+                    # Procesar batch cuando alcance el tamaño objetivo
+                    if batch.is_full:
+                        aggregate_queue.put(('data', worker_id,
+                                             self._flush_batch(batch, sketches, sizer)))
+            
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                counters['error_records'] += 1
+                if counters['error_records'] % 10000 == 0:
+                    logger.warning(f"Errores JSON acumulados: {counters['error_records']}")
+        
+        if counters['total_records'] // 500000 > previous_total // 500000:
+            logger.info(f"Procesadas {counters['total_records']:,} líneas, "
+                        f"{counters['filtered_records']:,} filtradas")
+    
+    def _pipeline_aggregate(self, aggregate_queue: MonitoredQueue, write_queue: MonitoredQueue,
+                            num_producers: int, summary: Dict):
+        """Etapa 3: combina agregados parciales de todos los workers de parseo"""
+        partials = {}
+        worker_states = {}
+        final_df = None
+        
+        try:
+            while len(worker_states) < num_producers:
+                kind, worker_id, payload = aggregate_queue.get()
+                if kind == 'data':
+                    if len(payload) > 0:
+                        partials.setdefault(worker_id, []).append(payload)
+                else:
+                    worker_states[worker_id] = payload
+            
+            for key in ('total_records', 'filtered_records', 'error_records', 'skipped_lines'):
+                summary[key] = sum(state['stats'][key] for state in worker_states.values())
+            
+            dictionaries = new_dictionaries()
+            sketches = {}
+            frames = []
+            for worker_id, state in worker_states.items():
+                worker_frames = partials.get(worker_id, [])
+                result = {
+                    'dictionaries': state['dictionaries'],
+                    'sketches': state['sketches'],
+                    'data': pd.concat(worker_frames, ignore_index=True) if worker_frames else pd.DataFrame()
+                }
+                data = self._merge_worker_result(result, dictionaries, sketches)
+                if len(data) > 0:
+                    frames.append(data)
+            
+            final_df = self._consolidate_aggregates(frames, sketches, dictionaries)
+        finally:
+            write_queue.put(final_df)
+    
+    def _pipeline_write(self, write_queue: MonitoredQueue, output_file: Path, summary: Dict):
+        """Etapa 4: exporta el resultado final a Parquet (o CSV sin pyarrow)"""
+        final_df = write_queue.get()
+        if final_df is None:
+            return
+        
+        # Exportar a Parquet
+        if HAS_PYARROW and len(final_df) > 0:
+            final_df.to_parquet(output_file, compression='snappy', engine='pyarrow')
+        elif len(final_df) > 0:
+            final_df.to_csv(output_file.with_suffix('.csv'), index=False)
+        
+        summary['processed_records'] = len(final_df)
+    
     def process_with_multiprocessing(self) -> Dict[str, Any]:
         """Implementación con multiprocessing"""
         logger.info("Iniciando procesamiento con multiprocessing")
         
         start_time = time.time()
         start_memory = psutil.Process().memory_info().rss / 1024 / 1024
+        self._start_dedup()
         
-        # Dividir archivo en chunks para procesar en paralelo
-        chunks = self._split_log_file_for_multiprocessing()
+        # Dividir archivo en tareas de lectura para procesar en paralelo
+        chunks = self._plan_read_tasks(self.cpus)
         
-        # Procesar chunks en paralelo
-        num_workers = min(cpu_count(), len(chunks))
+        # Workers y presupuesto por worker según la memoria disponible
+        num_workers = self.cpus
+        if self.memory_budget:
+            plan = plan_workers(self.memory_budget, num_workers)
+            num_workers = plan['workers']
+            self._task_memory = (plan['worker_budget'], 1)
+        
+        # Procesar chunks en paralelo (pool persistente si se usa como context manager)
+        pool, pool_startup = self._acquire_worker_pool(num_workers)
+        num_workers = max(1, min(pool.processes, len(chunks)))
         logger.info(f"Usando {num_workers} workers para {len(chunks)} chunks")
         
-        with Pool(num_workers) as pool:
-            results = pool.map(self._process_chunk_multiprocessing, chunks)
+        results = []
+        try:
+            results = pool.map(self._process_read_task_shared, chunks)
+            if self.deduplicator is not None:
+                self._dedup_across_tasks(pool, chunks, results)
+        except BaseException:
+            self._discard_unread_results(results)
+            raise
+        finally:
+            self._task_memory = None
+            if not self._keep_worker_pool:
+                self.close()
         
         # Consolidar resultados
         all_stats = []
         total_records = 0
         filtered_records = 0
         error_records = 0
+        skipped_lines = 0
         processed_dfs = []
+        sketches = {}
+        dictionaries = new_dictionaries()
         
-        for result in results:
-            if result['status'] == 'success':
-                total_records += result['stats']['total_records']
-                filtered_records += result['stats']['filtered_records']
-                error_records += result['stats']['error_records']
-                if 'data' in result and len(result['data']) > 0:
-                    processed_dfs.append(result['data'])
-        
-        # Agregar resultados finales
-        if processed_dfs:
-            final_df = pd.concat(processed_dfs, ignore_index=True)
-            final_df = final_df.groupby(['hour', 'endpoint']).agg({
-                'count': 'sum',
-                'avg_response_time': 'mean',
-                'error_rate': 'mean'
-            }).reset_index()
-        else:
-            final_df = pd.DataFrame()
+        # Los agregados llegan en memoria compartida y se leen sin copia: los
+        # segmentos se liberan después de la consolidación, que los copia
+        with SharedResultReader() as reader:
+            try:
+                for result in results:
+                    if result['status'] == 'success':
+                        total_records += result['stats']['total_records']
+                        filtered_records += result['stats']['filtered_records']
+                        error_records += result['stats']['error_records']
+                        skipped_lines += result['stats']['skipped_lines']
+                        result['data'] = reader.attach(result.pop('data_ref'))
+                        data = self._merge_worker_result(result, dictionaries, sketches)
+                        del result['data']
+                        if len(data) > 0:
+                            processed_dfs.append(data)
+                
+                # Agregar resultados finales
+                final_df = self._consolidate_aggregates(processed_dfs, sketches, dictionaries)
+            finally:
+                # Soltar las vistas antes de liberar los segmentos, y eliminar
+                # los que no se llegaron a abrir si la fusión falló
+                processed_dfs = data = None
+                self._discard_unread_results(results)
+            shared_bytes = reader.shared_bytes
         
         # Exportar resultados
         output_file = self.output_dir / "log_analysis_multiprocessing.parquet"
@@ -207,6 +466,9 @@ class StreamingLogProcessor:
         end_time = time.time()
         end_memory = psutil.Process().memory_info().rss / 1024 / 1024
         
+        # El arranque del pool se reporta aparte del procesamiento
+        processing_time = end_time - start_time - pool_startup
+        
         stats = {
             'method': 'multiprocessing',
             'num_workers': num_workers,
@@ -214,11 +476,20 @@ class StreamingLogProcessor:
             'filtered_records': filtered_records,
             'processed_records': len(final_df),
             'error_records': error_records,
-            'processing_time_seconds': round(end_time - start_time, 2),
+            'processing_time_seconds': round(processing_time, 2),
             'memory_used_mb': round(end_memory - start_memory, 2),
-            'records_per_second': round(total_records / (end_time - start_time)),
+            'records_per_second': round(total_records / processing_time),
             'output_file': str(output_file),
-            'compression': 'snappy' if HAS_PYARROW else 'none'
+            'compression': 'snappy' if HAS_PYARROW else 'none',
+            'hll_precision': self.hll_precision,
+            'result_transport': transport_method(),
+            'shared_memory_bytes': shared_bytes,
+            'pool_startup_seconds': round(pool_startup, 3),
+            'pool_reused': pool_startup == 0.0,
+            'worker_pool': pool.usage_report(),
+            'batching': merge_batching_reports(r.get('batching') for r in results),
+            'sampling': self._sampling_summary(total_records, filtered_records, skipped_lines),
+            'dedup': self.deduplicator.report() if self.deduplicator else None
         }
         
         logger.info(f"Procesamiento multiprocessing completado: {stats}")
@@ -231,57 +502,81 @@ class StreamingLogProcessor:
             return {'method': 'polars', 'status': 'skipped', 'reason': 'library_not_available'}
         
         logger.info("Iniciando procesamiento con polars")
+        pl = import_optional('polars')
         
         start_time = time.time()
         start_memory = psutil.Process().memory_info().rss / 1024 / 1024
+        self._start_dedup()
         
         try:
             # Leer archivo con polars lazy evaluation
-            records = []
+            frames = []
+            sketches = {}
             total_records = 0
             filtered_records = 0
             error_records = 0
+            skipped_lines = 0
+            sizer = self._new_batch_sizer(self.memory_budget)
+            batch = LogRecordBatch(sizer.size if sizer else self.chunk_size)
+            sampler = self.sampler
+            dedup = self.deduplicator
             
-            with gzip.open(self.input_file, 'rt', encoding='utf-8') as f:
+            with open_compressed(self.input_file, 'rb') as f:
                 for line_num, line in enumerate(f, 1):
                     line = line.strip()
                     if not line:
                         continue
                     
+                    if sampler is not None and not sampler.keep(line, line_num - 1):
+                        skipped_lines += 1
+                        continue
+                    
+                    if dedup is not None and dedup.is_duplicate(line):
+                        continue
+                    
                     try:
                         record = json.loads(line)
                         total_records += 1
                         
                         if record.get('status_code', 0) >= self.min_status_code:
                             filtered_records += 1
-                            cleaned_record = self._clean_log_record(record)
-                            if cleaned_record:
-                                records.append(cleaned_record)
+                            self._clean_log_record(record, batch)
+                            if batch.is_full:
+                                frames.append(self._batch_to_polars(batch, sketches, sizer))
                     
-                    except json.JSONDecodeError:
+                    except (json.JSONDecodeError, UnicodeDecodeError):
                         error_records += 1
                     
                     if line_num % 500000 == 0:
                         logger.info(f"Polars: procesadas {line_num:,} líneas")
             
-            if records:
+            if len(batch) > 0:
+                frames.append(self._batch_to_polars(batch, sketches))
+            
+            if frames:
                 # Crear DataFrame con polars
-                df = pl.DataFrame(records)
+                df = pl.concat(frames)
                 
-                # Agregar por hora y endpoint usando polars lazy API
+                # Agregar por hora y endpoint (códigos de diccionario) usando polars lazy API
+                aggregations = [
+                    pl.len().alias('count'),
+                    pl.col('response_time_ms').mean().alias('avg_response_time'),
+                    pl.col('error_rate').mean().alias('error_rate')
+                ]
+                if self.sampler is not None:
+                    aggregations.append((pl.col('response_time_ms') ** 2).mean().alias('response_time_sq'))
                 result_df = (
                     df.lazy()
                     .group_by(['hour', 'endpoint'])
-                    .agg([
-                        pl.len().alias('count'),
-                        pl.col('response_time_ms').mean().alias('avg_response_time'),
-                        pl.col('error_rate').mean().alias('error_rate')
-                    ])
+                    .agg(aggregations)
                     .collect()
                 )
                 
                 # Convertir a pandas para exportar (compatibilidad)
                 final_df = result_df.to_pandas()
+                final_df = self._attach_distinct_counts(final_df, sketches)
+                final_df = self._scale_sample(final_df)
+                final_df = self._decode_group_columns(final_df, batch.dictionaries)
             else:
                 final_df = pd.DataFrame()
             
@@ -305,7 +600,11 @@ class StreamingLogProcessor:
                 'memory_used_mb': round(end_memory - start_memory, 2),
                 'records_per_second': round(total_records / (end_time - start_time)),
                 'output_file': str(output_file),
-                'compression': 'snappy' if HAS_PYARROW else 'none'
+                'compression': 'snappy' if HAS_PYARROW else 'none',
+                'hll_precision': self.hll_precision,
+                'batching': sizer.report() if sizer else None,
+                'sampling': self._sampling_summary(total_records, filtered_records, skipped_lines),
+                'dedup': self.deduplicator.report() if self.deduplicator else None
             }
             
             logger.info(f"Procesamiento polars completado: {stats}")
@@ -322,9 +621,12 @@ class StreamingLogProcessor:
             return {'method': 'dask', 'status': 'skipped', 'reason': 'library_not_available'}
         
         logger.info("Iniciando procesamiento con dask")
+        dd = import_optional('dask.dataframe')
+        delayed = import_optional('dask').delayed
         
         start_time = time.time()
         start_memory = psutil.Process().memory_info().rss / 1024 / 1024
+        self._start_dedup()
         
         try:
             # Procesar en chunks con dask delayed
@@ -333,32 +635,36 @@ class StreamingLogProcessor:
             # Crear delayed tasks
             delayed_tasks = [delayed(self._process_chunk_dask)(chunk) for chunk in chunks]
             
+            # Las tareas corren en hilos de este proceso: comparten el presupuesto
+            if self.memory_budget:
+                self._task_memory = (self.memory_budget, max(1, min(self.cpus, len(chunks))))
+            
             # Ejecutar tareas
-            results = dd.compute(*delayed_tasks)
+            try:
+                results = dd.compute(*delayed_tasks, num_workers=self.cpus)
+            finally:
+                self._task_memory = None
             
             # Consolidar resultados
             total_records = 0
             filtered_records = 0
             error_records = 0
+            skipped_lines = 0
             processed_dfs = []
+            sketches = {}
+            dictionaries = new_dictionaries()
             
             for result in results:
                 if result['status'] == 'success':
                     total_records += result['stats']['total_records']
                     filtered_records += result['stats']['filtered_records']
                     error_records += result['stats']['error_records']
-                    if 'data' in result and len(result['data']) > 0:
-                        processed_dfs.append(result['data'])
-            
-            if processed_dfs:
-                final_df = pd.concat(processed_dfs, ignore_index=True)
-                final_df = final_df.groupby(['hour', 'endpoint']).agg({
-                    'count': 'sum',
-                    'avg_response_time': 'mean',
-                    'error_rate': 'mean'
-                }).reset_index()
-            else:
-                final_df = pd.DataFrame()
+                    skipped_lines += result['stats']['skipped_lines']
+                    data = self._merge_worker_result(result, dictionaries, sketches)
+                    if len(data) > 0:
+                        processed_dfs.append(data)
+            
+            final_df = self._consolidate_aggregates(processed_dfs, sketches, dictionaries)
             
             # Exportar resultados
             output_file = self.output_dir / "log_analysis_dask.parquet"
@@ -380,7 +686,11 @@ class StreamingLogProcessor:
                 'memory_used_mb': round(end_memory - start_memory, 2),
                 'records_per_second': round(total_records / (end_time - start_time)),
                 'output_file': str(output_file),
-                'compression': 'snappy' if HAS_PYARROW else 'none'
+                'compression': 'snappy' if HAS_PYARROW else 'none',
+                'hll_precision': self.hll_precision,
+                'batching': merge_batching_reports(r.get('batching') for r in results),
+                'sampling': self._sampling_summary(total_records, filtered_records, skipped_lines),
+                'dedup': self.deduplicator.report() if self.deduplicator else None
             }
             
             logger.info(f"Procesamiento dask completado: {stats}")
@@ -390,8 +700,13 @@ class StreamingLogProcessor:
             logger.error(f"Error en procesamiento dask: {e}")
             raise
     
-    def _clean_log_record(self, record: Dict) -> Dict:
-        """Limpia y parsea campos de registro de log"""
+    def _clean_log_record(self, record: Dict, batch: LogRecordBatch) -> bool:
+        """
+        Limpia y parsea campos de registro de log escribiéndolos en el batch
+        
+        Returns:
+            True si el registro se añadió al batch
+        """
         try:
             # Extraer timestamp y convertir a hora
             timestamp_str = record.get('timestamp', '')
@@ -402,54 +717,229 @@ class StreamingLogProcessor:
             else:
                 hour = '1970-01-01 00:00:00'
             
-            # Extraer campos relevantes
-            cleaned = {
-                'hour': hour,
-                'endpoint': record.get('endpoint', 'unknown'),
-                'status_code': record.get('status_code', 0),
-                'response_time_ms': record.get('response_time_ms', 0),
-                'method': record.get('method', 'GET'),
-                'level': record.get('level', 'INFO')
-            }
-            
-            # Calcular error rate (1 si es error, 0 si no)
-            cleaned['error_rate'] = 1.0 if cleaned['status_code'] >= 500 else 0.0
+            # Un campo categórico a null (JSON null) cuenta como ausente: None no
+            # puede ser categoría del diccionario
+            endpoint = record.get('endpoint')
+            method = record.get('method')
+            level = record.get('level')
             
-            return cleaned
+            # Extraer campos relevantes (error_rate se deriva de status_code en el batch)
+            batch.append(
+                hour,
+                'unknown' if endpoint is None else endpoint,
+                record.get('status_code', 0),
+                record.get('response_time_ms', 0),
+                'GET' if method is None else method,
+                'INFO' if level is None else level,
+                record.get('user_id'),
+                record.get('ip_address')
+            )
+            return True
             
         except Exception as e:
             logger.debug(f"Error limpiando registro: {e}")
+            return False
+    
+    def _flush_batch(self, batch: LogRecordBatch, sketches: Dict,
+                     sizer: AdaptiveBatchSizer = None) -> pd.DataFrame:
+        """Agrega un batch lleno, actualiza los sketches y lo deja listo para reutilizar"""
+        self._update_distinct_sketches(sketches, batch)
+        aggregated = self._aggregate_by_hour_endpoint(batch.to_pandas(decode=False))
+        self._recycle_batch(batch, sizer)
+        return aggregated
+    
+    def _recycle_batch(self, batch: LogRecordBatch, sizer: AdaptiveBatchSizer = None):
+        """Vacía el batch y aplica el tamaño que sugiere el presupuesto de memoria"""
+        records = len(batch)
+        batch.reset()
+        if sizer is not None:
+            batch.resize(sizer.observe(records))
+    
+    def _new_batch_sizer(self, budget: int, concurrent_batches: int = 1) -> AdaptiveBatchSizer:
+        """Ajustador de batch para un presupuesto de memoria (None si no hay presupuesto)"""
+        if not budget:
             return None
+        return AdaptiveBatchSizer(budget, concurrent_batches=concurrent_batches)
+    
+    def _batch_to_polars(self, batch: LogRecordBatch, sketches: Dict,
+                         sizer: AdaptiveBatchSizer = None):
+        """Copia las columnas necesarias del batch a un DataFrame de polars"""
+        pl = import_optional('polars')
+        self._update_distinct_sketches(sketches, batch)
+        n = len(batch)
+        frame = pl.DataFrame({
+            'hour': batch.codes['hour'][:n].copy(),
+            'endpoint': batch.codes['endpoint'][:n].copy(),
+            'response_time_ms': batch.response_time_ms[:n].copy(),
+            'error_rate': (batch.status_code[:n] >= 500).astype('float64')
+        })
+        self._recycle_batch(batch, sizer)
+        return frame
     
     def _aggregate_by_hour_endpoint(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Agrupa datos por hora y endpoint"""
+        """Agrupa datos por hora y endpoint (códigos de diccionario)"""
         if len(df) == 0:
             return pd.DataFrame()
         
         try:
-            aggregated = df.groupby(['hour', 'endpoint']).agg({
+            aggregations = {
                 'status_code': 'count',
                 'response_time_ms': 'mean',
                 'error_rate': 'mean'
-            }).reset_index()
+            }
+            columns = ['hour', 'endpoint', 'count', 'avg_response_time', 'error_rate']
+            
+            # Con muestreo se conserva la media de cuadrados para estimar la varianza
+            if self.sampler is not None:
+                df = add_square_column(df)
+                aggregations['response_time_sq'] = 'mean'
+                columns.append('response_time_sq')
             
-            aggregated.columns = ['hour', 'endpoint', 'count', 'avg_response_time', 'error_rate']
+            aggregated = df.groupby(['hour', 'endpoint']).agg(aggregations).reset_index()
+            aggregated.columns = columns
             return aggregated
             
         except Exception as e:
             logger.error(f"Error en agregación: {e}")
             return pd.DataFrame()
     
+    def _update_distinct_sketches(self, sketches: Dict[Tuple[str, str], Dict[str, HyperLogLog]],
+                                  batch: LogRecordBatch):
+        """Registra los hashes de user_id e ip_address del batch en los sketches de su grupo"""
+        n = len(batch)
+        rows = zip(
+            batch.codes['hour'][:n].tolist(),
+            batch.codes['endpoint'][:n].tolist(),
+            batch.user_hash[:n].tolist(),
+            batch.ip_hash[:n].tolist()
+        )
+        for hour_code, endpoint_code, user_hash, ip_hash in rows:
+            key = (hour_code, endpoint_code)
+            group = sketches.get(key)
+            if group is None:
+                group = {
+                    'users': HyperLogLog(self.hll_precision),
+                    'ips': HyperLogLog(self.hll_precision)
+                }
+                sketches[key] = group
+            if user_hash:
+                group['users'].add_hash(user_hash)
+            if ip_hash:
+                group['ips'].add_hash(ip_hash)
+    
+    def _merge_distinct_sketches(self, target: Dict, source: Dict, remaps: Dict = None):
+        """Combina sketches de otro worker/batch en target, traduciendo sus códigos si hace falta"""
+        for key, group in source.items():
+            if remaps is not None:
+                key = (int(remaps['hour'][key[0]]), int(remaps['endpoint'][key[1]]))
+            if key in target:
+                target[key]['users'].merge(group['users'])
+                target[key]['ips'].merge(group['ips'])
+            else:
+                target[key] = group
+    
+    def _attach_distinct_counts(self, df: pd.DataFrame, sketches: Dict) -> pd.DataFrame:
+        """Añade conteos HyperLogLog de usuarios/IPs distintos y su error estándar"""
+        if len(df) == 0:
+            return df
+        
+        users, users_error, ips, ips_error = [], [], [], []
+        for hour, endpoint in zip(df['hour'].tolist(), df['endpoint'].tolist()):
+            group = sketches.get((hour, endpoint))
+            if group is None:
+                users.append(0)
+                users_error.append(0.0)
+                ips.append(0)
+                ips_error.append(0.0)
+                continue
+            n_users = group['users'].count()
+            n_ips = group['ips'].count()
+            users.append(n_users)
+            users_error.append(round(n_users * group['users'].relative_error, 2))
+            ips.append(n_ips)
+            ips_error.append(round(n_ips * group['ips'].relative_error, 2))
+        
+        df = df.copy()
+        df['distinct_users'] = users
+        df['distinct_users_error'] = users_error
+        df['distinct_ips'] = ips
+        df['distinct_ips_error'] = ips_error
+        return df
+    
+    def _merge_worker_result(self, result: Dict, dictionaries: Dict, sketches: Dict) -> pd.DataFrame:
+        """Traduce los códigos de un worker a los diccionarios globales y combina sus sketches"""
+        remaps = merge_dictionaries(dictionaries, result['dictionaries'])
+        self._merge_distinct_sketches(sketches, result.get('sketches', {}), remaps)
+        
+        data = result.get('data')
+        if data is None or len(data) == 0:
+            return pd.DataFrame()
+        
+        # Solo se sustituyen las columnas de códigos; el resto sigue siendo la
+        # vista del resultado (p. ej. el segmento compartido) hasta la consolidación
+        return data.assign(hour=remaps['hour'][data['hour'].to_numpy()],
+                           endpoint=remaps['endpoint'][data['endpoint'].to_numpy()])
+    
+    def _consolidate_aggregates(self, frames: List[pd.DataFrame], sketches: Dict,
+                                dictionaries: Dict) -> pd.DataFrame:
+        """Combina agregados parciales, añade conteos de distintos y decodifica los grupos"""
+        if not frames:
+            return pd.DataFrame()
+        
+        final_df = pd.concat(frames, ignore_index=True)
+        aggregations = {
+            'count': 'sum',
+            'avg_response_time': 'mean',
+            'error_rate': 'mean'
+        }
+        if 'response_time_sq' in final_df.columns:
+            aggregations['response_time_sq'] = 'mean'
+        final_df = final_df.groupby(['hour', 'endpoint']).agg(aggregations).reset_index()
+        
+        # Conteos aproximados de usuarios/IPs distintos
+        final_df = self._attach_distinct_counts(final_df, sketches)
+        final_df = self._scale_sample(final_df)
+        return self._decode_group_columns(final_df, dictionaries)
+    
+    def _scale_sample(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Reescala los conteos de la muestra y añade sus intervalos de confianza"""
+        if self.sampler is None:
+            return df
+        return scale_sampled_aggregates(df, self.sampler.fraction, self.sample_confidence)
+    
+    def _start_dedup(self):
+        """Carga el filtro de deduplicación persistido (cada motor parte del mismo estado)"""
+        self.deduplicator = None
+        if self.dedup:
+            self.deduplicator = LineDeduplicator(self.dedup_state, self.dedup_capacity,
+                                                 self.dedup_error_rate)
+    
+    def _sampling_summary(self, total_records: int, filtered_records: int,
+                          skipped_lines: int) -> Dict[str, Any]:
+        """Totales estimados del muestreo (None sin muestreo)"""
+        counters = {
+            'total_records': total_records,
+            'filtered_records': filtered_records,
+            'skipped_lines': skipped_lines
+        }
+        return sampling_report(self.sampler, counters, self.sample_confidence)
+    
+    def _decode_group_columns(self, df: pd.DataFrame, dictionaries: Dict) -> pd.DataFrame:
+        """Convierte los códigos de hora/endpoint en columnas categóricas (diccionario en Parquet)"""
+        df['hour'] = dictionaries['hour'].decode(df['hour'].to_numpy())
+        df['endpoint'] = dictionaries['endpoint'].decode(df['endpoint'].to_numpy())
+        return df
+    
     def _split_log_file_for_multiprocessing(self) -> List[Path]:
         """Divide archivo de log en chunks para multiprocessing"""
         chunks = []
-        chunk_size = 1000000  # 1M líneas por chunk
+        chunk_size = SPLIT_CHUNK_LINES
         
         temp_dir = self.output_dir / "temp_chunks"
         temp_dir.mkdir(exist_ok=True)
         
         try:
-            with gzip.open(self.input_file, 'rt', encoding='utf-8') as f:
+            with open_compressed(self.input_file, 'rt', encoding='utf-8') as f:
                 chunk_num = 0
                 current_chunk = []
                 
@@ -480,37 +970,124 @@ class StreamingLogProcessor:
             logger.error(f"Error dividiendo archivo: {e}")
             return []
     
+    def _plan_read_tasks(self, num_workers: int) -> List[Tuple]:
+        """
+        Planifica las tareas de lectura para los motores paralelos
+        
+        - Entrada sin comprimir: rangos de bytes alineados a línea (mmap en cada worker)
+        - Gzip por bloques (multi-miembro): grupos de miembros independientes
+        - Gzip con índice .gzidx vigente: rangos del contenido descomprimido
+        - Resto de entradas comprimidas: chunks temporales de líneas
+        
+        El último elemento de cada tarea es el número global de su primera
+        línea, para que el muestreo por stride coincida con la lectura
+        secuencial (None si no se necesita). En los rangos sin comprimir se
+        cuenta solo al muestrear por stride; los rangos de gzip no lo conocen
+        sin descomprimir lo anterior, así que con stride se usan chunks.
+        """
+        numbered = self.sampler is not None and self.sampler.stride is not None
+        codec = detect_codec(self.input_file)
+        if codec == CODEC_PLAIN:
+            ranges = split_byte_ranges(self.input_file, num_workers)
+            logger.info(f"Archivo sin comprimir dividido en {len(ranges)} rangos de bytes")
+            first_lines = self._range_first_lines(ranges) if numbered else [None] * len(ranges)
+            return [('byte_range', str(self.input_file), start, end, first_line)
+                    for (start, end), first_line in zip(ranges, first_lines)]
+        
+        if codec == CODEC_GZIP and not numbered:
+            ranges = split_member_ranges(self.input_file, num_workers)
+            if ranges:
+                logger.info(f"Gzip por bloques repartido en {len(ranges)} grupos de miembros")
+                return [('gzip_members', str(self.input_file), start, end, None) for start, end in ranges]
+            
+            index_file = find_gzip_index(self.input_file)
+            if index_file is not None:
+                ranges = split_indexed_ranges(self.input_file, index_file, num_workers)
+                logger.info(f"Archivo gzip indexado dividido en {len(ranges)} rangos ({index_file.name})")
+                return [('gzip_index', str(self.input_file), str(index_file), start, end, None)
+                        for start, end in ranges]
+        
+        return [('chunk_file', str(chunk), i * SPLIT_CHUNK_LINES)
+                for i, chunk in enumerate(self._split_log_file_for_multiprocessing())]
+    
+    def _range_first_lines(self, ranges: List[Tuple[int, int]]) -> List[int]:
+        """Número global de la primera línea de cada rango de bytes"""
+        first_lines = [0]
+        for start, end in ranges[:-1]:
+            first_lines.append(first_lines[-1] + count_range_lines(self.input_file, start, end))
+        return first_lines[:len(ranges)]
+    
+    def _iter_task_lines(self, task: Tuple):
+        """Itera las líneas (bytes) de una tarea de lectura"""
+        kind = task[0]
+        if kind == 'chunk_file':
+            with open(task[1], 'rb') as f:
+                yield from f
+        elif kind == 'byte_range':
+            yield from iter_range_lines(Path(task[1]), task[2], task[3])
+        elif kind == 'gzip_members':
+            yield from iter_member_lines(Path(task[1]), task[2], task[3])
+        elif kind == 'gzip_index':
+            yield from iter_indexed_range_lines(Path(task[1]), Path(task[2]), task[3], task[4])
+        else:
+            raise ValueError(f"Tipo de tarea de lectura desconocido: {kind}")
+    
     def _process_chunk_multiprocessing(self, chunk_file: Path) -> Dict:
         """Procesa un chunk específico para multiprocessing"""
+        return self._process_read_task(('chunk_file', str(chunk_file), None))
+    
+    def _process_read_task(self, task: Tuple, dedup=None) -> Dict:
+        """
+        Procesa una tarea de lectura (chunk temporal o rango) en un worker
+        
+        Args:
+            task: Tarea de _plan_read_tasks
+            dedup: Deduplicador de la tarea (por defecto, el compartido del procesador)
+        """
         try:
-            records = []
+            aggregated_batches = []
+            sketches = {}
             total_records = 0
             filtered_records = 0
             error_records = 0
+            skipped_lines = 0
+            sizer = self._new_batch_sizer(*self._task_memory) if self._task_memory else None
+            batch = LogRecordBatch(sizer.size if sizer else self.chunk_size)
+            sampler = self.sampler
+            if dedup is None:
+                dedup = self.deduplicator
             
-            with open(chunk_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    try:
-                        record = json.loads(line)
-                        total_records += 1
-                        
-                        if record.get('status_code', 0) >= self.min_status_code:
-                            filtered_records += 1
-                            cleaned_record = self._clean_log_record(record)
-                            if cleaned_record:
-                                records.append(cleaned_record)
+            for line_number, line in enumerate(self._iter_task_lines(task), task[-1] or 0):
+                line = line.strip()
+                if not line:
+                    continue
+                
+                if sampler is not None and not sampler.keep(line, line_number):
+                    skipped_lines += 1
+                    continue
+                
+                if dedup is not None and dedup.is_duplicate(line):
+                    continue
+                
+                try:
+                    record = json.loads(line)
+                    total_records += 1
                     
-                    except json.JSONDecodeError:
-                        error_records += 1
+                    if record.get('status_code', 0) >= self.min_status_code:
+                        filtered_records += 1
+                        self._clean_log_record(record, batch)
+                        if batch.is_full:
+                            aggregated_batches.append(self._flush_batch(batch, sketches, sizer))
+                
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    error_records += 1
             
             # Agregar datos del chunk
-            if records:
-                df = pd.DataFrame(records)
-                aggregated_df = self._aggregate_by_hour_endpoint(df)
+            if len(batch) > 0:
+                aggregated_batches.append(self._flush_batch(batch, sketches))
+            
+            if aggregated_batches:
+                aggregated_df = pd.concat(aggregated_batches, ignore_index=True)
             else:
                 aggregated_df = pd.DataFrame()
             
@@ -519,42 +1096,116 @@ class StreamingLogProcessor:
                 'stats': {
                     'total_records': total_records,
                     'filtered_records': filtered_records,
-                    'error_records': error_records
+                    'error_records': error_records,
+                    'skipped_lines': skipped_lines
                 },
-                'data': aggregated_df
+                'data': aggregated_df,
+                'sketches': sketches,
+                'dictionaries': batch.dictionaries,
+                'batching': sizer.report() if sizer else None
             }
             
         except Exception as e:
-            logger.error(f"Error procesando chunk {chunk_file}: {e}")
+            logger.error(f"Error procesando chunk {task}: {e}")
             return {
                 'status': 'error',
                 'error': str(e),
                 'stats': {
                     'total_records': 0,
                     'filtered_records': 0,
-                    'error_records': 0
+                    'error_records': 0,
+                    'skipped_lines': 0
                 }
             }
     
-    def _split_log_file_for_dask(self) -> List[Path]:
+    def _process_read_task_shared(self, task: Tuple, drop_ids: frozenset = frozenset()) -> Dict:
+        """Procesa una tarea y publica el agregado en memoria compartida (solo descriptor por el pipe)"""
+        dedup = None
+        if self.dedup:
+            dedup = TaskDeduplicator(load_persisted_filter(self.dedup_state), drop_ids=drop_ids)
+        result = self._process_read_task(task, dedup)
+        if result['status'] == 'success':
+            result['data_ref'] = publish_frame(result.pop('data'))
+            # Solo los IDs nuevos de la tarea: el padre los inserta en su filtro
+            if dedup is not None:
+                result['dedup'] = dedup.report()
+        return result
+    
+    def _discard_unread_results(self, results: List[Dict]):
+        """Elimina los segmentos compartidos de los resultados que no se leyeron"""
+        for result in results:
+            descriptor = result.pop('data_ref', None)
+            if descriptor is not None:
+                discard_frame(descriptor)
+    
+    def _reprocess_read_task_shared(self, task_and_drop_ids: Tuple[Tuple, frozenset]) -> Dict:
+        """_process_read_task_shared descartando IDs que ya insertó otra tarea"""
+        return self._process_read_task_shared(*task_and_drop_ids)
+    
+    def _dedup_across_tasks(self, pool: WorkerPool, tasks: List[Tuple], results: List[Dict]):
+        """
+        Inserta en orden de archivo los IDs nuevos de cada tarea en el filtro del padre
+        
+        Un ID que ya insertó una tarea anterior es un duplicado entre workers:
+        esa tarea se reprocesa descartándolo, con el mismo resultado que una
+        lectura secuencial. Sin segmentos reenviados no se reprocesa nada.
+        """
+        repeated = {}
+        for i, result in enumerate(results):
+            if result['status'] == 'success':
+                ids = self.deduplicator.add_task_ids(result['dedup'])
+                if len(ids):
+                    repeated[i] = frozenset(ids.tolist())
+        
+        if repeated:
+            logger.info(f"{sum(len(ids) for ids in repeated.values())} request_id repetidos "
+                        f"entre tareas: reprocesando {len(repeated)} tareas")
+            retried = pool.map(self._reprocess_read_task_shared,
+                               [(tasks[i], ids) for i, ids in repeated.items()])
+            for i, result in zip(repeated, retried):
+                discard_frame(results[i]['data_ref'])
+                results[i] = result
+        
+        for result in results:
+            if result['status'] == 'success':
+                self.deduplicator.duplicates += result['dedup']['duplicates']
+    
+    def _split_log_file_for_dask(self) -> List[Tuple]:
         """Divide archivo para procesamiento con dask"""
-        return self._split_log_file_for_multiprocessing()
+        return self._plan_read_tasks(self.cpus)
     
-    def _process_chunk_dask(self, chunk_file: Path) -> Dict:
+    def _process_chunk_dask(self, task: Tuple) -> Dict:
         """Procesa chunk con dask delayed"""
-        return self._process_chunk_multiprocessing(chunk_file)
+        return self._process_read_task(task)
     
-    def run_all_benchmarks(self) -> Dict[str, Any]:
-        """Ejecuta todos los benchmarks y compara resultados"""
-        logger.info("=== INICIANDO BENCHMARKS COMPLETOS ===")
+    def run_all_benchmarks(self, codec_matrix: bool = False) -> Dict[str, Any]:
+        """
+        Ejecuta todos los benchmarks y compara resultados
         
-        results = {}
+        Args:
+            codec_matrix: Repetir los motores con la entrada recomprimida en cada
+                códec disponible (matriz códec x motor en el reporte)
+        """
+        logger.info("=== INICIANDO BENCHMARKS COMPLETOS ===")
         
         # Verificar que el archivo de entrada existe
         if not self.input_file.exists():
             logger.error(f"Archivo de entrada no encontrado: {self.input_file}")
             return {'error': 'input_file_not_found'}
         
+        # Un solo pool de procesos para todos los motores y la matriz de códecs
+        keep_worker_pool = self._keep_worker_pool
+        self._keep_worker_pool = True
+        try:
+            return self._run_benchmarks(codec_matrix)
+        finally:
+            if not keep_worker_pool:
+                self.close()
+    
+    def _run_benchmarks(self, codec_matrix: bool) -> Dict[str, Any]:
+        """Ejecuta cada motor (y la matriz de códecs) y genera el reporte"""
+        results = {}
+        
         file_size_mb = self.input_file.stat().st_size / (1024 * 1024)
         logger.info(f"Archivo de entrada: {self.input_file} ({file_size_mb:.1f} MB)")
         
@@ -586,18 +1237,91 @@ class StreamingLogProcessor:
             logger.error(f"Error en dask: {e}")
             results['dask'] = {'status': 'error', 'error': str(e)}
         
+        matrix = self.run_codec_matrix() if codec_matrix else None
+        
         # Generar reporte comparativo
-        self._generate_benchmark_report(results)
+        pool_usage = self.worker_pool.usage_report() if self.worker_pool else None
+        self._generate_benchmark_report(results, matrix, pool_usage)
         
         return results
     
-    def _generate_benchmark_report(self, results: Dict[str, Any]):
+    def _benchmark_engines(self) -> Dict[str, Any]:
+        """Motores a comparar, en el orden del reporte"""
+        return {name: getattr(self, spec.method) for name, spec in ENGINES.items()}
+    
+    def run_engine(self, name: str) -> Dict[str, Any]:
+        """
+        Ejecuta un único motor del registro (solo importa sus dependencias)
+        
+        Es la ejecución "real" de un job: si hay deduplicación, los request_id
+        vistos se persisten para la siguiente. Los benchmarks no la persisten,
+        para que todos los motores partan del mismo estado.
+        """
+        if name not in ENGINES:
+            raise ValueError(f"Motor desconocido: {name} (disponibles: {', '.join(engine_names())})")
+        result = getattr(self, ENGINES[name].method)()
+        if self.deduplicator is not None and result.get('status') != 'skipped':
+            self.deduplicator.save()
+        return result
+    
+    def run_codec_matrix(self, codecs: List[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Ejecuta cada motor con la entrada recomprimida en cada códec
+        
+        Args:
+            codecs: Códecs a evaluar (por defecto, todos los disponibles)
+            
+        Returns:
+            Dict códec -> {backend, file_size_mb, motor -> records/seg o estado}
+        """
+        backends = available_codecs()
+        if codecs is None:
+            codecs = [codec for codec, backend in backends.items() if backend]
+        
+        original_input = self.input_file
+        temp_dir = self.output_dir / "temp_codecs"
+        matrix = {}
+        
+        try:
+            for codec in codecs:
+                if not backends.get(codec):
+                    matrix[codec] = {'backend': None, 'status': 'skipped'}
+                    continue
+                
+                encoded = temp_dir / f"codec_input.log{CODEC_EXTENSIONS[codec]}"
+                recompress_file(original_input, encoded, codec)
+                self.input_file = encoded
+                
+                row = {
+                    'backend': backends[codec],
+                    'file_size_mb': round(encoded.stat().st_size / (1024 * 1024), 2)
+                }
+                for engine, run in self._benchmark_engines().items():
+                    try:
+                        result = run()
+                        row[engine] = result.get('records_per_second', result.get('status'))
+                    except Exception as e:
+                        logger.error(f"Error en matriz de códecs ({codec}, {engine}): {e}")
+                        row[engine] = 'error'
+                
+                matrix[codec] = row
+                logger.info(f"Matriz de códecs - {codec}: {row}")
+                encoded.unlink()
+        finally:
+            self.input_file = original_input
+        
+        return matrix
+    
+    def _generate_benchmark_report(self, results: Dict[str, Any], codec_matrix: Dict = None,
+                                   pool_usage: Dict = None):
         """Genera reporte comparativo de benchmarks"""
         report_file = self.output_dir / "benchmark_report.md"
         
         with open(report_file, 'w') as f:
             f.write("# Reporte de Benchmarks - ETL Streaming Log Processing\n\n")
             f.write(f"**Archivo procesado**: {self.input_file}\n")
+            codec = detect_codec(self.input_file)
+            f.write(f"**Códec de entrada**: {codec} ({available_codecs()[codec]})\n")
             f.write(f"**Fecha**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
             
             f.write("## Resultados por Método\n\n")
@@ -630,17 +1354,119 @@ class StreamingLogProcessor:
                                    key=lambda x: x[1].get('memory_used_mb', float('inf')))
                 f.write(f"**Más eficiente en memoria**: {most_efficient[0]} ({most_efficient[1].get('memory_used_mb', 0)} MB)\n\n")
             
+            # Ocupación de colas del pipeline en hilos
+            for method, result in results.items():
+                if 'queue_occupancy' not in result:
+                    continue
+                f.write(f"## Ocupación de colas ({method}, {result.get('parse_workers', 1)} workers de parseo)\n\n")
+                f.write("| Cola | Capacidad | Items | Ocupación media | Ocupación máx. | Esperas por cola llena |\n")
+                f.write("|------|-----------|-------|-----------------|----------------|------------------------|\n")
+                for q in result['queue_occupancy']:
+                    f.write(f"| {q['queue']} | {q['maxsize']} | {q['items']:,} | {q['avg_occupancy']} | "
+                            f"{q['max_occupancy']} | {q['full_waits']:,} |\n")
+                f.write("\n")
+            
+            # Ajuste de batch por presupuesto de memoria
+            batching = {m: r['batching'] for m, r in results.items() if r.get('batching')}
+            if batching:
+                f.write(f"## Batching Adaptativo (presupuesto {self.memory_budget / 1024 ** 2:.0f} MB)\n\n")
+                f.write("| Método | Bytes/registro | Batch inicial | Batch final | Rango | Reducciones | RSS pico (MB) |\n")
+                f.write("|--------|----------------|---------------|-------------|-------|-------------|---------------|\n")
+                for method, b in batching.items():
+                    f.write(f"| {method} | {b['bytes_per_record']:,} | {b['batch_size_initial']:,} | "
+                            f"{b['batch_size_final']:,} | {b['batch_size_min']:,}-{b['batch_size_max']:,} | "
+                            f"{b['shrinks']} | {b['peak_rss_mb']} |\n")
+                f.write("\n")
+            
+            # Muestreo: totales estimados con su intervalo de confianza
+            sampling = {method: r['sampling'] for method, r in results.items() if r.get('sampling')}
+            if sampling:
+                first = next(iter(sampling.values()))
+                f.write(f"## Muestreo ({first['method']}, fracción {first['fraction']}, "
+                        f"confianza {first['confidence']:.0%})\n\n")
+                f.write("| Método | Líneas descartadas | Registros estimados | Filtrados estimados |\n")
+                f.write("|--------|--------------------|---------------------|---------------------|\n")
+                for method, sm in sampling.items():
+                    f.write(f"| {method} | {sm['skipped_lines']:,} | "
+                            f"{sm['estimated_total_records']:,} ± {sm['estimated_total_records_ci']:,} | "
+                            f"{sm['estimated_filtered_records']:,} ± {sm['estimated_filtered_records_ci']:,} |\n")
+                f.write("\n")
+            
+            # Deduplicación de request_id reenviados
+            dedup = {method: r['dedup'] for method, r in results.items() if r.get('dedup')}
+            if dedup:
+                f.write("## Deduplicación (filtro de Bloom escalable)\n\n")
+                f.write("| Método | Duplicados descartados | IDs previos | IDs en filtro | Filtros | "
+                        "Memoria (MB) | MB por millón | FP máx. |\n")
+                f.write("|--------|------------------------|-------------|---------------|---------|"
+                        "--------------|---------------|---------|\n")
+                for method, d in dedup.items():
+                    f.write(f"| {method} | {d['duplicates_dropped']:,} | {d['loaded_ids']:,} | "
+                            f"{d['tracked_ids']:,} | {d['filters']} | {d['memory_mb']} | "
+                            f"{d['mb_per_million_ids']} | {d['max_false_positive_rate']} |\n")
+                f.write("\n")
+            
+            # Arranque del pool de procesos (excluido de los tiempos de multiprocessing)
+            if pool_usage:
+                f.write("## Pool de Workers\n\n")
+                f.write(f"- Método de arranque: {pool_usage['start_method']}\n")
+                f.write(f"- Workers: {pool_usage['processes']}\n")
+                f.write(f"- Módulos precargados: {', '.join(pool_usage['preload']) or '-'}\n")
+                f.write(f"- Arranque del pool: {pool_usage['startup_seconds']} s (una sola vez)\n")
+                f.write(f"- Ejecuciones que reutilizaron el pool: {pool_usage['map_calls']} "
+                        f"({pool_usage['tasks_submitted']} tareas)\n\n")
+            
+            # Matriz códec x motor (records/seg)
+            if codec_matrix:
+                engines = list(self._benchmark_engines())
+                f.write("## Matriz Códec x Motor (records/seg)\n\n")
+                f.write("| Códec | Backend | Tamaño (MB) | " + " | ".join(engines) + " |\n")
+                f.write("|-------|---------|-------------|" + "|".join("---" for _ in engines) + "|\n")
+                for codec_name, row in codec_matrix.items():
+                    if row.get('backend') is None:
+                        f.write(f"| {codec_name} | no disponible | - | " + " | ".join("SKIPPED" for _ in engines) + " |\n")
+                        continue
+                    cells = []
+                    for engine in engines:
+                        value = row.get(engine)
+                        cells.append(f"{value:,}" if isinstance(value, int) else str(value).upper())
+                    f.write(f"| {codec_name} | {row['backend']} | {row['file_size_mb']} | " + " | ".join(cells) + " |\n")
+                f.write("\n")
+            
             f.write("## Configuración del Sistema\n\n")
-            f.write(f"- CPU cores: {cpu_count()}\n")
+            cpus = cpu_report()
+            quota = cpus['cgroup_cpu_quota'] if cpus['cgroup_cpu_quota'] is not None else 'sin límite'
+            f.write(f"- CPU cores (host): {cpus['host_cpus']}\n")
+            f.write(f"- CPUs utilizables: {cpus['available_cpus']} "
+                    f"(afinidad: {cpus['affinity_cpus']}, cuota cgroup: {quota})\n")
             f.write(f"- Polars disponible: {HAS_POLARS}\n")
             f.write(f"- Dask disponible: {HAS_DASK}\n")
             f.write(f"- PyArrow disponible: {HAS_PYARROW}\n")
+            f.write(f"- Códecs disponibles: {', '.join(c for c, b in available_codecs().items() if b)}\n")
+            f.write(f"- Transporte de resultados (multiprocessing): {transport_method()}\n")
         
         logger.info(f"Reporte generado: {report_file}")
 
 
-def main():
-    """Función principal"""
+def main(codec_matrix: bool = False, engine: str = None, max_memory: int = None,
+         sample_fraction: float = None, sample_method: str = SAMPLE_HASH,
+         dedup: bool = False, dedup_state: Path = None,
+         dedup_capacity: int = DEFAULT_BLOOM_CAPACITY,
+         dedup_error_rate: float = DEFAULT_BLOOM_ERROR_RATE):
+    """
+    Función principal
+    
+    Args:
+        codec_matrix: Añadir la matriz códec x motor al reporte
+        engine: Ejecutar solo este motor (sin reporte comparativo)
+        max_memory: Presupuesto de memoria en bytes (batch y workers adaptativos)
+        sample_fraction: Procesar solo esta fracción de líneas (conteos reescalados)
+        sample_method: Criterio de muestreo determinista ('hash' o 'stride')
+        dedup: Descartar request_id ya vistos (filtro de Bloom persistente)
+        dedup_state: Archivo del filtro (por defecto, en el directorio de salida)
+        dedup_capacity: Cardinalidad esperada de request_id
+        dedup_error_rate: Tasa de falsos positivos objetivo del filtro
+    """
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -664,9 +1490,16 @@ def main():
             stats = generate_logs(5000000, input_file)  # 5M registros
             print(f"✅ Archivo generado: {stats}")
         
-        # Ejecutar benchmarks
-        processor = StreamingLogProcessor(input_file)
-        results = processor.run_all_benchmarks()
+        # Ejecutar benchmarks (el pool de procesos se cierra al salir)
+        with StreamingLogProcessor(input_file, max_memory=max_memory,
+                                   sample_fraction=sample_fraction,
+                                   sample_method=sample_method, dedup=dedup,
+                                   dedup_state=dedup_state, dedup_capacity=dedup_capacity,
+                                   dedup_error_rate=dedup_error_rate) as processor:
+            if engine:
+                results = {engine: processor.run_engine(engine)}
+            else:
+                results = processor.run_all_benchmarks(codec_matrix=codec_matrix)
         
         print("\n" + "=" * 60)
         print("RESUMEN DE BENCHMARKS")
@@ -686,7 +1519,8 @@ def main():
         
         print("=" * 60)
         print("✅ Benchmarking completado exitosamente")
-        print("📊 Revisa data/processed/benchmark_report.md para análisis detallado")
+        if not engine:
+            print("📊 Revisa data/processed/benchmark_report.md para análisis detallado")
         
         return True
         
@@ -697,5 +1531,65 @@ def main():
 
 
 if __name__ == "__main__":
-    success = main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Benchmarks de ETL streaming de logs")
+    parser.add_argument(
+        '--codec-matrix',
+        action='store_true',
+        help='Evaluar cada motor con la entrada recomprimida en gzip/zstd/lz4/plano'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=engine_names(),
+        default=None,
+        help='Ejecutar un único motor (solo importa sus dependencias)'
+    )
+    parser.add_argument(
+        '--max-memory',
+        type=parse_memory_size,
+        default=None,
+        help='Presupuesto de memoria (ej. 512M, 2G); sin él se usa el límite del cgroup si existe'
+    )
+    parser.add_argument(
+        '--sample',
+        type=float,
+        default=None,
+        help='Fracción de líneas a procesar (ej. 0.1); los conteos se reescalan con intervalos de confianza'
+    )
+    parser.add_argument(
+        '--sample-method',
+        choices=SAMPLE_METHODS,
+        default=SAMPLE_HASH,
+        help='Muestreo por hash de request_id (estable entre particiones) o por número de línea'
+    )
+    parser.add_argument(
+        '--dedup',
+        action='store_true',
+        help='Descartar líneas con request_id ya visto (filtro de Bloom persistido entre ejecuciones)'
+    )
+    parser.add_argument(
+        '--dedup-state',
+        type=Path,
+        default=None,
+        help=f'Archivo del filtro de deduplicación (por defecto data/processed/{DEDUP_STATE_NAME})'
+    )
+    parser.add_argument(
+        '--dedup-capacity',
+        type=int,
+        default=DEFAULT_BLOOM_CAPACITY,
+        help='Cardinalidad esperada de request_id para dimensionar el filtro'
+    )
+    parser.add_argument(
+        '--dedup-error-rate',
+        type=float,
+        default=DEFAULT_BLOOM_ERROR_RATE,
+        help='Tasa de falsos positivos objetivo del filtro'
+    )
+    args = parser.parse_args()
+    
+    success = main(codec_matrix=args.codec_matrix, engine=args.engine, max_memory=args.max_memory,
+                   sample_fraction=args.sample, sample_method=args.sample_method,
+                   dedup=args.dedup, dedup_state=args.dedup_state,
+                   dedup_capacity=args.dedup_capacity, dedup_error_rate=args.dedup_error_rate)
     sys.exit(0 if success else 1)
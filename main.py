@@ -14,22 +14,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def run_etl():
-    """Ejecutar proceso ETL"""
+def run_etl(incremental: bool = False, input_dir: str = None, pattern: str = '*',
+            workers: int = None, force: bool = False, engine: str = 'pandas'):
+    """Ejecutar proceso ETL (un archivo, o todo un directorio en paralelo)"""
     logger.info("Iniciando proceso ETL")
     try:
         from etl.processor import ETLProcessor
+        from etl.result_cache import ResultCache
         processor = ETLProcessor()
+        processor.incremental = incremental
+        processor.engine = engine
+        
+        if input_dir:
+            # Procesar todos los archivos del directorio con un pool de workers
+            result = processor.process_directory(Path(input_dir), pattern, workers)
+            logger.info(f"ETL completado: {result}")
+            return result['status'] == 'success'
         
         # Buscar archivo de entrada
         input_file = Path("data/raw/sample_transactions.csv")
         if not input_file.exists():
             logger.warning(f"Archivo no encontrado: {input_file}")
             return False
+        
+        # Reutilizar las salidas si la entrada no cambió (--force recalcula)
+        processor.cache = ResultCache(force=force)
             
         # Procesar archivo
         result = processor.process_file(input_file)
         logger.info(f"ETL completado: {result}")
+        logger.info(f"Caché: {processor.cache.report()}")
         
         logger.info("Proceso ETL completado exitosamente")
         return result['status'] == 'success'
@@ -37,26 +51,41 @@ def run_etl():
         logger.error(f"Error en proceso ETL: {e}")
         return False
 
-def run_warehouse():
+def run_warehouse(force: bool = False):
     """Ejecutar proceso de data warehouse"""
     logger.info("Iniciando proceso de data warehouse")
     try:
-        from modeling.warehouse import DataWarehouse
+        from modeling.warehouse import WAREHOUSE_VERSION, DataWarehouse
+        from etl.result_cache import ResultCache
         import pandas as pd
         
-        # Inicializar warehouse
         warehouse = DataWarehouse()
-        init_result = warehouse.initialize_schema()
-        logger.info(f"Inicialización: {init_result}")
-        
-        # Cargar datos si existe archivo procesado
         processed_file = Path("data/processed/cleaned_transactions.csv")
+        
+        # Mismo archivo procesado que en una carga anterior: se restaura la base
+        cache = ResultCache(force=force)
+        cache_key = None
+        cached = None
         if processed_file.exists():
-            df = pd.read_csv(processed_file)
-            load_result = warehouse.load_transactions(df)
-            logger.info(f"Carga completada: {load_result}")
+            cache_key = cache.key('warehouse', [processed_file], {'warehouse_version': WAREHOUSE_VERSION})
+            cached = cache.restore(cache_key, {'warehouse': warehouse.db_path})
+        
+        if cached is not None:
+            logger.info(f"Carga del warehouse omitida, base restaurada de la caché: {cached}")
         else:
-            logger.warning(f"Archivo procesado no encontrado: {processed_file}")
+            # Inicializar warehouse
+            init_result = warehouse.initialize_schema()
+            logger.info(f"Inicialización: {init_result}")
+            
+            # Cargar datos si existe archivo procesado
+            if processed_file.exists():
+                df = pd.read_csv(processed_file)
+                load_result = warehouse.load_transactions(df)
+                logger.info(f"Carga completada: {load_result}")
+                if load_result['status'] == 'success':
+                    cache.store(cache_key, {'warehouse': warehouse.db_path}, load_result)
+            else:
+                logger.warning(f"Archivo procesado no encontrado: {processed_file}")
         
         # Obtener estadísticas
         stats = warehouse.get_summary_stats()
@@ -80,12 +109,13 @@ def run_sql_analysis():
         logger.error(f"Error en análisis SQL: {e}")
         return False
 
-def run_streaming_benchmark():
+def run_streaming_benchmark(max_memory: str = None):
     """Ejecutar benchmark de streaming - Ejercicio 3"""
     logger.info("Iniciando benchmark de streaming - Ejercicio 3")
     try:
+        from etl.resources import parse_memory_size
         from etl.streaming_processor import main as run_streaming
-        result = run_streaming()
+        result = run_streaming(max_memory=parse_memory_size(max_memory) if max_memory else None)
         logger.info("Benchmark de streaming completado exitosamente")
         return result
     except Exception as e:
@@ -126,17 +156,17 @@ def run_all_exercises():
     
     return successful == total
 
-def run_full_pipeline():
+def run_full_pipeline(incremental: bool = False, force: bool = False, engine: str = 'pandas'):
     """Ejecutar pipeline completo"""
     logger.info("Iniciando pipeline completo")
     success = True
     
     # Ejecutar ETL
-    if not run_etl():
+    if not run_etl(incremental, force=force, engine=engine):
         success = False
     
     # Ejecutar warehouse
-    if not run_warehouse():
+    if not run_warehouse(force):
         success = False
     
     if success:
@@ -154,10 +184,15 @@ def main():
         epilog="""
 Ejemplos:
   %(prog)s etl                 # Ejecutar solo ETL (Ejercicio 1)
+  %(prog)s etl --incremental   # ETL con carga incremental (solo filas nuevas)
+  %(prog)s etl --input-dir data/raw --workers 4
+                              # ETL de todos los archivos del directorio en paralelo
+  %(prog)s etl --engine polars # ETL de transacciones con polars (lazy + sink)
   %(prog)s warehouse           # Ejecutar solo data warehouse (Ejercicio 4)
   %(prog)s sql                 # Ejecutar análisis SQL (Ejercicio 2)
   %(prog)s streaming           # Ejecutar benchmark streaming (Ejercicio 3)
   %(prog)s pipeline            # Ejecutar pipeline básico (ETL + Warehouse)
+  %(prog)s pipeline --force    # Recalcular aunque las entradas no hayan cambiado
   %(prog)s all                 # Ejecutar TODOS los ejercicios
   %(prog)s --help              # Mostrar esta ayuda
         """
@@ -169,6 +204,50 @@ Ejemplos:
         help='Comando a ejecutar'
     )
     
+    parser.add_argument(
+        '--max-memory',
+        default=None,
+        help='Presupuesto de memoria para streaming (ej. 512M, 2G)'
+    )
+    
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Carga incremental en SQLite (upsert por order_id con marca de agua)'
+    )
+    
+    parser.add_argument(
+        '--input-dir',
+        default=None,
+        help='Procesar todos los archivos CSV/log de este directorio en paralelo'
+    )
+    
+    parser.add_argument(
+        '--pattern',
+        default='*',
+        help='Patrón glob de los archivos de --input-dir (por defecto: *)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Procesos para --input-dir (por defecto: CPUs disponibles)'
+    )
+    
+    parser.add_argument(
+        '--engine',
+        choices=['pandas', 'polars'],
+        default='pandas',
+        help='Motor del ETL de transacciones (por defecto: pandas)'
+    )
+    
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Ignorar la caché de resultados y recalcular ETL y warehouse'
+    )
+    
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -184,15 +263,16 @@ Ejemplos:
     # Ejecutar comando
     success = False
     if args.command == 'etl':
-        success = run_etl()
+        success = run_etl(args.incremental, args.input_dir, args.pattern, args.workers, args.force,
+                          args.engine)
     elif args.command == 'warehouse':
-        success = run_warehouse()
+        success = run_warehouse(args.force)
     elif args.command == 'pipeline':
-        success = run_full_pipeline()
+        success = run_full_pipeline(args.incremental, args.force, args.engine)
     elif args.command == 'sql':
         success = run_sql_analysis()
     elif args.command == 'streaming':
-        success = run_streaming_benchmark()
+        success = run_streaming_benchmark(args.max_memory)
     elif args.command == 'all':
         success = run_all_exercises()
     
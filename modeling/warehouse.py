@@ -10,6 +10,9 @@ import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# Versión del esquema y de la carga: cambiarla invalida los resultados en caché
+WAREHOUSE_VERSION = 1
+
 
 class DataWarehouse:
     """Gestor del Data Warehouse dimensional"""
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los motores del ETL de transacciones (pandas vs polars)
+
+Genera los CSV con scripts/generate_transactions.py (se reutilizan si ya
+existen) y ejecuta ETLProcessor.process_file con cada motor en un proceso
+aparte, para que la memoria pico de uno no contamine la medida del otro.
+El resultado se imprime y se guarda como tabla markdown.
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Permitir ejecución directa (python scripts/benchmark_transaction_engines.py)
+if __package__ in (None, ''):
+    sys.path.insert(0, str(BASE_DIR))
+
+DEFAULT_SIZES = [1_000_000, 10_000_000, 50_000_000]
+DEFAULT_ENGINES = ['pandas', 'polars']
+DEFAULT_DATA_DIR = BASE_DIR / "data" / "benchmark"
+DEFAULT_REPORT = BASE_DIR / "data" / "processed" / "transaction_engines_benchmark.md"
+
+
+def peak_memory_mb() -> float:
+    """Memoria residente pico del proceso actual"""
+    try:
+        import resource
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta KB; macOS, bytes
+        return round(peak_kb / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
+    except ImportError:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / 1024 ** 2, 1)
+
+
+def run_one(engine: str, input_file: Path, work_dir: Path) -> Dict:
+    """Ejecuta un ETL completo con un motor (en el proceso actual)"""
+    from etl.processor import ETLProcessor
+
+    processor = ETLProcessor(work_dir)
+    processor.engine = engine
+    start = time.perf_counter()
+    metrics = processor.process_file(input_file)
+    elapsed = time.perf_counter() - start
+    if metrics['status'] != 'success':
+        raise RuntimeError(f"ETL con {engine} falló: {metrics.get('error')}")
+    return {
+        'engine': processor.last_run['engine'],
+        'records_input': metrics['records_input'],
+        'records_output': metrics['records_output'],
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(metrics['records_input'] / elapsed) if elapsed > 0 else 0,
+        'peak_memory_mb': peak_memory_mb()
+    }
+
+
+def ensure_dataset(records: int, data_dir: Path) -> Path:
+    """CSV de records transacciones, generado solo si no existe"""
+    from scripts.generate_transactions import generate_transactions
+
+    path = data_dir / f"transactions_{records}.csv"
+    if not path.exists():
+        print(f"Generando {records:,} transacciones en {path}...")
+        generate_transactions(records, path)
+    return path
+
+
+def measure(engine: str, input_file: Path, work_dir: Path) -> Dict:
+    """Ejecuta run_one en un proceso nuevo y devuelve sus métricas"""
+    shutil.rmtree(work_dir, ignore_errors=True)
+    result = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), '--run-one', engine,
+         '--input', str(input_file), '--work-dir', str(work_dir)],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    shutil.rmtree(work_dir, ignore_errors=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Benchmark {engine} falló: {result.stderr[-500:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def write_report(results: List[Dict], report_path: Path):
+    """Tabla markdown con una fila por tamaño y motor"""
+    lines = [
+        "# Benchmark de motores del ETL de transacciones",
+        "",
+        "| Filas | Motor | Tiempo (s) | Filas/s | Memoria pico (MB) | Filas válidas |",
+        "|------:|-------|-----------:|--------:|------------------:|--------------:|",
+    ]
+    for r in results:
+        lines.append(f"| {r['records_input']:,} | {r['engine']} | {r['seconds']} | "
+                     f"{r['rows_per_second']:,} | {r['peak_memory_mb']} | {r['records_output']:,} |")
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Benchmark de los motores del ETL de transacciones")
+    parser.add_argument('--records', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Tamaños a medir (default: 1M 10M 50M)')
+    parser.add_argument('--engines', nargs='+', default=DEFAULT_ENGINES, choices=DEFAULT_ENGINES,
+                        help='Motores a comparar')
+    parser.add_argument('--data-dir', type=Path, default=DEFAULT_DATA_DIR,
+                        help='Directorio de los CSV generados')
+    parser.add_argument('--report', type=Path, default=DEFAULT_REPORT, help='Reporte markdown')
+    parser.add_argument('--run-one', choices=DEFAULT_ENGINES, help=argparse.SUPPRESS)
+    parser.add_argument('--input', type=Path, help=argparse.SUPPRESS)
+    parser.add_argument('--work-dir', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        # Proceso hijo: una medida, resultado en JSON por stdout
+        print(json.dumps(run_one(args.run_one, args.input, args.work_dir)))
+        return True
+
+    results = []
+    for records in args.records:
+        input_file = ensure_dataset(records, args.data_dir)
+        for engine in args.engines:
+            result = measure(engine, input_file, args.data_dir / f"work_{engine}")
+            results.append(result)
+            print(f"{records:>12,} filas | {engine:<6} | {result['seconds']:>8} s | "
+                  f"{result['rows_per_second']:>10,} filas/s | {result['peak_memory_mb']:>8} MB")
+
+    write_report(results, args.report)
+    print(f"\nReporte guardado en {args.report}")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
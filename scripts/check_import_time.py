@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Verificación del presupuesto de tiempo de importación del CLI
+
+Ejecuta cada comando con ``python -X importtime`` y suma el tiempo acumulado de
+los imports de primer nivel. Falla (exit 1) si algún comando supera su
+presupuesto configurado en config/settings.py.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Permitir ejecución directa (python scripts/check_import_time.py)
+if __package__ in (None, ''):
+    sys.path.insert(0, str(BASE_DIR))
+
+from config.settings import IMPORT_TIME_BUDGET_MS
+
+# Comandos medidos: arranque del CLI y una ejecución de un solo motor (hasta argparse)
+STARTUP_COMMANDS = {
+    'main_help': ['main.py', '--help'],
+    'streaming_single_engine': ['etl/streaming_processor.py', '--engine', 'pandas_streaming', '--help'],
+}
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """
+    Tiempo acumulado (us) de cada import de primer nivel
+
+    Las líneas tienen el formato ``import time: self | cumulative | nombre``;
+    los imports anidados llevan el nombre indentado y ya están incluidos en
+    el acumulado de su padre.
+    """
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # Cabecera
+        name = fields[2]
+        if name.startswith('  '):
+            continue
+        imports[name.strip()] = int(fields[1])
+    return imports
+
+
+def measure_import_time(args: List[str], repeat: int = 3) -> Dict:
+    """
+    Mide el tiempo de importación de un comando (mejor de N ejecuciones)
+
+    Returns:
+        Dict con total en ms y los imports de primer nivel más costosos
+    """
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime'] + args,
+            cwd=BASE_DIR, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Comando falló ({' '.join(args)}): {result.stderr[-500:]}")
+        imports = parse_importtime(result.stderr)
+        total = sum(imports.values())
+        if best is None or total < best[0]:
+            best = (total, imports)
+
+    total, imports = best
+    top = sorted(imports.items(), key=lambda item: item[1], reverse=True)[:5]
+    return {
+        'total_ms': round(total / 1000, 1),
+        'top_imports_ms': {name: round(us / 1000, 1) for name, us in top}
+    }
+
+
+def check_budgets(budgets: Dict[str, float] = None, repeat: int = 3) -> Dict[str, Dict]:
+    """Mide cada comando y lo compara con su presupuesto"""
+    budgets = budgets or IMPORT_TIME_BUDGET_MS
+    results = {}
+    for name, args in STARTUP_COMMANDS.items():
+        measurement = measure_import_time(args, repeat)
+        measurement['budget_ms'] = budgets[name]
+        measurement['within_budget'] = measurement['total_ms'] <= budgets[name]
+        results[name] = measurement
+    return results
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Presupuesto de tiempo de importación del CLI")
+    parser.add_argument('--repeat', type=int, default=3, help='Ejecuciones por comando (se toma la mejor)')
+    parser.add_argument('--json', action='store_true', help='Imprimir resultados en JSON')
+    args = parser.parse_args()
+
+    results = check_budgets(repeat=args.repeat)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            status = "OK" if result['within_budget'] else "EXCEDIDO"
+            print(f"{name}: {result['total_ms']} ms (presupuesto {result['budget_ms']} ms) - {status}")
+            for module, ms in result['top_imports_ms'].items():
+                print(f"    {module}: {ms} ms")
+
+    return all(result['within_budget'] for result in results.values())
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -8,18 +8,27 @@ import json
 import gzip
 import random
 import logging
+import sys
 from pathlib import Path
 from datetime import datetime, timedelta
 
+# Permitir ejecución directa (python scripts/generate_logs.py)
+if __package__ in (None, ''):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from etl.block_gzip import BlockGzipWriter
+
 logger = logging.getLogger(__name__)
 
-def generate_logs(num_records: int, output_path: Path) -> dict:
+def generate_logs(num_records: int, output_path: Path, block_size: int = None) -> dict:
     """
     Genera archivo de logs simulados en formato JSONL comprimido
     
     Args:
         num_records: Número de registros de log a generar
         output_path: Ruta del archivo de salida (.gz)
+        block_size: Si se indica, escribe gzip por bloques (miembros independientes
+            de block_size bytes sin comprimir) descomprimible en paralelo
     
     Returns:
         Dict con estadísticas de generación
@@ -51,7 +60,12 @@ def generate_logs(num_records: int, output_path: Path) -> dict:
     batch_size = 10000
     total_written = 0
     
-    with gzip.open(output_path, 'wt', encoding='utf-8') as f:
+    if block_size:
+        writer = BlockGzipWriter(output_path, block_size)
+    else:
+        writer = gzip.open(output_path, 'wt', encoding='utf-8')
+    
+    with writer as f:
         for batch_start in range(0, num_records, batch_size):
             batch_end = min(batch_start + batch_size, num_records)
             
@@ -137,6 +151,7 @@ def generate_logs(num_records: int, output_path: Path) -> dict:
         'generation_time_seconds': generation_time,
         'records_per_second': total_written / generation_time if generation_time > 0 else 0,
         'compression_ratio': 'N/A',  # Sería calculable comparando con versión sin comprimir
+        'gzip_members': len(writer.member_offsets) if block_size else 1,
         'status_code_distribution': {
             '2xx': int(total_written * 0.8),
             '4xx': int(total_written * 0.15),
@@ -173,6 +188,13 @@ def main():
         help='Archivo de salida comprimido'
     )
     
+    parser.add_argument(
+        '--block-size-kb',
+        type=int,
+        default=None,
+        help='Escribir gzip por bloques de N KB sin comprimir (descompresión paralela)'
+    )
+    
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -189,7 +211,8 @@ def main():
     )
     
     try:
-        stats = generate_logs(args.records, args.output)
+        block_size = args.block_size_kb * 1024 if args.block_size_kb else None
+        stats = generate_logs(args.records, args.output, block_size)
         
         print("\nEstadísticas de generación de logs:")
         print(f"Registros: {stats['records_generated']:,}")
@@ -198,6 +221,7 @@ def main():
         print(f"Rendimiento: {stats['records_per_second']:,.0f} registros/segundo")
         print(f"Distribución status codes: {stats['status_code_distribution']}")
         print(f"Endpoints únicos: {stats['endpoints_count']}")
+        print(f"Miembros gzip: {stats['gzip_members']}")
         
         print(f"\nArchivo de logs generado exitosamente: {args.output}")
         
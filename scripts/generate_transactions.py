@@ -4,14 +4,33 @@ Genera datasets de prueba para los ejercicios de ETL y análisis
 """
 
 import argparse
+import numpy as np
 import pandas as pd
-import random
 import logging
+from collections import Counter
 from pathlib import Path
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Límites de los montos generados
+AMOUNT_MIN = 1.0
+AMOUNT_MAX = 50000.0
+
+# Histograma logarítmico de montos para la mediana aproximada sin guardar los
+# montos (cada intervalo mide ~0.26% de su valor)
+AMOUNT_HISTOGRAM_BINS = 4096
+
+COLUMNS = ['order_id', 'user_id', 'amount', 'status', 'timestamp']
+
+def _histogram_median(counts: np.ndarray, edges: np.ndarray) -> float:
+    """Mediana aproximada de un histograma (interpolación dentro del intervalo)"""
+    cumulative = np.cumsum(counts)
+    half = cumulative[-1] / 2
+    i = int(np.searchsorted(cumulative, half))
+    fraction = (half - (cumulative[i] - counts[i])) / counts[i]
+    return float(edges[i] + fraction * (edges[i + 1] - edges[i]))
+
 def generate_transactions(num_records: int, output_path: Path) -> dict:
     """
     Genera dataset de transacciones sintéticas
@@ -28,91 +47,102 @@ def generate_transactions(num_records: int, output_path: Path) -> dict:
     start_time = datetime.now()
     
     # Configurar parámetros de generación
-    user_ids = list(range(1, min(10000, num_records // 10) + 1))
+    num_users = max(1, min(10000, num_records // 10))
     statuses = ['completed', 'failed', 'pending']
     status_weights = [0.7, 0.2, 0.1]  # Distribución realista
     
-    # Generar datos en lotes para eficiencia
+    # Generar datos en lotes que se escriben al archivo según se generan
+    # (la memoria no depende de num_records: 50M filas no caben como dicts)
     batch_size = 50000
-    all_data = []
+    rng = np.random.default_rng()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    records = 0
+    unique_users = set()
+    status_counts = Counter()
+    amount_edges = np.geomspace(AMOUNT_MIN, AMOUNT_MAX, AMOUNT_HISTOGRAM_BINS + 1)
+    amount_counts = np.zeros(AMOUNT_HISTOGRAM_BINS, dtype=np.int64)
+    amount_sum = 0.0
+    amount_min = amount_max = None
+    date_min = date_max = None
+    
+    # Sin registros el archivo queda solo con la cabecera
+    if num_records <= 0:
+        pd.DataFrame(columns=COLUMNS).to_csv(output_path, index=False)
     
     for batch_start in range(0, num_records, batch_size):
         batch_end = min(batch_start + batch_size, num_records)
         batch_size_actual = batch_end - batch_start
         
-        # Generar lote de datos
-        batch_data = []
-        for i in range(batch_size_actual):
-            record_id = batch_start + i + 1
-            
-            # Timestamp con distribución temporal realista
-            days_back = random.randint(0, 30)
-            hours = random.randint(0, 23)
-            minutes = random.randint(0, 59)
-            seconds = random.randint(0, 59)
-            
-            timestamp = datetime.now() - timedelta(
-                days=days_back, 
-                hours=hours, 
-                minutes=minutes, 
-                seconds=seconds
-            )
-            
-            # Monto con distribución log-normal más realista
-            amount = round(random.lognormvariate(mu=5.5, sigma=1.2), 2)
-            amount = max(1.0, min(amount, 50000.0))  # Límites realistas
-            
-            # Status con distribución ponderada
-            status = random.choices(statuses, weights=status_weights)[0]
-            
-            # User ID con algunos usuarios más activos
-            if random.random() < 0.1:  # 10% usuarios muy activos
-                user_id = random.choice(user_ids[:100])
-            else:
-                user_id = random.choice(user_ids)
-            
-            batch_data.append({
-                'order_id': record_id,
-                'user_id': user_id,
-                'amount': amount,
-                'status': status,
-                'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S')
-            })
+        # Generar lote de datos (vectorizado, mismas distribuciones)
+        record_ids = np.arange(batch_start + 1, batch_end + 1)
+        
+        # Timestamp con distribución temporal realista: hasta 30 días atrás
+        offsets = (rng.integers(0, 31, batch_size_actual) * 86400 +
+                   rng.integers(0, 24, batch_size_actual) * 3600 +
+                   rng.integers(0, 60, batch_size_actual) * 60 +
+                   rng.integers(0, 60, batch_size_actual))
+        timestamps = pd.Timestamp(datetime.now()) - pd.to_timedelta(offsets, unit='s')
+        
+        # Monto con distribución log-normal más realista
+        amounts_batch = np.round(rng.lognormal(mean=5.5, sigma=1.2, size=batch_size_actual), 2)
+        amounts_batch = np.clip(amounts_batch, AMOUNT_MIN, AMOUNT_MAX)  # Límites realistas
         
-        all_data.extend(batch_data)
+        # Status con distribución ponderada
+        status_values = rng.choice(statuses, size=batch_size_actual, p=status_weights)
+        
+        # User ID con algunos usuarios más activos (10% entre los 100 primeros)
+        active = rng.random(batch_size_actual) < 0.1
+        user_values = np.where(active,
+                               rng.integers(1, min(100, num_users) + 1, batch_size_actual),
+                               rng.integers(1, num_users + 1, batch_size_actual))
+        
+        df = pd.DataFrame({
+            'order_id': record_ids,
+            'user_id': user_values,
+            'amount': amounts_batch,
+            'status': status_values,
+            'timestamp': timestamps.strftime('%Y-%m-%d %H:%M:%S')
+        })
+        
+        # Añadir el lote al CSV
+        df.to_csv(output_path, mode='w' if batch_start == 0 else 'a',
+                  header=batch_start == 0, index=False)
+        
+        # Estadísticas acumuladas
+        records += len(df)
+        unique_users.update(df['user_id'].unique().tolist())
+        status_counts.update(df['status'].value_counts().to_dict())
+        amount_counts += np.histogram(amounts_batch, bins=amount_edges)[0]
+        amount_sum += float(amounts_batch.sum())
+        amount_min = min(amount_min or AMOUNT_MAX, float(amounts_batch.min()))
+        amount_max = max(amount_max or AMOUNT_MIN, float(amounts_batch.max()))
+        batch_min, batch_max = df['timestamp'].min(), df['timestamp'].max()
+        date_min = batch_min if date_min is None else min(date_min, batch_min)
+        date_max = batch_max if date_max is None else max(date_max, batch_max)
         
         if batch_end % 100000 == 0:
             logger.info(f"Generados {batch_end:,} registros...")
     
-    # Crear DataFrame y guardar
-    df = pd.DataFrame(all_data)
-    
-    # Crear directorio si no existe
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Guardar CSV
-    df.to_csv(output_path, index=False)
-    
     end_time = datetime.now()
     generation_time = (end_time - start_time).total_seconds()
-    
     # Estadísticas de generación
     stats = {
-        'records_generated': len(df),
+        'records_generated': records,
         'file_size_mb': output_path.stat().st_size / (1024 * 1024),
         'generation_time_seconds': generation_time,
-        'records_per_second': len(df) / generation_time if generation_time > 0 else 0,
-        'unique_users': df['user_id'].nunique(),
-        'status_distribution': df['status'].value_counts().to_dict(),
+        'records_per_second': records / generation_time if generation_time > 0 else 0,
+        'unique_users': len(unique_users),
+        'status_distribution': dict(status_counts),
         'amount_stats': {
-            'min': df['amount'].min(),
-            'max': df['amount'].max(),
-            'mean': df['amount'].mean(),
-            'median': df['amount'].median()
+            'min': amount_min,
+            'max': amount_max,
+            'mean': amount_sum / records if records else None,
+            'median': _histogram_median(amount_counts, amount_edges) if records else None
         },
         'date_range': {
-            'start': df['timestamp'].min(),
-            'end': df['timestamp'].max()
+            'start': date_min,
+            'end': date_max
         }
     }
     
@@ -165,7 +195,8 @@ def main():
         print(f"Rendimiento: {stats['records_per_second']:,.0f} registros/segundo")
         print(f"Usuarios únicos: {stats['unique_users']:,}")
         print(f"Distribución status: {stats['status_distribution']}")
-        print(f"Monto promedio: ${stats['amount_stats']['mean']:.2f}")
+        if stats['records_generated']:
+            print(f"Monto promedio: ${stats['amount_stats']['mean']:.2f}")
         print(f"Rango temporal: {stats['date_range']['start']} - {stats['date_range']['end']}")
         
         print(f"\nArchivo generado exitosamente: {args.output}")
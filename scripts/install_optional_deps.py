@@ -16,7 +16,11 @@ def install_optional_dependencies():
         'dask[dataframe]>=2024.1.0', 
         'pyarrow>=14.0.0',
         'psutil>=5.9.0',
-        'memory-profiler>=0.61.0'
+        'memory-profiler>=0.61.0',
+        'isal>=1.5.0',
+        'zstandard>=0.22.0',
+        'lz4>=4.3.0',
+        'indexed_gzip>=1.8.0'
     ]
     
     print("=== INSTALANDO DEPENDENCIAS OPCIONALES PARA EJERCICIO 3 ===")
@@ -65,6 +69,30 @@ def install_optional_dependencies():
     except ImportError:
         verification_results['psutil'] = "❌ PSUtil no disponible"
     
+    try:
+        import isal
+        verification_results['isal'] = f"✅ python-isal {isal.__version__}"
+    except ImportError:
+        verification_results['isal'] = "❌ python-isal no disponible (gzip usará zlib)"
+    
+    try:
+        import zstandard
+        verification_results['zstandard'] = f"✅ zstandard {zstandard.__version__}"
+    except ImportError:
+        verification_results['zstandard'] = "❌ zstandard no disponible"
+    
+    try:
+        import lz4
+        verification_results['lz4'] = f"✅ lz4 {lz4.__version__}"
+    except ImportError:
+        verification_results['lz4'] = "❌ lz4 no disponible"
+    
+    try:
+        import indexed_gzip
+        verification_results['indexed_gzip'] = f"✅ indexed_gzip {indexed_gzip.__version__}"
+    except ImportError:
+        verification_results['indexed_gzip'] = "❌ indexed_gzip no disponible (sin índices .gzidx)"
+    
     for package, status in verification_results.items():
         print(status)
     
@@ -34,6 +34,17 @@ def test_transaction_generator():
         assert df['amount'].min() > 0
         assert df['status'].isin(['completed', 'failed', 'pending']).all()
         
+        # Estadísticas de montos sin guardar los montos (mediana aproximada)
+        amount_stats = stats['amount_stats']
+        assert amount_stats['min'] == df['amount'].min() and amount_stats['max'] == df['amount'].max()
+        assert abs(amount_stats['mean'] - df['amount'].mean()) < 1e-6
+        assert abs(amount_stats['median'] / df['amount'].median() - 1) < 0.005
+        
+        # Sin registros: solo la cabecera y estadísticas vacías
+        empty = generate_transactions(0, tmp_path)
+        assert empty['records_generated'] == 0 and empty['amount_stats']['median'] is None
+        assert list(pd.read_csv(tmp_path).columns) == ['order_id', 'user_id', 'amount', 'status', 'timestamp']
+        
         print("Test generador de transacciones: PASSED")
         
     finally:
@@ -314,6 +325,1161 @@ def test_error_handling():
     
     print("Test error handling: PASSED")
 
+def test_hyperloglog_distinct_counts():
+    """Test de contadores HyperLogLog combinables"""
+    from etl.sketches import HyperLogLog
+    
+    left = HyperLogLog(12)
+    right = HyperLogLog(12)
+    left.update(range(0, 30000))
+    right.update(range(20000, 50000))
+    
+    # Error dentro de 3 desviaciones estándar
+    merged = HyperLogLog(12).merge(left).merge(right)
+    assert abs(merged.count() - 50000) <= 50000 * merged.relative_error * 3
+    
+    # Rango pequeño exacto vía linear counting
+    small = HyperLogLog(12)
+    small.update(['a', 'b', 'c', None, 'a'])
+    assert small.count() == 3
+    
+    with pytest.raises(ValueError):
+        HyperLogLog(3)
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(10))
+    
+    print("Test HyperLogLog: PASSED")
+
+def test_columnar_log_batch():
+    """Test del batch columnar de registros de log"""
+    from etl.columnar import LogRecordBatch
+    
+    batch = LogRecordBatch(3)
+    batch.append('2025-01-01 10:00:00', '/api/users', 500, 1200.5, 'GET', 'ERROR', 7, '10.0.0.1')
+    batch.append('2025-01-01 10:00:00', '/api/auth', 503, 800.0, 'POST', 'ERROR', None, '10.0.0.2')
+    
+    # Un registro con tipos inválidos no debe ocupar fila
+    with pytest.raises(ValueError):
+        batch.append('2025-01-01 11:00:00', '/api/auth', 'no-num', 1.0, 'GET', 'INFO')
+    assert len(batch) == 2
+    
+    df = batch.to_pandas()
+    assert list(df['endpoint']) == ['/api/users', '/api/auth']
+    assert str(df['hour'].dtype) == 'category'
+    assert df['error_rate'].tolist() == [1.0, 1.0]
+    assert batch.user_hash[1] == 0
+    
+    batch.append('2025-01-01 12:00:00', '/api/users', 502, 10.0, 'GET', 'WARN')
+    assert batch.is_full
+    batch.reset()
+    assert len(batch) == 0
+    # Los diccionarios se conservan entre batches
+    assert batch.categories('endpoint') == ['/api/users', '/api/auth']
+    
+    print("Test batch columnar: PASSED")
+
+def test_field_dictionary_merge():
+    """Test de combinación de diccionarios entre workers"""
+    from etl.columnar import FieldDictionary
+    
+    parent = FieldDictionary(['/api/users', '/api/auth'])
+    worker = FieldDictionary(['/api/auth', '/api/admin'])
+    
+    remap = parent.merge(worker)
+    assert remap.tolist() == [1, 2]
+    assert parent.values == ['/api/users', '/api/auth', '/api/admin']
+    assert list(parent.decode(remap)) == ['/api/auth', '/api/admin']
+    
+    print("Test diccionarios combinables: PASSED")
+
+def test_streaming_pipeline_pandas():
+    """Test del pipeline en hilos de pandas streaming"""
+    from scripts.generate_logs import generate_logs
+    from etl.memory_budget import current_rss
+    from etl.streaming_processor import StreamingLogProcessor
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        input_file = tmp_path / "sample.log.gz"
+        generate_logs(2000, input_file)
+        
+        processor = StreamingLogProcessor(input_file, tmp_path / "out")
+        processor.parse_workers = 2
+        processor.read_block_size = 4096
+        processor.queue_size = 2
+        processor.chunk_size = 50
+        stats = processor.process_with_pandas_streaming()
+        
+        assert stats['total_records'] == 2000
+        assert stats['error_records'] == 0
+        assert stats['filtered_records'] > 0
+        assert stats['processed_records'] > 0
+        
+        queues = {q['queue']: q for q in stats['queue_occupancy']}
+        assert queues['raw_blocks']['max_occupancy'] <= 2
+        assert queues['raw_blocks']['items'] > 1
+        
+        result = pd.read_parquet(stats['output_file'])
+        assert result['count'].sum() == stats['filtered_records']
+        
+        # Varios hilos de parseo comparten deduplicador y ajustador de batch:
+        # mismos duplicados descartados que con un solo hilo
+        with gzip.open(input_file, 'rb') as f:
+            lines = f.readlines()
+        replayed = tmp_path / "replayed.log"
+        replayed.write_bytes(b''.join(lines + lines[:500]))
+        runs = {}
+        for workers in (1, 3):
+            shared = StreamingLogProcessor(replayed, tmp_path / f"dedup_{workers}", dedup=True,
+                                           max_memory=current_rss() + 512 * 1024 ** 2)
+            shared.parse_workers = workers
+            shared.read_block_size = 2048
+            runs[workers] = shared.process_with_pandas_streaming()
+        assert runs[3]['dedup']['duplicates_dropped'] == runs[1]['dedup']['duplicates_dropped'] >= 500
+        assert runs[3]['total_records'] == runs[1]['total_records'] == 2000
+        assert runs[3]['batching'] is not None
+    
+    print("Test pipeline streaming: PASSED")
+
+def test_null_categorical_log_fields():
+    """Test de registros de log con endpoint, method o level a null"""
+    from etl.streaming_processor import HAS_POLARS, StreamingLogProcessor
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        input_file = tmp_path / "nulls.log.gz"
+        with gzip.open(input_file, 'wt') as f:
+            for i in range(30):
+                f.write(json.dumps({
+                    'timestamp': '2025-01-01T10:00:00Z',
+                    'endpoint': None if i % 3 == 0 else '/api/users',
+                    'status_code': 500,
+                    'response_time_ms': 10.0,
+                    'method': None if i % 5 == 0 else 'GET',
+                    'level': None if i % 7 == 0 else 'ERROR'
+                }) + '\n')
+        
+        engines = ['pandas_streaming', 'multiprocessing'] + (['polars'] if HAS_POLARS else [])
+        for engine in engines:
+            stats = StreamingLogProcessor(input_file, tmp_path / "out").run_engine(engine)
+            assert stats['filtered_records'] == 30
+            result = pd.read_parquet(stats['output_file'])
+            counts = dict(zip(result['endpoint'].astype(str), result['count']))
+            assert counts == {'unknown': 10, '/api/users': 20}, engine
+    
+    print("Test campos de log nulos: PASSED")
+
+def test_compression_codecs():
+    """Test de detección de códec y apertura transparente"""
+    from etl.compression import detect_codec, open_compressed, recompress_file
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        plain = Path(tmp_dir) / "sample.log"
+        plain.write_text('{"status_code": 500}\n{"status_code": 200}\n', encoding='utf-8')
+        assert detect_codec(plain) == 'plain'
+        
+        # La extensión no importa: se detecta por magic bytes
+        compressed = recompress_file(plain, Path(tmp_dir) / "sample.bin", 'gzip')
+        assert detect_codec(compressed) == 'gzip'
+        with open_compressed(compressed, 'rt') as f:
+            assert f.read() == plain.read_text(encoding='utf-8')
+        
+        with pytest.raises(ValueError):
+            open_compressed(Path(tmp_dir) / "out.gz", 'wb')
+    
+    print("Test códecs de compresión: PASSED")
+
+def test_mmap_byte_ranges():
+    """Test de rangos de bytes alineados a línea para lectura paralela"""
+    from etl.mmap_reader import count_range_lines, split_byte_ranges, iter_range_lines
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "sample.jsonl"
+        lines = [json.dumps({'request_id': f'req_{i}', 'pad': 'x' * (i % 7)}) for i in range(100)]
+        # Última línea sin salto final
+        path.write_bytes(('\n'.join(lines)).encode('utf-8'))
+        
+        ranges = split_byte_ranges(path, 8)
+        assert ranges[0][0] == 0 and ranges[-1][1] == path.stat().st_size
+        assert all(prev[1] == nxt[0] for prev, nxt in zip(ranges, ranges[1:]))
+        
+        read = [line.strip().decode('utf-8') for start, end in ranges
+                for line in iter_range_lines(path, start, end)]
+        assert read == lines
+        # Saltos de línea por rango (la última línea no tiene)
+        assert count_range_lines(path, *ranges[0]) == len(list(iter_range_lines(path, *ranges[0])))
+        assert sum(count_range_lines(path, start, end) for start, end in ranges) == 99
+        
+        empty = Path(tmp_dir) / "empty.jsonl"
+        empty.touch()
+        assert split_byte_ranges(empty, 4) == []
+    
+    print("Test rangos mmap: PASSED")
+
+def test_gzip_index_ranges():
+    """Test de lectura por rangos de un gzip con índice .gzidx"""
+    pytest.importorskip('indexed_gzip')
+    from etl.gzip_index import (
+        build_gzip_index, find_gzip_index, split_indexed_ranges, iter_indexed_range_lines
+    )
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "sample.log.gz"
+        lines = [json.dumps({'request_id': f'req_{i}', 'pad': 'x' * (i % 13)}) for i in range(5000)]
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        
+        assert find_gzip_index(path) is None
+        index_file = build_gzip_index(path, spacing_mb=0.05)
+        assert index_file.name == "sample.log.gz.gzidx"
+        assert find_gzip_index(path) == index_file
+        
+        ranges = split_indexed_ranges(path, index_file, 7)
+        read = [line.strip().decode('utf-8') for start, end in ranges
+                for line in iter_indexed_range_lines(path, index_file, start, end)]
+        assert read == lines
+        
+        # Un índice más antiguo que el gzip se ignora
+        stat = path.stat()
+        os.utime(index_file, (stat.st_atime, stat.st_mtime - 10))
+        assert find_gzip_index(path) is None
+    
+    print("Test índice gzip: PASSED")
+
+def test_block_gzip_members():
+    """Test de gzip por bloques: legible con gzip estándar y repartible por miembros"""
+    from scripts.generate_logs import generate_logs
+    from etl.block_gzip import read_member_offsets, split_member_ranges, iter_member_lines
+    from etl.streaming_processor import StreamingLogProcessor
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "blocks.log.gz"
+        stats = generate_logs(2000, path, block_size=16 * 1024)
+        assert stats['gzip_members'] > 4
+        
+        # Multi-miembro: gzip estándar lo lee completo
+        with gzip.open(path, 'rb') as f:
+            content = f.read()
+        assert content.count(b'\n') == 2000
+        
+        offsets = read_member_offsets(path)
+        assert len(offsets) == stats['gzip_members'] + 1
+        ranges = split_member_ranges(path, 3)
+        assert len(ranges) == 3 and ranges[0][0] == 0 and ranges[-1][1] == offsets[-1]
+        assert b''.join(line for start, end in ranges
+                        for line in iter_member_lines(path, start, end)) == content
+        
+        # Un gzip de un solo miembro no se confunde con el formato por bloques
+        single = Path(tmp_dir) / "single.log.gz"
+        single.write_bytes(gzip.compress(content))
+        assert read_member_offsets(single) is None
+        
+        processor = StreamingLogProcessor(path, Path(tmp_dir) / "out")
+        tasks = processor._plan_read_tasks(2)
+        assert [task[0] for task in tasks] == ['gzip_members', 'gzip_members']
+    
+    print("Test gzip por bloques: PASSED")
+
+def _publish_test_frame(num_rows):
+    from etl.result_transport import publish_frame
+    return publish_frame(pd.DataFrame({
+        'hour': list(range(num_rows)),
+        'count': [1] * num_rows,
+        'avg_response_time': [float(i) for i in range(num_rows)]
+    }))
+
+def test_shared_memory_result_transport():
+    """Test de resultados de workers publicados en memoria compartida"""
+    pytest.importorskip('pyarrow')
+    from multiprocessing import Pool
+    from multiprocessing.shared_memory import SharedMemory
+    from etl.result_transport import SharedResultReader, discard_frame
+    
+    with Pool(2) as pool:
+        descriptors = pool.map(_publish_test_frame, [50, 0, 200, 30])
+    
+    # Un resultado que el padre no lee se elimina sin abrirlo
+    dropped = descriptors.pop()
+    discard_frame(dropped)
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=dropped['name'])
+    
+    # Por el pipe solo viaja el descriptor; los vacíos no reservan segmento
+    assert descriptors[0]['transport'] == 'shared_memory' and 'frame' not in descriptors[0]
+    assert descriptors[1]['transport'] == 'pickle'
+    
+    with SharedResultReader() as reader:
+        frames = [reader.attach(d) for d in descriptors]
+        merged = pd.concat(frames, ignore_index=True)
+        assert len(merged) == 250 and merged['count'].sum() == 250
+        assert reader.shared_bytes == descriptors[0]['size'] + descriptors[2]['size']
+        del frames
+    
+    # Al salir del bloque los segmentos quedan eliminados
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=descriptors[0]['name'])
+    
+    print("Test transporte en memoria compartida: PASSED")
+
+def test_persistent_worker_pool():
+    """Test del pool de procesos reutilizado entre ejecuciones de multiprocessing"""
+    from scripts.generate_logs import generate_logs
+    from etl.streaming_processor import StreamingLogProcessor
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        input_file = tmp_path / "sample.log.gz"
+        generate_logs(2000, input_file)
+        
+        with StreamingLogProcessor(input_file, tmp_path / "out") as processor:
+            first = processor.process_with_multiprocessing()
+            second = processor.process_with_multiprocessing()
+            pool = processor.worker_pool
+            assert pool is not None and pool.is_running
+        
+        assert not first['pool_reused'] and first['pool_startup_seconds'] > 0
+        assert second['pool_reused'] and second['pool_startup_seconds'] == 0
+        assert second['worker_pool']['map_calls'] == 2
+        assert first['filtered_records'] == second['filtered_records']
+        
+        # Al salir del context manager el pool queda cerrado
+        assert processor.worker_pool is None and not pool.is_running
+        
+        # Fuera del context manager cada ejecución cierra su pool
+        standalone = StreamingLogProcessor(input_file, tmp_path / "out")
+        assert not standalone.process_with_multiprocessing()['pool_reused']
+        assert standalone.worker_pool is None
+    
+    print("Test pool de workers persistente: PASSED")
+
+def test_lazy_engine_imports():
+    """Test del registro de motores y la importación diferida de dependencias opcionales"""
+    import subprocess
+    import sys
+    from etl.engines import ENGINES, engine_available
+    from scripts.check_import_time import parse_importtime
+    
+    assert list(ENGINES) == ['pandas_streaming', 'multiprocessing', 'polars', 'dask']
+    assert engine_available('pandas_streaming')
+    
+    # Importar el procesador no debe cargar polars ni dask
+    code = ("import sys, etl.streaming_processor; "
+            "print(any(m in sys.modules for m in ('polars', 'dask')))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=Path(__file__).resolve().parent.parent)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'False'
+    
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |   _io\n"
+        "import time:       200 |        300 | io\n"
+        "import time:      1000 |       5000 | pandas\n"
+    )
+    assert parse_importtime(stderr) == {'io': 300, 'pandas': 5000}
+    
+    print("Test importación diferida de motores: PASSED")
+
+def test_memory_budget_batching():
+    """Test del presupuesto de memoria: límites de cgroup y batch adaptativo"""
+    from etl.resources import parse_memory_size, cgroup_memory_limit, current_rss
+    from etl.memory_budget import AdaptiveBatchSizer, plan_workers, MIN_BATCH_SIZE
+    
+    assert parse_memory_size('512M') == 512 * 1024 ** 2
+    assert parse_memory_size('1.5GiB') == int(1.5 * 1024 ** 3)
+    with pytest.raises(ValueError):
+        parse_memory_size('mucho')
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        assert cgroup_memory_limit(root) is None
+        
+        # cgroup v1: valor enorme = sin límite
+        (root / 'memory').mkdir()
+        (root / 'memory' / 'memory.limit_in_bytes').write_text('9223372036854771712\n')
+        assert cgroup_memory_limit(root) is None
+        (root / 'memory' / 'memory.limit_in_bytes').write_text('536870912\n')
+        assert cgroup_memory_limit(root) == 512 * 1024 ** 2
+        
+        # cgroup v2 tiene prioridad
+        (root / 'memory.max').write_text('max\n')
+        assert cgroup_memory_limit(root) is None
+        (root / 'memory.max').write_text('268435456\n')
+        assert cgroup_memory_limit(root) == 256 * 1024 ** 2
+    
+    rss = current_rss()
+    plan = plan_workers(rss + 2 * 1024 ** 3, max_workers=64, baseline_rss=rss)
+    assert 1 <= plan['workers'] < 64
+    assert plan_workers(rss, max_workers=8, baseline_rss=rss)['workers'] == 1
+    
+    # Sin margen, el batch se reduce hasta el mínimo
+    sizer = AdaptiveBatchSizer(current_rss(), initial_size=64000)
+    ballast = b'x' * (8 * 1024 * 1024)
+    for _ in range(8):
+        sizer.observe(64000)
+    assert sizer.size == MIN_BATCH_SIZE and sizer.report()['shrinks'] > 0
+    del ballast
+    
+    # Con margen amplio, crece como mucho al doble por paso
+    sizer = AdaptiveBatchSizer(current_rss() + 1024 ** 3, initial_size=2000)
+    assert sizer.observe(2000) <= 4000
+    
+    print("Test presupuesto de memoria: PASSED")
+
+def test_container_cpu_detection():
+    """Test de CPUs utilizables: cuota del cgroup (v1/v2) acotando la afinidad"""
+    from etl.resources import affinity_cpus, available_cpus, cgroup_cpu_quota, cpu_report
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        assert cgroup_cpu_quota(root) is None
+        assert available_cpus(root) == affinity_cpus()
+        
+        # cgroup v1: -1 = sin cuota
+        (root / 'cpu').mkdir()
+        (root / 'cpu' / 'cpu.cfs_period_us').write_text('100000\n')
+        (root / 'cpu' / 'cpu.cfs_quota_us').write_text('-1\n')
+        assert cgroup_cpu_quota(root) is None
+        (root / 'cpu' / 'cpu.cfs_quota_us').write_text('250000\n')
+        assert cgroup_cpu_quota(root) == 2.5
+        
+        # cgroup v2 tiene prioridad; una cuota fraccionaria redondea hacia arriba
+        (root / 'cpu.max').write_text('max 100000\n')
+        assert cgroup_cpu_quota(root) is None
+        (root / 'cpu.max').write_text('50000 100000\n')
+        assert cgroup_cpu_quota(root) == 0.5
+        assert available_cpus(root) == 1
+        
+        report = cpu_report(root)
+        assert report['cgroup_cpu_quota'] == 0.5 and report['available_cpus'] == 1
+        assert report['host_cpus'] >= report['affinity_cpus'] >= 1
+    
+    print("Test detección de CPUs del contenedor: PASSED")
+
+def test_deterministic_sampling():
+    """Test del modo muestreo: decisión sin decodificar JSON y conteos reescalados"""
+    from scripts.generate_logs import generate_logs
+    from etl import streaming_processor
+    from etl.sampling import LineSampler
+    from etl.streaming_processor import StreamingLogProcessor
+    
+    sampler = LineSampler(0.25)
+    assert sampler.key_bytes(b'{"a": 1, "request_id": "req_7", "b": 2}') == b'req_7'
+    assert sampler.key_bytes(b'{"request_id":42}') == b'42'
+    
+    # El hash de request_id no depende de la posición ni del formato de la línea
+    compact = b'{"request_id":"req_7","status_code":500}'
+    spaced = b'{"status_code": 500, "request_id": "req_7"}'
+    assert sampler.keep(compact, 0) == sampler.keep(spaced, 99)
+    kept = sum(sampler.keep(json.dumps({'request_id': f'req_{i}'}).encode(), i) for i in range(4000))
+    assert 800 < kept < 1200
+    
+    stride = LineSampler(0.3, method='stride')
+    assert stride.stride == 3 and [i for i in range(9) if stride.keep(b'', i)] == [0, 3, 6]
+    with pytest.raises(ValueError):
+        LineSampler(0)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        input_file = tmp_path / "sample.log.gz"
+        generate_logs(4000, input_file)
+        
+        full = StreamingLogProcessor(input_file, tmp_path / "full").process_with_pandas_streaming()
+        processor = StreamingLogProcessor(input_file, tmp_path / "out", sample_fraction=0.5)
+        processor.read_block_size = 4096
+        stats = processor.process_with_pandas_streaming()
+        
+        sampling = stats['sampling']
+        assert stats['total_records'] + sampling['skipped_lines'] == 4000
+        assert abs(sampling['estimated_total_records'] - 4000) <= sampling['estimated_total_records_ci']
+        assert abs(sampling['estimated_filtered_records'] - full['filtered_records']) \
+            <= 2 * sampling['estimated_filtered_records_ci']
+        
+        result = pd.read_parquet(stats['output_file'])
+        assert result['sample_count'].sum() == stats['filtered_records']
+        assert (result['count'] == result['sample_count'] * 2).all()
+        assert {'count_ci', 'avg_response_time_ci', 'error_rate_ci'} <= set(result.columns)
+        assert 'response_time_sq' not in result.columns
+        
+        # Misma muestra en una segunda ejecución
+        again = StreamingLogProcessor(input_file, tmp_path / "again", sample_fraction=0.5)
+        assert again.process_with_pandas_streaming()['filtered_records'] == stats['filtered_records']
+        
+        # Stride global: los motores paralelos toman las mismas líneas que la
+        # lectura secuencial (rangos sin comprimir y chunks de gzip)
+        plain = tmp_path / "sample.log"
+        with gzip.open(input_file, 'rb') as f:
+            plain.write_bytes(f.read())
+        split_lines = streaming_processor.SPLIT_CHUNK_LINES
+        streaming_processor.SPLIT_CHUNK_LINES = 1500
+        try:
+            for source in (plain, input_file):
+                sequential = StreamingLogProcessor(source, tmp_path / "seq", sample_fraction=0.3,
+                                                   sample_method='stride').run_engine('pandas_streaming')
+                for engine in ('multiprocessing', 'dask'):
+                    parallel = StreamingLogProcessor(source, tmp_path / engine, sample_fraction=0.3,
+                                                     sample_method='stride')
+                    parallel.cpus = 3
+                    assert len(parallel._plan_read_tasks(3)) == 3
+                    result = parallel.run_engine(engine)
+                    assert result['total_records'] == sequential['total_records']
+                    assert result['filtered_records'] == sequential['filtered_records']
+        finally:
+            streaming_processor.SPLIT_CHUNK_LINES = split_lines
+    
+    print("Test muestreo determinista: PASSED")
+
+def test_bloom_filter_dedup():
+    """Test del filtro de Bloom escalable y la deduplicación persistente de request_id"""
+    import pickle
+    from scripts.generate_logs import generate_logs
+    from etl.result_transport import discard_frame
+    from etl.sketches import ScalableBloomFilter
+    from etl.streaming_processor import StreamingLogProcessor
+    
+    # Sin falsos negativos al crecer; tasa de falsos positivos acotada
+    bloom = ScalableBloomFilter(capacity=500, error_rate=0.01)
+    added = sum(bloom.add(f'req_{i}'.encode()) for i in range(0, 4000, 2))
+    assert added > 1950 and not bloom.add(b'req_0')
+    assert all(f'req_{i}'.encode() in bloom for i in range(0, 4000, 2))
+    assert len(bloom.filters) > 1 and bloom.max_error_rate < 0.02 + 1e-9
+    false_positives = sum(f'other_{i}'.encode() in bloom for i in range(5000))
+    assert false_positives / 5000 < 0.03
+    
+    restored = ScalableBloomFilter.from_bytes(bloom.to_bytes())
+    assert len(restored) == len(bloom) and b'req_10' in restored
+    
+    # Una copia que sigue añadiendo se combina con el original
+    copy = ScalableBloomFilter.from_bytes(bloom.to_bytes())
+    copy.add(b'new_id')
+    bloom.merge(copy)
+    assert b'new_id' in bloom
+    
+    # Estimación por bits activos tras combinar, cercana a los elementos reales
+    part = bloom.filters[0]
+    assert abs(part.estimate_count() - part.count) / part.count < 0.1
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        source = tmp_path / "source.log"
+        generate_logs(2000, source.with_suffix('.gz'))
+        with gzip.open(source.with_suffix('.gz'), 'rb') as f:
+            lines = f.readlines()
+        
+        # Segmento reenviado: las 300 primeras líneas aparecen dos veces
+        replayed = tmp_path / "replayed.log"
+        replayed.write_bytes(b''.join(lines + lines[:300]))
+        state = tmp_path / "seen.bloom"
+        
+        processor = StreamingLogProcessor(replayed, tmp_path / "out", dedup=True,
+                                          dedup_state=state, dedup_capacity=1000)
+        stats = processor.run_engine('pandas_streaming')
+        assert 300 <= stats['dedup']['duplicates_dropped'] <= 310
+        assert stats['total_records'] + stats['dedup']['duplicates_dropped'] == 2300
+        assert state.exists()
+        
+        # Con multiprocessing el reenvío cae en otro rango de bytes: el padre
+        # descarta los duplicados entre workers en la misma ejecución
+        parallel = StreamingLogProcessor(replayed, tmp_path / "out_mp", dedup=True,
+                                         dedup_state=tmp_path / "seen_mp.bloom")
+        parallel.cpus = 2
+        parallel_stats = parallel.run_engine('multiprocessing')
+        assert parallel_stats['dedup']['duplicates_dropped'] == stats['dedup']['duplicates_dropped']
+        assert parallel_stats['total_records'] == stats['total_records']
+        assert parallel_stats['filtered_records'] == stats['filtered_records']
+        sequential_counts = pd.read_parquet(stats['output_file'])['count'].sum()
+        assert pd.read_parquet(parallel_stats['output_file'])['count'].sum() == sequential_counts
+        
+        # Cada tarea devuelve solo los hashes de sus IDs nuevos, no el filtro
+        parallel._start_dedup()
+        task = parallel._plan_read_tasks(2)[0]
+        result = parallel._process_read_task_shared(task)
+        discard_frame(result['data_ref'])
+        assert len(pickle.dumps(result['dedup'])) < 16 * 2300 + 1024
+        assert parallel.deduplicator.filter.memory_bytes > 1024 ** 2
+        
+        # El estado persistido descarta el archivo entero en la siguiente ejecución
+        again = StreamingLogProcessor(source.with_suffix('.gz'), tmp_path / "out", dedup=True,
+                                      dedup_state=state)
+        stats = again.run_engine('multiprocessing')
+        assert stats['total_records'] == 0
+        assert stats['dedup']['duplicates_dropped'] == 2000
+        assert stats['dedup']['loaded_ids'] >= 1990
+    
+    print("Test deduplicación con filtro de Bloom: PASSED")
+
+def test_chunked_process_file():
+    """Test del ETL por chunks: mismas métricas y salidas que el modo en memoria"""
+    from scripts.generate_transactions import generate_transactions
+    from etl.processor import ETLProcessor
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        input_file = tmp_path / "transactions.csv"
+        generate_transactions(2500, input_file)
+        
+        processor = ETLProcessor(tmp_path / "data")
+        in_memory = processor.process_file(input_file)
+        expected = pd.read_csv(in_memory['output_file'])
+        assert set(in_memory) == {'input_file', 'output_file', 'records_input', 'records_output',
+                                  'processing_time_seconds', 'compression_ratio', 'status'}
+        
+        chunked = processor.process_file(input_file, chunk_size=1000)
+        assert chunked.keys() == in_memory.keys()
+        assert chunked['records_input'] == in_memory['records_input'] == 2500
+        assert chunked['records_output'] == in_memory['records_output']
+        pd.testing.assert_frame_equal(pd.read_csv(chunked['output_file']), expected)
+        
+        db_path = processor.processed_dir / "transactions.db"
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == len(expected)
+        
+        parquet = processor.process_file(input_file, tmp_path / "out.parquet", chunk_size=700)
+        assert parquet['status'] == 'success'
+        assert len(pd.read_parquet(parquet['output_file'])) == len(expected)
+        
+        # Un fallo a mitad de carga no deja la tabla a medias
+        def failing_chunks():
+            yield expected.head(10)
+            raise RuntimeError("fallo simulado")
+        with pytest.raises(RuntimeError):
+            processor.load_chunks(failing_chunks(), tmp_path / "partial.csv")
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == len(expected)
+        
+        # Un chunk con otras columnas falla antes de escribirse (el orden no importa)
+        def mismatched_chunks():
+            yield expected.head(10)
+            yield expected.head(10)[expected.columns[::-1]]
+            yield expected.head(10).drop(columns=['status'])
+        with pytest.raises(ValueError, match=r"faltan: \['status'\]"):
+            processor.load_chunks(mismatched_chunks(), tmp_path / "mismatch.csv")
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == len(expected)
+        
+        # Un archivo solo con cabecera reemplaza la salida y la tabla anteriores
+        empty_file = tmp_path / "empty.csv"
+        empty_file.write_text("order_id,user_id,amount,status,timestamp\n")
+        for suffix in ('.csv', '.parquet'):
+            output = processor.processed_dir / f"cleaned_transactions{suffix}"
+            empty = processor.process_file(empty_file, output, chunk_size=1000)
+            assert empty['status'] == 'success' and empty['records_output'] == 0
+            result = pd.read_parquet(output) if suffix == '.parquet' else pd.read_csv(output)
+            assert len(result) == 0 and 'order_id' in result.columns
+            with sqlite3.connect(db_path) as conn:
+                assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 0
+            processor.process_file(input_file, output, chunk_size=1000)
+    
+    print("Test ETL por chunks: PASSED")
+
+def test_typed_transaction_schema():
+    """Test del esquema declarado: tipos compactos, proyección y ambos motores"""
+    from scripts.generate_transactions import generate_transactions
+    from etl.processor import ETLProcessor
+    from etl import schema
+    from etl.compression import CODEC_GZIP, recompress_file
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        input_file = tmp_path / "transactions.csv"
+        generate_transactions(3000, input_file)
+        
+        # Columna ajena al esquema y un timestamp inválido
+        raw = pd.read_csv(input_file)
+        raw['notes'] = 'x'
+        raw['timestamp'] = raw['timestamp'].astype(object)
+        raw.loc[0, 'timestamp'] = 'invalid_date'
+        raw.to_csv(input_file, index=False)
+        
+        df = schema.read_transactions_csv(input_file)
+        assert list(df.columns) == ['order_id', 'user_id', 'amount', 'status', 'timestamp']
+        assert df['order_id'].dtype == 'Int32' and df['user_id'].dtype == 'Int32'
+        assert df['amount'].dtype == 'float64'
+        assert isinstance(df['status'].dtype, pd.CategoricalDtype)
+        assert pd.api.types.is_datetime64_any_dtype(df['timestamp'])
+        assert df['timestamp'].isna().sum() == 1
+        untyped = pd.read_csv(input_file).drop(columns=['notes'])
+        assert df.memory_usage(deep=True).sum() * 2 < untyped.memory_usage(deep=True).sum()
+        
+        # Chunks (también comprimidos) y motor C dan el mismo resultado
+        gz_file = recompress_file(input_file, tmp_path / "transactions.csv.gz", CODEC_GZIP)
+        chunks = list(schema.iter_transactions_csv(gz_file, 1000))
+        assert len(chunks) > 1
+        pd.testing.assert_frame_equal(schema.concat_transactions(chunks), df)
+        
+        original = schema.HAS_PYARROW
+        schema.HAS_PYARROW = False
+        try:
+            pd.testing.assert_frame_equal(schema.read_transactions_csv(input_file, chunk_size=700), df)
+        finally:
+            schema.HAS_PYARROW = original
+
+        # Ids nulos solo en el primer chunk: mismo tipo en todos los chunks y en la salida
+        raw = pd.read_csv(input_file)
+        raw['user_id'] = raw['user_id'].astype(object)
+        raw.loc[5, 'user_id'] = None
+        raw.to_csv(input_file, index=False)
+        chunks = list(schema.iter_transactions_csv(input_file, 1000))
+        assert {str(chunk['user_id'].dtype) for chunk in chunks} == {'Int32'}
+        processor = ETLProcessor(tmp_path / "data")
+        assert {str(processor.transform(chunk)['user_id'].dtype) for chunk in chunks} == {'int32'}
+        metrics = processor.process_file(input_file, chunk_size=1000)
+        output = pd.read_csv(metrics['output_file'], dtype=str)
+        assert not output['user_id'].str.contains('.', regex=False).any()
+        assert not output['order_id'].str.contains('.', regex=False).any()
+
+    print("Test esquema de transacciones: PASSED")
+
+def test_streaming_log_extract():
+    """Test de extracción de logs por lotes columnares con líneas no JSON"""
+    import gzip
+    import json
+    from etl import processor as processor_module
+    from etl.processor import ETLProcessor
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        log_file = tmp_path / "app.log.gz"
+        lines = [json.dumps({'timestamp': f'2025-01-01T00:00:{i % 60:02d}Z', 'level': 'INFO',
+                             'status_code': 200, 'response_time_ms': i * 1.5})
+                 for i in range(250)]
+        lines.insert(120, "2025-01-01T00:02:00Z ERROR conexión rechazada")
+        lines.insert(10, "")
+        with gzip.open(log_file, 'wt') as f:
+            f.write("\n".join(lines) + "\n")
+        
+        processor = ETLProcessor(tmp_path / "data")
+        batches = list(processor.extract_chunks(log_file, 100))
+        assert [len(b) for b in batches] == [100, 100, 51]
+        
+        df = processor.extract(log_file)
+        pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), df)
+        assert len(df) == 251
+        assert df['level'].tolist().count('ERROR') == 1
+        assert df.loc[df['level'] == 'ERROR', 'message'].iloc[0] == 'conexión rechazada'
+        
+        # Sin pyarrow: mismo resultado con DataFrames por lote
+        original = processor_module.HAS_PYARROW
+        processor_module.HAS_PYARROW = False
+        try:
+            pd.testing.assert_frame_equal(processor.extract(log_file), df)
+        finally:
+            processor_module.HAS_PYARROW = original
+    
+    print("Test extracción de logs por lotes: PASSED")
+
+def test_single_pass_transform():
+    """Test de la máscara de validez única y los rechazos por regla"""
+    from etl.processor import ETLProcessor
+    from etl.transform import clean_transactions
+    
+    df = pd.DataFrame({
+        'order_id': [1, 2, 3, 4, 5, 6],
+        'user_id': [10, None, 30, 40, 50, 60],
+        'amount': [100.0, 50.0, -5.0, 0.0, 20.0, 75.5],
+        'status': ['completed', 'failed', 'pending', 'completed', 'failed', 'completed'],
+        'timestamp': ['2025-01-01 10:00:00', '2025-01-02 10:00:00', '2025-01-03 10:00:00',
+                      '2025-01-04 10:00:00', 'invalid_date', '2025-01-06 10:00:00']
+    })
+    original = df.copy()
+    
+    clean, report = clean_transactions(df)
+    assert clean['order_id'].tolist() == [1, 6]
+    assert pd.api.types.is_datetime64_any_dtype(clean['timestamp'])
+    assert report['rejections'] == {'null_values': 1, 'invalid_timestamp': 1, 'invalid_amount': 0,
+                                    'non_positive_amount': 2, 'missing_user_id': 1}
+    assert report['rows_rejected'] == 4
+    assert report['data_quality_score'] == round(2 / 6, 6)
+    pd.testing.assert_frame_equal(df, original)  # la entrada no se modifica
+    
+    # Alias 'ts' y nombres de columnas sin normalizar en ETLProcessor
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor = ETLProcessor(Path(tmp_dir))
+        raw = df.rename(columns={'timestamp': 'ts', 'amount': ' Amount '})
+        result = processor.transform(raw)
+        assert result['order_id'].tolist() == [1, 6]
+        assert 'ts' not in result.columns and 'amount' in result.columns
+        assert processor.quality['rejections']['non_positive_amount'] == 2
+        
+        # Los rechazos se acumulan entre chunks y llegan a las métricas
+        csv_path = Path(tmp_dir) / "tx.csv"
+        pd.concat([original] * 3, ignore_index=True).to_csv(csv_path, index=False)
+        metrics = processor.process_file(csv_path, chunk_size=5)
+        assert metrics['records_output'] == 6
+        assert processor.quality['rejections']['non_positive_amount'] == 6
+        # El esquema de lectura ya convierte los timestamps inválidos en nulos
+        assert processor.quality['rejections']['null_values'] == 6
+    
+    print("Test transform de una pasada: PASSED")
+
+def test_bulk_sqlite_loader():
+    """Test de la carga masiva: transacción única, índices y PRAGMAs restaurados"""
+    import numpy as np
+    from etl.bulk_load import BulkLoader, bulk_load
+    
+    df = pd.DataFrame({
+        'order_id': np.arange(1, 1201, dtype='int32'),
+        'user_id': pd.array([i % 50 if i % 100 else None for i in range(1200)], dtype='Int32'),
+        'amount': np.linspace(1, 500, 1200),
+        'status': pd.Categorical(['completed', 'failed', 'pending'] * 400),
+        'timestamp': pd.date_range('2025-01-01', periods=1200, freq='min')
+    })
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = Path(tmp_dir) / "bulk.db"
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("CREATE TABLE transactions (order_id INTEGER)")
+            conn.execute("CREATE INDEX idx_previo ON transactions(order_id)")
+        
+        chunks = [df.iloc[:500], df.iloc[500:]]
+        report = bulk_load(chunks, db_path, 'transactions', indexes=['user_id', 'no_existe'], batch_size=300)
+        assert report['rows_loaded'] == 1200
+        assert report['batches'] == 5
+        assert report['indexes_rebuilt'] == 2
+        assert report['rows_per_second'] > 0
+        
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 1200
+            assert conn.execute("SELECT COUNT(*) FROM transactions WHERE user_id IS NULL").fetchone()[0] == 12
+            assert conn.execute("SELECT timestamp FROM transactions LIMIT 1").fetchone()[0] == '2025-01-01 00:00:00'
+            indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            assert indexes == {'idx_previo', 'idx_transactions_user_id'}
+            # PRAGMAs por conexión intactos fuera de la carga
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+        
+        # Un fallo deja la tabla anterior intacta
+        with pytest.raises(RuntimeError):
+            with BulkLoader(db_path, 'transactions') as loader:
+                loader.write(df.head(10))
+                raise RuntimeError("fallo simulado")
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 1200
+        
+        with pytest.raises(ValueError):
+            BulkLoader(db_path, 'transactions', synchronous='EXTRA')
+    
+    print("Test carga masiva SQLite: PASSED")
+
+def test_incremental_upsert_load():
+    """Test de la carga incremental: upsert por order_id y marca de agua"""
+    from etl.bulk_load import bulk_load
+    from etl.incremental import read_watermark, upsert_load
+    from etl.processor import ETLProcessor
+    
+    history = pd.DataFrame({
+        'order_id': range(1, 101),
+        'user_id': [i % 10 + 1 for i in range(100)],
+        'amount': [10.0 + i for i in range(100)],
+        'status': ['pending'] * 100,
+        'timestamp': pd.date_range('2025-01-01', periods=100, freq='h')
+    })
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = Path(tmp_dir) / "inc.db"
+        first = upsert_load(history.iloc[:60], db_path, 'transactions')
+        assert first['rows_inserted'] == 60 and first['rows_updated'] == 0
+        assert first['watermark']['max_timestamp'] == str(history['timestamp'].iloc[59])
+        
+        # Snapshot completo con una fila del borde modificada: solo se toca el delta
+        snapshot = history.copy()
+        snapshot.loc[59, 'status'] = 'completed'
+        second = upsert_load(snapshot, db_path, 'transactions')
+        assert second['rows_skipped_by_watermark'] == 59
+        assert second['rows_updated'] == 1 and second['rows_inserted'] == 40
+        
+        # Repetir la carga es idempotente
+        third = upsert_load(snapshot, db_path, 'transactions')
+        assert third['rows_inserted'] == 0 and third['rows_updated'] == 1
+        
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 100
+            assert conn.execute("SELECT status FROM transactions WHERE order_id = 60").fetchone()[0] == 'completed'
+            assert read_watermark(conn, 'transactions')['max_key'] == 100
+            pk = [row[1] for row in conn.execute("PRAGMA table_info(transactions)") if row[5]]
+            assert pk == ['order_id']
+        
+        # Claves repetidas en el staging: una fila nueva y una actualizada
+        repeated = history.iloc[[99, 99, 99]].assign(order_id=[101, 101, 100], amount=[1.0, 2.0, 3.0])
+        fourth = upsert_load(repeated, db_path, 'transactions')
+        assert fourth['rows_inserted'] == 1 and fourth['rows_updated'] == 1
+        
+        # Una carga completa borra la marca de agua; sus claves repetidas no
+        # impiden crear el índice único de la siguiente carga incremental
+        bulk_load(pd.concat([history, history.iloc[:5]]), db_path, 'transactions')
+        with sqlite3.connect(db_path) as conn:
+            assert read_watermark(conn, 'transactions') == {}
+        fifth = upsert_load(history.iloc[:10], db_path, 'transactions')
+        assert fifth['rows_skipped_by_watermark'] == 0 and fifth['duplicate_keys_removed'] == 5
+        assert fifth['rows_inserted'] == 0 and fifth['rows_updated'] == 10
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 100
+        
+        # ETLProcessor en modo incremental sobre una tabla cargada en modo reemplazo
+        csv_path = Path(tmp_dir) / "tx.csv"
+        history.assign(timestamp=history['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')).to_csv(csv_path, index=False)
+        processor = ETLProcessor(Path(tmp_dir) / "data")
+        processor.process_file(csv_path, chunk_size=40)
+        processor.incremental = True
+        metrics = processor.process_file(csv_path, chunk_size=40)
+        assert metrics['status'] == 'success'
+        with sqlite3.connect(processor.processed_dir / "transactions.db") as conn:
+            assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 100
+    
+    print("Test carga incremental: PASSED")
+
+def test_parallel_process_directory():
+    """Test del procesamiento paralelo de un directorio con un único escritor"""
+    import gzip
+    import json
+    from etl.processor import ETLProcessor
+    
+    transactions = pd.DataFrame({
+        'order_id': range(1, 301),
+        'user_id': [i % 7 + 1 for i in range(300)],
+        'amount': [float(i % 50) for i in range(300)],
+        'status': ['completed', 'pending', 'failed'] * 100,
+        'timestamp': ['2025-01-01 10:00:00'] * 300
+    })
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor = ETLProcessor(Path(tmp_dir) / "data")
+        raw_dir = processor.raw_dir
+        transactions.iloc[:100].to_csv(raw_dir / "a.csv", index=False)
+        transactions.iloc[100:200].to_csv(raw_dir / "b.csv", index=False)
+        with gzip.open(raw_dir / "c.csv.gz", 'wt') as f:
+            transactions.iloc[200:].to_csv(f, index=False)
+        (raw_dir / "d.csv").write_text("level,message\nINFO,ok\n")
+        (raw_dir / "notes.txt").write_text("no es un archivo de datos")
+        
+        metrics = processor.process_directory(workers=2, chunk_size=40)
+        assert metrics['status'] == 'partial'
+        assert [Path(m['input_file']).name for m in metrics['files']] == ['a.csv', 'b.csv', 'c.csv.gz', 'd.csv']
+        assert metrics['files_processed'] == 3 and metrics['files_failed'] == 1
+        assert 'Columnas distintas' in metrics['files'][-1]['error']
+        
+        # amount == 0 se rechaza: 6 filas por cada 300
+        assert metrics['records_input'] == 300
+        assert metrics['records_output'] == 294
+        assert metrics['rejections']['non_positive_amount'] == 6
+        
+        output = pd.read_csv(metrics['output_file'])
+        assert output['order_id'].tolist() == [i for i in range(1, 301) if i % 50 != 1]
+        with sqlite3.connect(metrics['database']) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 294
+        assert not list(processor.processed_dir.glob('.spool_*'))
+        
+        # Sin workers extra se procesa en el mismo proceso con el mismo resultado
+        single = processor.process_directory(pattern='*.csv*', workers=1, chunk_size=40)
+        assert single['workers'] == 1 and single['records_output'] == 294
+        
+        # Logs JSON planos por el parser de logs; un archivo cuyas columnas
+        # cambian a mitad se omite entero, sin dejar chunks en la salida
+        logs_dir = Path(tmp_dir) / "logs"
+        logs_dir.mkdir()
+        records = transactions.iloc[:60].to_dict('records')
+        (logs_dir / "a.log").write_text("".join(json.dumps(r) + "\n" for r in records[:30]))
+        mixed = [dict(r, channel='web') if i >= 15 else r for i, r in enumerate(records[30:])]
+        (logs_dir / "b.log").write_text("".join(json.dumps(r) + "\n" for r in mixed))
+        logs = processor.process_directory(logs_dir, workers=1, chunk_size=10)
+        assert [m['status'] for m in logs['files']] == ['success', 'error']
+        assert 'Columnas distintas' in logs['files'][1]['error']
+        assert pd.read_csv(logs['output_file'])['order_id'].tolist() == [i for i in range(1, 31) if i != 1]
+    
+    print("Test procesamiento paralelo de directorio: PASSED")
+
+def test_result_cache():
+    """Test de la caché de resultados por contenido (aciertos, --force, TTL y tamaño)"""
+    from etl.processor import ETLProcessor
+    from etl.result_cache import ResultCache
+    
+    transactions = pd.DataFrame({
+        'order_id': range(1, 201),
+        'user_id': [i % 9 + 1 for i in range(200)],
+        'amount': [10.0 + i for i in range(200)],
+        'status': ['completed', 'pending'] * 100,
+        'timestamp': ['2025-01-01 10:00:00'] * 200
+    })
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        input_file = tmp_path / "tx.csv"
+        transactions.to_csv(input_file, index=False)
+        cache = ResultCache(tmp_path / "cache")
+        processor = ETLProcessor(tmp_path / "data")
+        processor.cache = cache
+        
+        first = processor.process_file(input_file)
+        assert processor.last_run['cache'] == 'miss' and cache.stores == 1
+        
+        # Salidas borradas y entrada sin cambios: se restauran sin procesar
+        output_file = Path(first['output_file'])
+        expected = output_file.read_bytes()
+        output_file.unlink()
+        second = processor.process_file(input_file)
+        assert processor.last_run['cache'] == 'hit' and second['records_output'] == 200
+        assert second.keys() == first.keys()
+        assert output_file.read_bytes() == expected
+        with sqlite3.connect(processor.processed_dir / "transactions.db") as conn:
+            assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 200
+        
+        # Atajo por tamaño + mtime: el contenido solo se hashea una vez
+        hashed = cache.bytes_hashed
+        cache.key('etl', [input_file], {})
+        assert cache.bytes_hashed == hashed
+        
+        # Entrada modificada -> fallo; --force -> fallo aunque la entrada no cambie
+        transactions.iloc[:150].to_csv(input_file, index=False)
+        processor.process_file(input_file)
+        assert processor.last_run['cache'] == 'miss'
+        processor.cache = ResultCache(tmp_path / "cache", force=True)
+        processor.process_file(input_file)
+        assert processor.last_run['cache'] == 'miss'
+        
+        # Carga incremental: no se usa la caché
+        processor.incremental = True
+        processor.process_file(input_file)
+        assert processor.last_run['cache'] is None
+        
+        # TTL: las entradas caducadas no se sirven y se eliminan
+        blob = tmp_path / "blob.bin"
+        blob.write_bytes(b'x' * 1000)
+        small = ResultCache(tmp_path / "small", max_bytes=2500, ttl_seconds=3600)
+        keys = []
+        for i in range(3):
+            keys.append(small.key('stage', [blob], {'i': i}))
+            assert small.store(keys[-1], {'blob': blob}, {'i': i})
+        # Tamaño: tres entradas de 1000 bytes no caben en 2500; sale la menos usada
+        assert small.lookup(keys[0]) is None
+        assert small.restore(keys[1], {'blob': tmp_path / "restored.bin"}) == {'i': 1}
+        assert (tmp_path / "restored.bin").read_bytes() == blob.read_bytes()
+        
+        manifest_file = small.cache_dir / keys[2] / "manifest.json"
+        manifest = json.loads(manifest_file.read_text())
+        manifest['created_at'] -= 7200
+        manifest_file.write_text(json.dumps(manifest))
+        assert small.lookup(keys[2]) is None
+        assert not (small.cache_dir / keys[2]).exists()
+        assert small.report()['entries'] == 1
+    
+    print("Test caché de resultados: PASSED")
+
+def test_polars_transaction_engine():
+    """Test del motor polars del ETL de transacciones frente al camino pandas"""
+    pytest.importorskip('polars')
+    from etl.processor import ETLProcessor
+    
+    csv_text = ("order_id,user_id,amount,status,timestamp\n"
+                "1,10,5.5,completed,2025-01-01 10:00:00\n"
+                "2,,7.0,pending,2025-01-01 11:00:00\n"
+                "3,11,-1,failed,2025-01-02 10:00:00\n"
+                "4,12,abc,completed,2025-01-02 10:00:00\n"
+                "5,13,9.25,completed,no-date\n"
+                "6,14,3.0,,2025-01-03 10:00:00\n"
+                "7.0,15,3.0,pending,2025-01-03 12:00:00\n")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        input_file = tmp_path / "tx.csv"
+        input_file.write_text(csv_text)
+        
+        processor = ETLProcessor(tmp_path / "polars")
+        processor.engine = 'polars'
+        metrics = processor.process_file(input_file)
+        assert metrics['status'] == 'success' and processor.last_run['engine'] == 'polars'
+        assert metrics['records_input'] == 7 and metrics['records_output'] == 2
+        assert processor.quality['rejections'] == {'null_values': 2, 'invalid_timestamp': 1, 'invalid_amount': 1,
+                                         'non_positive_amount': 1, 'missing_user_id': 1}
+        output = pd.read_csv(metrics['output_file'])
+        assert output['order_id'].tolist() == [1, 7]
+        assert output['timestamp'].tolist() == ['2025-01-01 10:00:00', '2025-01-03 12:00:00']
+        with sqlite3.connect(processor.processed_dir / "transactions.db") as conn:
+            assert conn.execute("SELECT COUNT(*), SUM(amount) FROM transactions").fetchone() == (2, 8.5)
+        
+        # Mismas filas y misma salida que pandas sobre un CSV limpio, plano o gzip
+        clean = pd.DataFrame({
+            'order_id': range(1, 501),
+            'user_id': [i % 13 + 1 for i in range(500)],
+            'amount': [round(1.5 + i * 0.25, 2) for i in range(500)],
+            'status': ['completed', 'pending', 'failed', 'completed'] * 125,
+            'ts': ['2025-02-01 08:30:00'] * 500
+        })
+        clean_file = tmp_path / "clean.csv.gz"
+        with gzip.open(clean_file, 'wt') as f:
+            clean.to_csv(f, index=False)
+        outputs = {}
+        for engine in ('pandas', 'polars'):
+            processor = ETLProcessor(tmp_path / engine)
+            processor.engine = engine
+            result = processor.process_file(clean_file, output_path=tmp_path / f"{engine}.parquet")
+            assert result['status'] == 'success' and result['records_output'] == 500
+            outputs[engine] = pd.read_parquet(result['output_file'])
+        assert outputs['pandas'].columns.tolist() == outputs['polars'].columns.tolist()
+        assert outputs['pandas']['amount'].tolist() == outputs['polars']['amount'].tolist()
+        assert (outputs['pandas']['timestamp'] == outputs['polars']['timestamp']).all()
+        
+        # Los logs no son CSV de transacciones: se procesan con pandas
+        log_file = tmp_path / "app.log.gz"
+        with gzip.open(log_file, 'wt') as f:
+            f.write('{"timestamp": "2025-01-01 10:00:00", "level": "INFO", "user_id": 1}\n')
+        processor = ETLProcessor(tmp_path / "logs")
+        processor.engine = 'polars'
+        processor.process_file(log_file)
+        assert processor.last_run['engine'] == 'pandas'
+    
+    print("Test motor polars: PASSED")
+
+def test_parallel_csv_reader():
+    """Test de la lectura paralela por rangos de bytes (orden, esquema y umbral)"""
+    from etl.parallel_csv import iter_transactions_csv_parallel, split_csv_ranges, use_parallel_read
+    from etl.processor import ETLProcessor
+    from etl.schema import concat_transactions, read_transactions_csv
+    
+    transactions = pd.DataFrame({
+        'order_id': range(1, 2001),
+        'user_id': [i % 13 + 1 for i in range(2000)],
+        'amount': [float(i % 40) for i in range(2000)],
+        'status': ['completed', 'pending', 'failed', 'completed'] * 500,
+        'timestamp': ['2025-01-01 10:00:00', '2025-01-02 11:30:00'] * 1000
+    })
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / "transactions.csv"
+        transactions.to_csv(csv_path, index=False)
+        header_bytes = len(csv_path.read_bytes().split(b'\n', 1)[0]) + 1
+        
+        # Rangos contiguos de filas completas tras la cabecera
+        ranges = split_csv_ranges(csv_path, 7)
+        assert ranges[0][0] == header_bytes and ranges[-1][1] == csv_path.stat().st_size
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        data = csv_path.read_bytes()
+        assert all(data[end - 1:end] == b'\n' for _, end in ranges)
+        
+        # Umbral, un solo worker y archivos comprimidos: lectura secuencial
+        assert use_parallel_read(csv_path, 2, min_bytes=0)
+        assert not use_parallel_read(csv_path, 2)
+        assert not use_parallel_read(csv_path, 1, min_bytes=0)
+        with gzip.open(Path(tmp_dir) / "transactions.csv.gz", 'wt') as f:
+            transactions.to_csv(f, index=False)
+        assert not use_parallel_read(Path(tmp_dir) / "transactions.csv.gz", 2, min_bytes=0)
+        
+        # Mismo resultado que la lectura secuencial, en el orden del archivo
+        chunks = list(iter_transactions_csv_parallel(csv_path, chunk_size=300, workers=2, min_bytes=0))
+        assert len(chunks) > 2
+        expected = read_transactions_csv(csv_path)
+        pd.testing.assert_frame_equal(concat_transactions(chunks), expected)
+        assert expected['order_id'].tolist() == list(range(1, 2001))
+        
+        # ETLProcessor usa el lector paralelo en extract y en process_file por chunks
+        processor = ETLProcessor(Path(tmp_dir) / "data")
+        processor.read_workers = 2
+        processor.parallel_read_min_bytes = 0
+        pd.testing.assert_frame_equal(processor.extract(csv_path), expected)
+        metrics = processor.process_file(csv_path, chunk_size=300)
+        assert metrics['status'] == 'success'
+        assert metrics['records_input'] == 2000 and metrics['records_output'] == 1950
+    
+    print("Test lectura CSV paralela por rangos: PASSED")
+
 if __name__ == "__main__":
     print("Ejecutando suite de tests completa...")
     
@@ -325,5 +1491,31 @@ if __name__ == "__main__":
     test_integration_pipeline()
     test_performance_benchmark()
     test_error_handling()
+    test_hyperloglog_distinct_counts()
+    test_columnar_log_batch()
+    test_field_dictionary_merge()
+    test_streaming_pipeline_pandas()
+    test_null_categorical_log_fields()
+    test_compression_codecs()
+    test_mmap_byte_ranges()
+    test_gzip_index_ranges()
+    test_block_gzip_members()
+    test_shared_memory_result_transport()
+    test_persistent_worker_pool()
+    test_lazy_engine_imports()
+    test_memory_budget_batching()
+    test_container_cpu_detection()
+    test_deterministic_sampling()
+    test_bloom_filter_dedup()
+    test_chunked_process_file()
+    test_typed_transaction_schema()
+    test_streaming_log_extract()
+    test_single_pass_transform()
+    test_bulk_sqlite_loader()
+    test_incremental_upsert_load()
+    test_parallel_process_directory()
+    test_result_cache()
+    test_polars_transaction_engine()
+    test_parallel_csv_reader()
     
     print("\nTodos los tests completados exitosamente!")